@@ -6,7 +6,8 @@ from sqlalchemy import pool
 from alembic import context
 
 from app.models.base_db_models import Base
-from app.models import user_table, task_table
+from app.models import user_table, task_table, task_history_table, user_profile_table, \
+    user_recommendation_table, task_neighbour_table, task_stats_table, task_translation_table
 
 target_metadata = Base.metadata
 
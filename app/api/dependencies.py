@@ -0,0 +1,22 @@
+from fastapi import Request
+
+from app.services.recommendation_service import RecommendationService
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_text_index import TaskTextIndex
+from app.services.translation_worker import TranslationWorker
+
+
+async def get_recommendation_service(request: Request) -> RecommendationService:
+    service = getattr(request.app.state, 'recommendation_service', None)
+    if service is None:
+        # приложение поднято без lifespan (например, в тестах) — создаём экземпляр лениво
+        index = TaskTextIndex.load() or TaskTextIndex()
+        service = RecommendationService(index, ann_index=TaskAnnIndex.load(text_index=index))
+        request.app.state.recommendation_service = service
+    await service.sync_snapshot()
+    return service
+
+
+def get_translation_worker(request: Request) -> TranslationWorker | None:
+    # None, если перевод при одобрении выключен (TRANSLATION_ON_APPROVE)
+    return getattr(request.app.state, 'translation_worker', None)
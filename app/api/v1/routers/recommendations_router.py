@@ -1,20 +1,60 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.dependencies import get_recommendation_service
 from app.auth.security import get_current_user
 from app.database import get_db
-from app.schemas.recomendations import RecommendationsResponse, RecommendationItem
+from app.schemas.recomendations import RecommendationsResponse, RecommendationItem, BatchRecommendationsRequest, \
+    BatchRecommendationsResponse, UserRecommendations, SnapshotsResponse
 from app.schemas.user import UserPublic
-from app.services.recommendation_service import RecommendationService
+from app.services.recommendation_service import RecommendationService, RECO_MMR_POOL
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 @router.get("", response_model=RecommendationsResponse)
 async def get_recommendations(
         n: int = Query(5, ge=1, le=50),
+        diversity: float = Query(0.0, ge=0.0, le=1.0),
+        diversity_pool: int = Query(RECO_MMR_POOL, ge=1, le=500),
         session: AsyncSession = Depends(get_db),
         current_user: UserPublic = Depends(get_current_user),
+        service: RecommendationService = Depends(get_recommendation_service),
 ):
-    service = RecommendationService()
-    ranked = await service.get_user_recommendations(session, user_id=current_user.id, n_recommendations=n)
+    ranked = await service.get_user_recommendations(
+        session, user_id=current_user.id, n_recommendations=n, diversity=diversity, diversity_pool=diversity_pool,
+    )
     return RecommendationsResponse(items=[RecommendationItem(**r.__dict__) for r in ranked])
+
+
+@router.post("/batch", response_model=BatchRecommendationsResponse)
+async def get_batch_recommendations(
+        payload: BatchRecommendationsRequest,
+        session: AsyncSession = Depends(get_db),
+        current_user: UserPublic = Depends(get_current_user),
+        service: RecommendationService = Depends(get_recommendation_service),
+):
+    results = await service.get_batch_recommendations(
+        session, payload.user_ids, n_recommendations=payload.n, requesting_by=current_user,
+    )
+    return BatchRecommendationsResponse(results=[
+        UserRecommendations(user_id=user_id, items=[RecommendationItem(**r.__dict__) for r in ranked])
+        for user_id, ranked in results.items()
+    ])
+
+
+@router.get("/snapshots", response_model=SnapshotsResponse)
+async def get_snapshots(
+        current_user: UserPublic = Depends(get_current_user),
+        service: RecommendationService = Depends(get_recommendation_service),
+):
+    return SnapshotsResponse(**service.snapshot_status(current_user))
+
+
+@router.post("/snapshots/{version}/activate", response_model=SnapshotsResponse)
+async def activate_snapshot(
+        version: str,
+        current_user: UserPublic = Depends(get_current_user),
+        service: RecommendationService = Depends(get_recommendation_service),
+):
+    await service.activate_snapshot(version, current_user)
+    return SnapshotsResponse(**service.snapshot_status(current_user))
@@ -1,14 +1,17 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession as Session
 
+from app.api.dependencies import get_recommendation_service, get_translation_worker
 from app.auth.security import get_current_user
 from app.database import get_db
 from app.enums.task_moderation_status import TaskStatusEnum
 from app.models.user_table import User
-from app.schemas.task import TaskOut, TaskCreate, TaskBase, TaskUpdate
+from app.schemas.task import TaskOut, TaskCreate, TaskBase, TaskUpdate, SimilarTaskOut, TaskTranslationOut
+from app.services.recommendation_service import RecommendationService
 from app.services.task_service import TaskService
+from app.services.translation_worker import TranslationWorker
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -16,9 +19,11 @@ router = APIRouter(prefix="/tasks", tags=["tasks"])
 async def create_task(
         task_data: TaskCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        reco_service: RecommendationService = Depends(get_recommendation_service),
+        translation_worker: TranslationWorker | None = Depends(get_translation_worker),
 ):
-    task_service = TaskService(db)
+    task_service = TaskService(db, reco_service, translation_worker)
     return await task_service.create_task(task_data, current_user)
 
 @router.get("/", response_model=List[TaskOut])
@@ -51,20 +56,38 @@ async def get_tasks_for_moderation(
 @router.get("/{task_id}", response_model=TaskOut)
 async def get_task(
         task_id: int,
+        lang: Optional[str] = Query(None, max_length=8),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    task_service = TaskService(db)
+    if lang is None:
+        return await task_service.get_task_by_id(current_user, task_id)
+    task, translation = await task_service.get_task_with_translation(current_user, task_id, lang)
+    return TaskOut.model_validate(task, from_attributes=True).model_copy(update={
+        'translation': TaskTranslationOut.model_validate(translation, from_attributes=True) if translation else None,
+    })
+
+@router.get("/{task_id}/similar", response_model=List[SimilarTaskOut])
+async def get_similar_tasks(
+        task_id: int,
+        k: int = Query(10, ge=1, le=50),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     task_service = TaskService(db)
-    return await task_service.get_task_by_id(current_user, task_id)
+    rows = await task_service.get_similar_tasks(current_user, task_id, k)
+    return [SimilarTaskOut(id=r[0], subject=r[1], problem=r[2], difficulty=r[3], score=r[4]) for r in rows]
 
 @router.put("/{task_id}", response_model=TaskOut)
 async def update_task(
         task_id: int,
         task_data: TaskUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        translation_worker: TranslationWorker | None = Depends(get_translation_worker),
 ):
-    task_service = TaskService(db)
+    task_service = TaskService(db, translation_worker=translation_worker)
     return await task_service.update_task(task_id, task_data, current_user)
 
 
@@ -72,9 +95,11 @@ async def update_task(
 async def approve_task(
         task_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        reco_service: RecommendationService = Depends(get_recommendation_service),
+        translation_worker: TranslationWorker | None = Depends(get_translation_worker),
 ):
-    task_service = TaskService(db)
+    task_service = TaskService(db, reco_service, translation_worker)
     return await task_service.approve_task(task_id, current_user)
 
 @router.patch("/{task_id}/reject", response_model=TaskOut)
@@ -90,7 +115,8 @@ async def reject_task(
 async def delete_task(
         task_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        reco_service: RecommendationService = Depends(get_recommendation_service),
 ):
-    task_service = TaskService(db)
+    task_service = TaskService(db, reco_service)
     return await task_service.delete_task(task_id, current_user)
\ No newline at end of file
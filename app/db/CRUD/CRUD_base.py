@@ -47,10 +47,11 @@ class CRUDBase(Generic[T], abc.ABC):
 
 
 
-    async def delete_by_filter(self, **filters) -> int:
+    async def delete_by_filter(self, commit: bool = True, **filters) -> int:
         stmt = sqlalchemy_delete(self.model).filter_by(**filters)
         result = await self.db.execute(stmt)
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
         return cast(int, result.rowcount)
 
 
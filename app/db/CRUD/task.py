@@ -16,5 +16,5 @@ class TaskCRUD(CRUDBase[Task]):
     async def get_task_by_subject(self, subject: str) -> list[Task]:
         return await self.get_all(subject=subject)
 
-    async def delete_task_by_id(self, task_id: int) -> None:
-        await self.delete_by_filter(id=task_id)
\ No newline at end of file
+    async def delete_task_by_id(self, task_id: int, commit: bool = True) -> None:
+        await self.delete_by_filter(commit=commit, id=task_id)
\ No newline at end of file
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from app.db.CRUD.CRUD_base import CRUDBase
+from app.db.CRUD.task_stats import TaskStatsCRUD
 from app.models.task_history_table import TaskHistory
 
 
@@ -36,18 +37,25 @@ class TaskHistoryCRUD(CRUDBase[TaskHistory]):
         return result.scalars().first()
 
     @override
-    async def create(self, obj: TaskHistory) -> TaskHistory:
+    async def create(self, obj: TaskHistory, commit: bool = True) -> TaskHistory:
         self.db.add(obj)
+        await self.db.flush()
+        # попытка и агрегаты по задаче фиксируются одной транзакцией
+        await TaskStatsCRUD(self.db).record_attempt(obj, commit=False)
+        if not commit:
+            return obj
         await self.db.commit()
-        await self.db.refresh(obj)
+        return await self.get_with_relations(obj.id)
 
+    async def get_with_relations(self, history_id: int) -> TaskHistory | None:
         stmt = (
             select(self.model)
             .options(
                 joinedload(self.model.user),
                 joinedload(self.model.task)
             )
-            .filter(self.model.id == obj.id)
+            .filter(self.model.id == history_id)
+            .execution_options(populate_existing=True)
         )
         result = await self.db.execute(stmt)
         return result.scalars().first()
\ No newline at end of file
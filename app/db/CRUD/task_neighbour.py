@@ -0,0 +1,64 @@
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, insert, select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.CRUD_base import CRUDBase
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.models.task_neighbour_table import TaskNeighbour
+from app.models.task_table import Task
+
+
+class TaskNeighbourCRUD(CRUDBase[TaskNeighbour]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, TaskNeighbour)
+
+    async def get_similar(self, task_id: int, limit: int):
+        q = (
+            select(Task.id, Task.subject, Task.problem, Task.difficulty, TaskNeighbour.score)
+            .join(Task, Task.id == TaskNeighbour.neighbour_id)
+            .where(TaskNeighbour.task_id == task_id)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .order_by(TaskNeighbour.score.desc())
+            .limit(limit)
+        )
+        return (await self.db.execute(q)).all()
+
+    async def get_for_tasks(self, task_ids: Sequence[int]):
+        q = (
+            select(TaskNeighbour.task_id, TaskNeighbour.neighbour_id, TaskNeighbour.score)
+            .where(TaskNeighbour.task_id.in_(task_ids))
+        )
+        return (await self.db.execute(q)).all()
+
+    async def insert_rows(self, rows: Iterable[dict], commit: bool = True) -> int:
+        rows = list(rows)
+        if rows:
+            await self.db.execute(insert(self.model), rows)
+        if commit:
+            await self.db.commit()
+        return len(rows)
+
+    async def delete_pairs(self, pairs: Sequence[tuple], commit: bool = True) -> None:
+        for task_id, neighbour_id in pairs:
+            await self.db.execute(
+                delete(self.model)
+                .where(self.model.task_id == task_id)
+                .where(self.model.neighbour_id == neighbour_id)
+            )
+        if commit:
+            await self.db.commit()
+
+    async def delete_for_task(self, task_id: int, commit: bool = True) -> int:
+        # задача уходит и из своего списка, и из списков соседей
+        result = await self.db.execute(
+            delete(self.model).where(or_(self.model.task_id == task_id, self.model.neighbour_id == task_id))
+        )
+        if commit:
+            await self.db.commit()
+        return result.rowcount
+
+    async def delete_all(self, commit: bool = True) -> None:
+        await self.db.execute(delete(self.model))
+        if commit:
+            await self.db.commit()
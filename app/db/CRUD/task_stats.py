@@ -0,0 +1,120 @@
+from sqlalchemy import select, update, insert, delete, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.CRUD_base import CRUDBase
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.models.task_history_table import TaskHistory
+from app.models.task_stats_table import TaskStats
+from app.models.task_table import Task
+from app.utils.skill_rating import prior_rating
+
+
+class TaskStatsCRUD(CRUDBase[TaskStats]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, TaskStats)
+
+    async def get_by_task_id(self, task_id: int) -> TaskStats | None:
+        return await self.get_one(task_id=task_id)
+
+    @staticmethod
+    def _prior_rating(task_id):
+        return select(prior_rating(Task.difficulty)).where(Task.id == task_id).scalar_subquery()
+
+    async def record_attempt(self, history: TaskHistory, commit: bool = True) -> None:
+        solved = 1 if history.status == TaskSolutionStatusEnum.RIGHT_SOLUTION else 0
+        score = float(history.score or 0.0)
+        # инкремент одним UPDATE, без чтения строки; строки ещё нет — вставляем
+        stmt = (
+            update(self.model)
+            .where(self.model.task_id == history.task_id)
+            .values(
+                solve_count=self.model.solve_count + solved,
+                attempt_count=self.model.attempt_count + 1,
+                score_sum=self.model.score_sum + score,
+                mean_score=(self.model.score_sum + score) / (self.model.attempt_count + 1),
+                last_attempt_at=history.timestamp,
+            )
+        )
+        result = await self.db.execute(stmt)
+        if result.rowcount == 0:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(self.model).values(
+                        task_id=history.task_id, solve_count=solved, attempt_count=1,
+                        score_sum=score, mean_score=score, last_attempt_at=history.timestamp,
+                        rating=self._prior_rating(history.task_id),
+                    ))
+            except IntegrityError:
+                # строку успел вставить параллельный запрос
+                await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
+
+    async def ensure_task(self, task_id: int, commit: bool = True) -> None:
+        # одобренная задача сразу попадает в окно рейтинга, ещё до первой попытки
+        exists = await self.db.execute(select(self.model.task_id).where(self.model.task_id == task_id))
+        if exists.first() is None:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(self.model).values(
+                        task_id=task_id, solve_count=0, attempt_count=0, score_sum=0.0, mean_score=0.0,
+                        rating=self._prior_rating(task_id),
+                    ))
+            except IntegrityError:
+                pass
+        if commit:
+            await self.db.commit()
+
+    async def shift_rating(self, task_id: int, delta: float, commit: bool = True) -> None:
+        await self.db.execute(
+            update(self.model).where(self.model.task_id == task_id).values(rating=self.model.rating + delta)
+        )
+        if commit:
+            await self.db.commit()
+
+    async def rebuild(self) -> int:
+        # рейтинги сбрасываются к априорным, обученные восстанавливает SkillRatingService.refit
+        solved = case((TaskHistory.status == TaskSolutionStatusEnum.RIGHT_SOLUTION, 1), else_=0)
+        source = (
+            select(
+                Task.id,
+                func.coalesce(func.sum(solved), 0),
+                func.count(TaskHistory.id),
+                func.coalesce(func.sum(TaskHistory.score), 0.0),
+                func.coalesce(func.avg(TaskHistory.score), 0.0),
+                func.max(TaskHistory.timestamp),
+                prior_rating(Task.difficulty),
+            )
+            .join(TaskHistory, TaskHistory.task_id == Task.id, isouter=True)
+            .group_by(Task.id)
+        )
+        await self.db.execute(delete(self.model))
+        result = await self.db.execute(
+            insert(self.model).from_select(
+                ['task_id', 'solve_count', 'attempt_count', 'score_sum', 'mean_score', 'last_attempt_at', 'rating'],
+                source,
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def get_popular_task_ids(
+            self,
+            limit: int,
+            min_difficulty: int | None = None,
+            max_difficulty: int | None = None,
+    ) -> list[int]:
+        stmt = (
+            select(Task.id)
+            .join(self.model, self.model.task_id == Task.id)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .order_by(self.model.solve_count.desc(), Task.difficulty, Task.id)
+            .limit(limit)
+        )
+        if min_difficulty is not None:
+            stmt = stmt.where(Task.difficulty >= min_difficulty)
+        if max_difficulty is not None:
+            stmt = stmt.where(Task.difficulty <= max_difficulty)
+        return [int(task_id) for task_id in (await self.db.execute(stmt)).scalars().all()]
@@ -0,0 +1,33 @@
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.CRUD_base import CRUDBase
+from app.models.task_translation_table import TaskTranslation
+
+
+class TaskTranslationCRUD(CRUDBase[TaskTranslation]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, TaskTranslation)
+
+    async def get_translation(self, task_id: int, lang: str) -> TaskTranslation | None:
+        return await self.get_one(task_id=task_id, lang=lang)
+
+    async def get_translated_ids(self, task_ids: Sequence[int], lang: str) -> set[int]:
+        q = select(self.model.task_id).where(self.model.task_id.in_(task_ids)).where(self.model.lang == lang)
+        return set((await self.db.execute(q)).scalars().all())
+
+    async def bulk_replace(self, rows: Iterable[dict], commit: bool = True) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        await self.db.execute(
+            delete(self.model).where(
+                tuple_(self.model.task_id, self.model.lang).in_([(r['task_id'], r['lang']) for r in rows])
+            )
+        )
+        await self.db.execute(insert(self.model), rows)
+        if commit:
+            await self.db.commit()
+        return len(rows)
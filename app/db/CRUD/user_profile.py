@@ -0,0 +1,39 @@
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.CRUD_base import CRUDBase
+from app.models.user_profile_table import UserProfile
+
+
+class UserProfileCRUD(CRUDBase[UserProfile]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, UserProfile)
+
+    async def get_by_user_id(self, user_id: int) -> UserProfile | None:
+        return await self.get_one(user_id=user_id)
+
+
+    async def get_by_user_ids(self, user_ids: list[int]) -> list[UserProfile]:
+        return await self.get_all(self.model.user_id.in_(user_ids))
+
+
+    async def get_for_update(self, user_id: int) -> UserProfile:
+        # строка профиля блокируется до конца транзакции попытки: параллельные попытки
+        # одного пользователя применяются по очереди и не перетирают друг друга
+        stmt = (
+            select(self.model)
+            .filter_by(user_id=user_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        profile = (await self.db.execute(stmt)).scalars().first()
+        if profile is None:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(self.model).values(user_id=user_id))
+            except IntegrityError:
+                # профиль успел создать параллельный запрос
+                pass
+            profile = (await self.db.execute(stmt)).scalars().one()
+        return profile
@@ -0,0 +1,32 @@
+from typing import Iterable
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.CRUD_base import CRUDBase
+from app.models.user_recommendation_table import UserRecommendation
+
+
+class UserRecommendationCRUD(CRUDBase[UserRecommendation]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, UserRecommendation)
+
+    async def get_by_user_id(self, user_id: int) -> UserRecommendation | None:
+        return await self.get_one(user_id=user_id)
+
+    async def get_by_user_ids(self, user_ids: list[int]) -> list[UserRecommendation]:
+        return await self.get_all(self.model.user_id.in_(user_ids))
+
+    async def delete_by_user_id(self, user_id: int, commit: bool = True) -> int:
+        return await self.delete_by_filter(commit=commit, user_id=user_id)
+
+    async def bulk_replace(self, rows: Iterable[dict]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        await self.db.execute(
+            delete(self.model).where(self.model.user_id.in_([r['user_id'] for r in rows]))
+        )
+        await self.db.execute(insert(self.model), rows)
+        await self.db.commit()
+        return len(rows)
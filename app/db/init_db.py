@@ -12,7 +12,8 @@ logger = setup_logger(__name__)
 
 async def async_create_tables() -> None:
     try:
-        from app.models import user_table, task_table, task_history_table
+        from app.models import user_table, task_table, task_history_table, user_profile_table, \
+            user_recommendation_table, task_neighbour_table, task_stats_table, task_translation_table
 
         async with engine.begin() as conn:
             await conn.run_sync(BaseModel.metadata.create_all)
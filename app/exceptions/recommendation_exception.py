@@ -0,0 +1,18 @@
+from app.exceptions.base_exception import NotFound, PermissionDenied, ServiceException
+
+
+class PermissionDeniedRecommendation(PermissionDenied):
+    detail = 'Only teachers can request recommendations for other users'
+
+
+class RecommendationOverloaded(ServiceException):
+    status_code = 503
+    detail = 'Recommendation ranking queue is full, try again later'
+
+
+class PermissionDeniedSnapshot(PermissionDenied):
+    detail = 'Only admins can manage recommendation snapshots'
+
+
+class SnapshotNotFound(NotFound):
+    detail = 'Recommendation snapshot not found'
@@ -11,8 +11,12 @@ from starlette.responses import JSONResponse
 from app.api.exception_handlers import register_exception_handlers
 from app.api.v1.routers import users_router, tasks_router, task_history_router, auth_router, health_router, \
     recommendations_router
+from app.database import get_db_context
 from app.db.init_db import init_db
 from app.middleware.auth_middleware import AuthMiddleware
+from app.services.recommendation_service import RecommendationService
+from app.services.translation_worker import TranslationWorker, TRANSLATION_ON_APPROVE, TRANSLATION_QUEUE_PERSIST
+from app.utils.redis_client import redis_client
 
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
@@ -21,7 +25,16 @@ from opentelemetry.instrumentation.requests import RequestsInstrumentor
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    app.state.recommendation_service = RecommendationService()
+    async with get_db_context() as session:
+        await app.state.recommendation_service.warm_up(session)
+    if TRANSLATION_ON_APPROVE:
+        app.state.translation_worker = TranslationWorker(redis=redis_client if TRANSLATION_QUEUE_PERSIST else None)
+        await app.state.translation_worker.start()
     yield
+    if TRANSLATION_ON_APPROVE:
+        await app.state.translation_worker.stop()
+    app.state.recommendation_service.close()
 
 app = FastAPI(
     title="FastAPI",
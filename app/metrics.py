@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 REQUESTS = Counter(
     "http_requests_total", "Total HTTP requests", ["method","route","status_family"]
@@ -7,6 +7,32 @@ TASKS_CREATED = Counter("tasks_created_total", "Tasks created", ["subject","diff
 AUTH_LOGINS   = Counter("auth_login_total", "Auth login attempts", ["result"])
 RECO_LATENCY  = Histogram("recommendation_latency_seconds", "Reco latency",
                           buckets=(0.01,0.05,0.1,0.2,0.5,1,2))
+RECO_CACHE_REQUESTS = Counter("recommendation_cache_requests_total", "Reco cache lookups", ["tier","result"])
+RECO_RANK_QUEUE_DEPTH = Gauge("recommendation_rank_queue_depth", "Ranking jobs waiting or running in the pool")
+RECO_RANK_SECONDS = Histogram("recommendation_rank_seconds", "Ranking execution time inside the pool", ["engine"],
+                              buckets=(0.001,0.005,0.01,0.05,0.1,0.5,1,2))
+RECO_RANK_WAIT_SECONDS = Histogram("recommendation_rank_wait_seconds", "Ranking job wait before execution",
+                                   buckets=(0.001,0.005,0.01,0.05,0.1,0.5,1,2))
+RECO_CANDIDATES_SCANNED = Histogram("recommendation_candidates_scanned", "Candidate rows read before early stop",
+                                    buckets=(10,50,100,500,1000,5000,10000,50000))
+RECO_RANK_REJECTED = Counter("recommendation_rank_rejected_total", "Ranking jobs rejected by a full queue")
+RECO_SHADOW_SECONDS = Histogram("recommendation_shadow_rank_seconds", "Ranking time of the same request in shadow mode",
+                                ["role","engine"], buckets=(0.001,0.005,0.01,0.05,0.1,0.5,1,2))
+RECO_SHADOW_OVERLAP = Histogram("recommendation_shadow_overlap_at_k", "Share of served top-k also returned by the shadow engine",
+                                ["engine"], buckets=(0,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1))
+RECO_SHADOW_SCORE_DELTA = Histogram("recommendation_shadow_score_delta", "Primary-model mean relevance of shadow top-k minus primary top-k",
+                                    ["engine"], buckets=(-1,-0.5,-0.2,-0.1,-0.05,0,0.05,0.1,0.2,0.5,1))
+RECO_SHADOW_SKIPPED = Counter("recommendation_shadow_skipped_total", "Sampled requests not shadow-scored", ["reason"])
+TRANSLATION_BATCH_SIZE = Histogram("translation_batch_size", "Sentences per micro-batched translate call",
+                                   buckets=(1,2,4,8,16,32,64,128))
+TRANSLATION_QUEUE_DEPTH = Gauge("translation_decode_queue_depth", "Translation batches waiting or decoding")
+TRANSLATION_DECODE_SECONDS = Histogram("translation_decode_seconds", "CTranslate2 decoding time per batch",
+                                       buckets=(0.01,0.05,0.1,0.25,0.5,1,2,5,10))
+TRANSLATION_WAIT_SECONDS = Histogram("translation_decode_wait_seconds", "Translation batch wait for a decode thread",
+                                     buckets=(0.001,0.01,0.05,0.1,0.5,1,2,5))
+TRANSLATION_CACHE_REQUESTS = Counter("translation_cache_requests_total", "Translation cache lookups", ["tier","result"])
+TRANSLATION_JOBS = Counter("translation_jobs_total", "Translate-on-approve jobs", ["result"])
+TRANSLATION_JOB_QUEUE_DEPTH = Gauge("translation_job_queue_depth", "Tasks waiting for translate-on-approve")
 
 def status_family(code: int) -> str:
     return f"{code//100}xx"
\ No newline at end of file
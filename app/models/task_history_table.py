@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, Column, ForeignKey, DateTime, Enum, String, Float
+from sqlalchemy import Integer, Column, ForeignKey, DateTime, Enum, String, Float, Index
 from sqlalchemy.orm import relationship
 
 from app.enums.task_solution_status import TaskSolutionStatusEnum
@@ -9,6 +9,8 @@ from app.models.base_db_models import Base
 
 class TaskHistory(Base):
     __tablename__ = 'task_history'
+    # анти-джойн «пользователь уже решал задачу» в подборе рекомендаций
+    __table_args__ = (Index('ix_task_history_user_task', 'user_id', 'task_id'),)
 
     id = Column(Integer, primary_key=True, index=True)
 
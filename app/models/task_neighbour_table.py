@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float
+
+from app.models.base_db_models import Base
+
+
+class TaskNeighbour(Base):
+    __tablename__ = 'task_neighbours'
+
+    # Предпосчитанные top-K похожих задач: (task_id, neighbour_id) -> близость
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    neighbour_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True, index=True)
+    score = Column(Float, nullable=False)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Index
+
+from app.models.base_db_models import Base
+
+
+class TaskStats(Base):
+    __tablename__ = 'task_stats'
+    # популярные задачи: ORDER BY solve_count DESC по индексу; окно рейтинга — range scan
+    __table_args__ = (
+        Index('ix_task_stats_solve_count', 'solve_count'),
+        Index('ix_task_stats_rating', 'rating'),
+    )
+
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+
+    # Агрегаты по task_history, обновляются при каждой попытке
+    solve_count = Column(Integer, nullable=False, default=0)
+    attempt_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    mean_score = Column(Float, nullable=False, default=0.0)
+    last_attempt_at = Column(DateTime, nullable=True)
+
+    # сложность задачи в логитах (IRT), начальное значение — из авторской сложности
+    rating = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 
 from app.enums.task_moderation_status import TaskStatusEnum
@@ -7,6 +7,8 @@ from app.models.base_db_models import BaseModel
 
 class Task(BaseModel):
    __tablename__ = 'tasks'
+   # окно сложности по одобренным задачам при подборе кандидатов
+   __table_args__ = (Index('ix_tasks_status_difficulty', 'status', 'difficulty'),)
 
 
    id = Column(Integer, primary_key=True, index=True)
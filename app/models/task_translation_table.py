@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime
+
+from app.models.base_db_models import Base
+
+
+class TaskTranslation(Base):
+    __tablename__ = 'task_translations'
+
+    # Машинный перевод задачи на язык lang, пишется офлайн-джобой и воркером одобрения
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    lang = Column(String(8), primary_key=True)
+    model_version = Column(String, nullable=False)
+    problem = Column(Text, nullable=False)
+    solution = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    translated_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+
+from app.models.base_db_models import BaseModel
+
+
+class UserProfile(BaseModel):
+    __tablename__ = 'user_profiles'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), unique=True, index=True, nullable=False)
+
+    # Агрегаты истории решений, обновляются инкрементально на каждую попытку
+    subject_weights = Column(JSON, nullable=False, default=dict)
+    difficulty_weighted_sum = Column(Float, nullable=False, default=0.0)
+    difficulty_weight_total = Column(Float, nullable=False, default=0.0)
+    solved_task_ids = Column(JSON, nullable=False, default=list)
+    attempts_count = Column(Integer, nullable=False, default=0)
+
+    # Рейтинг умения (IRT, логиты): обновляется на каждую попытку, пересобирается refit_ratings.py
+    skill_rating = Column(Float, nullable=False, default=0.0)
+    rating_attempts = Column(Integer, nullable=False, default=0)
+
+    user = relationship('User', back_populates='profile')
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, ForeignKey, JSON, DateTime
+
+from app.models.base_db_models import Base
+
+
+class UserRecommendation(Base):
+    __tablename__ = 'user_recommendations'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    # Предпосчитанный top-N (список RankedTask в виде dict), пишется офлайн-джобой
+    items = Column(JSON, nullable=False, default=list)
+    computed_at = Column(DateTime, default=datetime.now, nullable=False)
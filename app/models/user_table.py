@@ -3,6 +3,8 @@ from sqlalchemy.orm import relationship
 
 from app.enums.user_role import UserRoleEnum
 from app.models.base_db_models import BaseModel
+from app.models.user_profile_table import UserProfile
+from app.models.user_recommendation_table import UserRecommendation
 
 class User(BaseModel):
     __tablename__ = 'users'
@@ -14,6 +16,8 @@ class User(BaseModel):
     is_active = Column(Boolean, default=True)
 
     task_history = relationship('TaskHistory', back_populates='user', cascade='all, delete')
+    profile = relationship(UserProfile, back_populates='user', cascade='all, delete', uselist=False)
+    precomputed_recommendations = relationship(UserRecommendation, cascade='all, delete', uselist=False)
 
     role = Column(Enum(UserRoleEnum), default=UserRoleEnum.STUDENT)
     tasks = relationship('Task', back_populates='creator', cascade='all, delete')
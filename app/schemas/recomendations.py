@@ -10,3 +10,21 @@ class RecommendationItem(BaseModel):
 
 class RecommendationsResponse(BaseModel):
     items: list[RecommendationItem]
+
+
+class BatchRecommendationsRequest(BaseModel):
+    user_ids: list[int] = Field(min_length=1, max_length=200)
+    n: int = Field(5, ge=1, le=50)
+
+class UserRecommendations(BaseModel):
+    user_id: int
+    items: list[RecommendationItem]
+
+class BatchRecommendationsResponse(BaseModel):
+    results: list[UserRecommendations]
+
+
+class SnapshotsResponse(BaseModel):
+    current: str | None
+    loaded: str | None
+    versions: list[str]
@@ -28,9 +28,26 @@ class TaskUpdate(TaskBase):
     creator_id: int | None = None
 
 
+class TaskTranslationOut(BaseModel):
+    lang: str
+    model_version: str
+    problem: str
+    solution: str
+    answer: str
+
+
 class TaskOut(TaskBase):
     id: int
     status: TaskStatusEnum
+    translation: TaskTranslationOut | None = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class SimilarTaskOut(BaseModel):
+    id: int
+    subject: str
+    problem: str
+    difficulty: int
+    score: float
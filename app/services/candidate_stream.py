@@ -0,0 +1,48 @@
+import heapq
+from typing import List, Tuple
+
+# Предварительная оценка кандидата до загрузки текстов: те же веса сложности и темы,
+# что у ContentRanker. Строки идут по возрастанию расстояния до целевой сложности,
+# поэтому оценка всех оставшихся строк ограничена сверху prescore_bound(distance).
+DIFFICULTY_WEIGHT = 0.4
+SUBJECT_WEIGHT = 0.3
+PREFERRED_BONUS = 1.5
+
+
+def prescore(distance: float, preferred: bool) -> float:
+    return DIFFICULTY_WEIGHT / (1.0 + distance) + SUBJECT_WEIGHT * (PREFERRED_BONUS if preferred else 1.0)
+
+
+def prescore_bound(distance: float) -> float:
+    return prescore(distance, preferred=True)
+
+
+class CandidateHeap:
+    # top-k по предварительной оценке; при равенстве выигрывает строка, пришедшая раньше
+    # (поток отсортирован по популярности внутри одного расстояния)
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.scanned = 0
+        self._heap: List[Tuple[float, int, tuple]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._heap) >= self.limit
+
+    def push(self, score: float, row: tuple) -> None:
+        self.scanned += 1
+        item = (score, -self.scanned, row)
+        if not self.is_full:
+            heapq.heappush(self._heap, item)
+        elif self._heap and item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def can_improve(self, bound: float) -> bool:
+        # оставшиеся строки оцениваются не выше bound и проигрывают равенство уже взятым
+        return not self.is_full or (bool(self._heap) and bound > self._heap[0][0])
+
+    def rows(self) -> List[tuple]:
+        return [row for _, _, row in sorted(self._heap, reverse=True)]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+from app.exceptions.recommendation_exception import RecommendationOverloaded
+from app.logger import setup_logger
+from app.metrics import RECO_RANK_QUEUE_DEPTH, RECO_RANK_REJECTED, RECO_RANK_SECONDS, RECO_RANK_WAIT_SECONDS
+from app.services.recommendation_engines.base import BaseRanker
+
+logger = setup_logger(__name__)
+
+# thread — пул потоков (numpy/scipy отпускают GIL), process — пул процессов с копией ранжировщиков,
+# inline — прямо в event loop (отладка, тесты)
+RECO_RANK_EXECUTOR = os.getenv('RECO_RANK_EXECUTOR', 'thread')
+RECO_RANK_WORKERS = int(os.getenv('RECO_RANK_WORKERS', 2))
+# сколько задач ранжирования может ждать или выполняться одновременно, сверх — 503
+RECO_RANK_QUEUE_SIZE = int(os.getenv('RECO_RANK_QUEUE_SIZE', 64))
+
+MODES = ('thread', 'process', 'inline')
+
+_worker_rankers: Dict[str, BaseRanker] = {}
+
+
+def _init_worker(rankers: Dict[str, BaseRanker]) -> None:
+    global _worker_rankers
+    _worker_rankers = rankers
+
+
+def _run(rankers: Dict[str, BaseRanker], engine: str, method: str, payload, n, submitted: float) -> Tuple[float, float, Any]:
+    # time.time(), а не perf_counter: момент постановки в очередь сравнивается между процессами
+    started = time.time()
+    t0 = time.perf_counter()
+    result = getattr(rankers[engine], method)(payload, n)
+    return started - submitted, time.perf_counter() - t0, result
+
+
+def _run_in_worker(engine: str, method: str, payload, n, submitted: float) -> Tuple[float, float, Any]:
+    return _run(_worker_rankers, engine, method, payload, n, submitted)
+
+
+class RankingExecutor:
+    # Выносит CPU-нагрузку ранжирования из event loop. Через границу пула передаются только
+    # RankingRequest/BatchRankingRequest (массивы кандидатов) и имя движка; в процессы
+    # сами ранжировщики (индекс, факторы ALS) попадают один раз через initializer.
+    def __init__(
+            self,
+            mode: str = RECO_RANK_EXECUTOR,
+            workers: int = RECO_RANK_WORKERS,
+            queue_size: int = RECO_RANK_QUEUE_SIZE,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f'Unknown ranking executor mode: {mode}')
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self._rankers: Dict[str, BaseRanker] = {}
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def set_rankers(self, rankers: Dict[str, BaseRanker]) -> None:
+        with self._lock:
+            self._rankers = dict(rankers)
+            if self.mode == 'process' and self._pool is not None:
+                # процессы держат снимок ранжировщиков: после reload пул пересоздаётся,
+                # уже отправленные задачи доработают в старом
+                old, self._pool = self._pool, None
+                old.shutdown(wait=False)
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.mode == 'thread':
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='reco-rank')
+                else:
+                    # spawn, а не fork: у процесса сервера уже есть потоки (aiosqlite, OTel)
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                        initargs=(self._rankers,),
+                    )
+                logger.info(f'Ranking pool started: mode={self.mode}, workers={self.workers}')
+            return self._pool
+
+    async def rank(self, ranker: BaseRanker, request, n: Optional[int] = None):
+        return await self._submit(ranker, 'rank', request, n)
+
+    async def rank_batch(self, ranker: BaseRanker, batch, n: int):
+        return await self._submit(ranker, 'rank_batch', batch, n)
+
+    async def _submit(self, ranker: BaseRanker, method: str, payload, n):
+        if self.mode == 'inline':
+            _, elapsed, result = _run({ranker.name: ranker}, ranker.name, method, payload, n, time.time())
+            RECO_RANK_SECONDS.labels(ranker.name).observe(elapsed)
+            return result
+
+        if self._pending >= self.queue_size:
+            RECO_RANK_REJECTED.inc()
+            raise RecommendationOverloaded()
+        self._pending += 1
+        RECO_RANK_QUEUE_DEPTH.inc()
+        try:
+            if self.mode == 'thread':
+                call = partial(_run, {ranker.name: ranker}, ranker.name, method, payload, n, time.time())
+            else:
+                call = partial(_run_in_worker, ranker.name, method, payload, n, time.time())
+            wait, elapsed, result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+        finally:
+            self._pending -= 1
+            RECO_RANK_QUEUE_DEPTH.dec()
+        RECO_RANK_WAIT_SECONDS.observe(max(wait, 0.0))
+        RECO_RANK_SECONDS.labels(ranker.name).observe(elapsed)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime
+from functools import cached_property
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.logger import setup_logger
+from app.services.recommendation_engines.als import ALSModel
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_cooccurrence import TaskCooccurrence
+from app.services.task_text_index import TaskTextIndex
+
+logger = setup_logger(__name__)
+
+# Версионированные снимки состояния рекомендаций:
+#   <root>/<version>/{task_index,task_cooccurrence,als_model,task_ann}/*.npy + manifest.json
+#   <root>/CURRENT — имя активной версии, меняется атомарно (os.replace)
+RECO_SNAPSHOT_ROOT = os.getenv('RECO_SNAPSHOT_ROOT', 'data/reco_snapshots')
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+
+class RecoSnapshot:
+    # части загружаются при первом обращении; массивы открываются через mmap,
+    # так что воркеры на одной машине делят страницы через page cache
+    def __init__(self, version: str, path: str) -> None:
+        self.version = version
+        self.path = path
+
+    @cached_property
+    def manifest(self) -> dict:
+        with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    @cached_property
+    def index(self) -> TaskTextIndex:
+        return TaskTextIndex.load(os.path.join(self.path, 'task_index')) or TaskTextIndex()
+
+    @cached_property
+    def cooccurrence(self) -> TaskCooccurrence:
+        return TaskCooccurrence.load(os.path.join(self.path, 'task_cooccurrence')) or TaskCooccurrence()
+
+    @cached_property
+    def als_model(self) -> ALSModel:
+        return ALSModel.load(os.path.join(self.path, 'als_model')) or ALSModel()
+
+    @cached_property
+    def ann_index(self) -> TaskAnnIndex:
+        return TaskAnnIndex.load(os.path.join(self.path, 'task_ann'), text_index=self.index) or TaskAnnIndex()
+
+
+class SnapshotStore:
+    def __init__(self, root: str = RECO_SNAPSHOT_ROOT) -> None:
+        self.root = root
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def exists(self, version: str) -> bool:
+        return version in self.versions()
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if self.exists(version) else None
+
+    def current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(os.path.join(self.root, CURRENT_FILE)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def open(self, version: str) -> Optional[RecoSnapshot]:
+        if not self.exists(version):
+            return None
+        return RecoSnapshot(version, os.path.join(self.root, version))
+
+    def publish(self, version: str) -> None:
+        # запись во временный файл и rename: читатели видят либо старую, либо новую версию
+        tmp = os.path.join(self.root, f'.{CURRENT_FILE}.{os.getpid()}')
+        with open(tmp, 'w') as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+        logger.info(f'Recommendation snapshot published: {version}')
+
+    def prune(self, keep: int) -> List[str]:
+        current = self.current_version()
+        stale = [v for v in self.versions()[:-keep] if v != current] if keep > 0 else []
+        for version in stale:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+        return stale
+
+    async def build(
+            self,
+            session: AsyncSession,
+            version: Optional[str] = None,
+            als_factors: int = 32,
+            ann_components: int = 128,
+    ) -> str:
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.root, version)
+        # сборка во временный каталог: недособранная версия не видна в versions()
+        tmp = os.path.join(self.root, f'.build-{version}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        index = await TaskTextIndex.build(session)
+        index.save(os.path.join(tmp, 'task_index'))
+        cooccurrence = await TaskCooccurrence.build(session)
+        cooccurrence.save(os.path.join(tmp, 'task_cooccurrence'))
+        als_model = await ALSModel.build(session, factors=als_factors)
+        als_model.save(os.path.join(tmp, 'als_model'))
+        ann_index = TaskAnnIndex.fit(index, n_components=ann_components)
+        if not ann_index.is_empty:
+            ann_index.save(os.path.join(tmp, 'task_ann'))
+
+        manifest = {
+            'version': version,
+            'built_at': datetime.now().isoformat(),
+            'tasks': len(index),
+            'cooccurrence_nnz': int(cooccurrence.matrix.nnz),
+            'als_users': len(als_model.user_ids),
+            'ann_tasks': len(ann_index),
+        }
+        with open(os.path.join(tmp, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+        logger.info(f'Recommendation snapshot built: {manifest}')
+        return version
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.logger import setup_logger
+from app.models.task_history_table import TaskHistory
+from app.services.recommendation_engines.base import BaseRanker, BatchRankingRequest, RankedTask
+from app.services.recommendation_service import RecommendationService
+
+logger = setup_logger(__name__)
+
+RECO_PRECOMPUTE_N = int(os.getenv('RECO_PRECOMPUTE_N', 50))
+RECO_ACTIVE_DAYS = int(os.getenv('RECO_ACTIVE_DAYS', 30))
+
+
+async def load_active_user_ids(session: AsyncSession, since: datetime) -> List[int]:
+    return list((await session.execute(
+        select(distinct(TaskHistory.user_id)).where(TaskHistory.timestamp >= since)
+    )).scalars().all())
+
+
+async def build_ranking_batches(
+        service: RecommendationService,
+        session: AsyncSession,
+        user_ids: Sequence[int],
+        chunk_size: int = 256,
+) -> List[BatchRankingRequest]:
+    # на пачку пользователей — по одному запросу за профилями, историей и общим пулом кандидатов,
+    # тот же путь, что у онлайн-рекомендаций для группы (get_batch_recommendations)
+    batches: List[BatchRankingRequest] = []
+    for start in range(0, len(user_ids), chunk_size):
+        batch = await service.batch_ranking_request(session, user_ids[start:start + chunk_size])
+        if batch is not None:
+            batches.append(batch)
+    return batches
+
+
+_worker_ranker: Optional[BaseRanker] = None
+
+
+def _init_worker(ranker: BaseRanker) -> None:
+    global _worker_ranker
+    _worker_ranker = ranker
+
+
+def _rank_batch(batch: BatchRankingRequest, n: int) -> List[Tuple[int, List[RankedTask]]]:
+    # пачка ранжируется матрицей пользователи x кандидаты
+    return list(zip(batch.user_ids, _worker_ranker.rank_batch(batch, n)))
+
+
+def rank_batches(
+        ranker: BaseRanker,
+        batches: Sequence[BatchRankingRequest],
+        n: int = RECO_PRECOMPUTE_N,
+        workers: int = 1,
+) -> List[Tuple[int, List[RankedTask]]]:
+    if workers <= 1 or len(batches) <= 1:
+        _init_worker(ranker)
+        return [item for batch in batches for item in _rank_batch(batch, n)]
+
+    # ранжировщик передаётся в каждый процесс один раз через initializer;
+    # spawn, а не fork: у вызывающего процесса уже есть потоки (aiosqlite, OTel)
+    results: List[Tuple[int, List[RankedTask]]] = []
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(ranker,),
+    ) as pool:
+        for batch_result in pool.map(_rank_batch, batches, [n] * len(batches)):
+            results.extend(batch_result)
+    return results
+
+
+async def rank_users(
+        service: RecommendationService,
+        session: AsyncSession,
+        user_ids: Sequence[int],
+        n: int = RECO_PRECOMPUTE_N,
+        workers: int = 1,
+        chunk_size: int = 256,
+) -> List[Tuple[int, List[dict]]]:
+    batches = await build_ranking_batches(service, session, user_ids, chunk_size)
+    results = rank_batches(service.ranker(), batches, n, workers)
+    # тексты подтягиваются одним запросом на всех, как в онлайн-пути
+    await service.attach_problems(session, [r for _, ranked in results for r in ranked])
+    return [(user_id, [asdict(r) for r in ranked]) for user_id, ranked in results]
+
+
+def active_since(days: int = RECO_ACTIVE_DAYS) -> datetime:
+    return datetime.now() - timedelta(days=days)
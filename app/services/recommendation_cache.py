@@ -0,0 +1,152 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from app.logger import setup_logger
+from app.metrics import RECO_CACHE_REQUESTS
+from app.utils.redis_client import redis_client
+
+logger = setup_logger(__name__)
+
+RECO_CACHE_TTL = int(os.getenv('RECO_CACHE_TTL', 3600))
+RECO_CACHE_LOCAL_TTL = float(os.getenv('RECO_CACHE_LOCAL_TTL', 30))
+RECO_CACHE_LRU_SIZE = int(os.getenv('RECO_CACHE_LRU_SIZE', 1024))
+RECO_CACHE_PREFIX = 'reco'
+# счётчики поколений: общий (invalidate_all) и на пользователя (invalidate_user);
+# запись в кэше помечена поколением, при котором начат расчёт, и с другим поколением не отдаётся
+RECO_CACHE_GENERATION_KEY = f'{RECO_CACHE_PREFIX}:gen'
+
+
+class RecommendationCache:
+    # Двухуровневый кэш top-n: LRU в процессе перед Redis.
+    # Локальные записи живут недолго (RECO_CACHE_LOCAL_TTL), так как инвалидация
+    # из соседних воркеров доходит только до Redis.
+    # Расчёт, закончившийся после инвалидации, не записывает результат: set сверяет поколение,
+    # полученное через generation() до расчёта, с текущим.
+    def __init__(
+            self,
+            redis: Optional[Redis] = redis_client,
+            lru_size: int = RECO_CACHE_LRU_SIZE,
+            ttl: int = RECO_CACHE_TTL,
+            local_ttl: float = RECO_CACHE_LOCAL_TTL,
+    ) -> None:
+        self._redis = redis
+        self._lru: OrderedDict[Tuple[int, int], Tuple[float, List[dict]]] = OrderedDict()
+        self.lru_size = lru_size
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        # поколения без Redis: только в пределах процесса
+        self._generation = 0
+        self._user_generations: Dict[int, int] = {}
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f'{RECO_CACHE_PREFIX}:{user_id}'
+
+    @staticmethod
+    def _generation_keys(user_id: int) -> List[str]:
+        return [RECO_CACHE_GENERATION_KEY, f'{RECO_CACHE_GENERATION_KEY}:{user_id}']
+
+    @staticmethod
+    def _token(values) -> str:
+        return '.'.join(str(int(v or 0)) for v in values)
+
+    async def generation(self, user_id: int) -> Optional[str]:
+        if self._redis is None:
+            return self._token([self._generation, self._user_generations.get(user_id)])
+        try:
+            return self._token(await self._redis.mget(self._generation_keys(user_id)))
+        except Exception as e:
+            logger.warning(f'Recommendation cache generation read failed: {e}')
+            return None
+
+    async def get(self, user_id: int, n: int) -> Optional[List[dict]]:
+        entry = self._lru.get((user_id, n))
+        if entry is not None and entry[0] > time.monotonic():
+            self._lru.move_to_end((user_id, n))
+            RECO_CACHE_REQUESTS.labels(tier='local', result='hit').inc()
+            return entry[1]
+        RECO_CACHE_REQUESTS.labels(tier='local', result='miss').inc()
+
+        if self._redis is None:
+            return None
+        try:
+            # поколения и запись одним запросом
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.mget(self._generation_keys(user_id))
+                pipe.hget(self._key(user_id), str(n))
+                generations, raw = await pipe.execute()
+        except Exception as e:
+            logger.warning(f'Recommendation cache read failed: {e}')
+            return None
+        entry = json.loads(raw) if raw is not None else None
+        if not isinstance(entry, dict) or entry.get('generation') != self._token(generations):
+            RECO_CACHE_REQUESTS.labels(tier='redis', result='miss').inc()
+            return None
+
+        RECO_CACHE_REQUESTS.labels(tier='redis', result='hit').inc()
+        items = entry['items']
+        self._put_local(user_id, n, items)
+        return items
+
+    async def set(self, user_id: int, n: int, items: List[dict], generation: Optional[str] = None) -> None:
+        # generation — значение generation() до расчёта; None — записать без проверки
+        if self._redis is None:
+            if generation is None or generation == await self.generation(user_id):
+                self._put_local(user_id, n, items)
+            return
+        try:
+            current = self._token(await self._redis.mget(self._generation_keys(user_id)))
+            if generation is not None and generation != current:
+                logger.info(f'Recommendation cache write skipped, invalidated during compute, user_id={user_id}')
+                return
+            self._put_local(user_id, n, items)
+            payload = json.dumps({'generation': current, 'items': items}, ensure_ascii=False)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(self._key(user_id), str(n), payload)
+                pipe.expire(self._key(user_id), self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f'Recommendation cache write failed: {e}')
+
+    async def invalidate_user(self, user_id: int) -> None:
+        for key in [k for k in self._lru if k[0] == user_id]:
+            del self._lru[key]
+        if self._redis is None:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            return
+        generation_key = self._generation_keys(user_id)[1]
+        try:
+            # счётчик живёт дольше любой записи, помеченной его прежним значением
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, self.ttl)
+                pipe.delete(self._key(user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f'Recommendation cache invalidation failed, user_id={user_id}: {e}')
+
+    async def invalidate_all(self) -> None:
+        # старые записи не удаляются: с прежним поколением они не отдаются и истекают по TTL
+        self._lru.clear()
+        if self._redis is None:
+            self._generation += 1
+            self._user_generations.clear()
+            return
+        try:
+            await self._redis.incr(RECO_CACHE_GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f'Recommendation cache invalidation failed: {e}')
+
+    def _put_local(self, user_id: int, n: int, items: List[dict]) -> None:
+        self._lru[(user_id, n)] = (time.monotonic() + self.local_ttl, items)
+        self._lru.move_to_end((user_id, n))
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+
+recommendation_cache = RecommendationCache()
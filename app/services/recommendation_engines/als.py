@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.logger import setup_logger
+from app.models.task_history_table import TaskHistory
+from app.models.task_table import Task
+from app.services.recommendation_engines.base import BaseRanker, BatchRankingRequest, RankedTask, RankingRequest, \
+    top_n, top_n_rows
+
+logger = setup_logger(__name__)
+
+ALS_MODEL_PATH = os.getenv('RECO_ALS_PATH', 'data/als_model')
+
+
+# Implicit ALS (Hu, Koren, Volinsky): предпочтение p_ui = 1 для любой попытки,
+# уверенность c_ui = 1 + alpha * score (score нормирован в [0, 1])
+class ALSModel:
+    FILES = ('user_ids', 'user_factors', 'task_ids', 'item_factors', 'params')
+
+    def __init__(
+            self,
+            user_ids: Optional[Sequence[int]] = None,
+            user_factors: Optional[np.ndarray] = None,
+            task_ids: Optional[Sequence[int]] = None,
+            item_factors: Optional[np.ndarray] = None,
+            regularization: float = 0.1,
+            alpha: float = 40.0,
+    ) -> None:
+        self.user_ids = np.asarray(user_ids if user_ids is not None else [], dtype=np.int64)
+        self.task_ids = np.asarray(task_ids if task_ids is not None else [], dtype=np.int64)
+        k = item_factors.shape[1] if item_factors is not None else 0
+        self.user_factors = user_factors if user_factors is not None else np.zeros((len(self.user_ids), k), np.float32)
+        self.item_factors = item_factors if item_factors is not None else np.zeros((len(self.task_ids), k), np.float32)
+        self.regularization = regularization
+        self.alpha = alpha
+        self._user_pos: Dict[int, int] = {int(u): i for i, u in enumerate(self.user_ids)}
+        self._task_pos: Dict[int, int] = {int(t): i for i, t in enumerate(self.task_ids)}
+        # Y^T Y нужен для fold-in новых пользователей, считаем один раз
+        item = self.item_factors.astype(np.float64)
+        self._gram = item.T @ item
+
+    @property
+    def is_empty(self) -> bool:
+        return self.item_factors.shape[0] == 0 or self.item_factors.shape[1] == 0
+
+    @property
+    def factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def positions(self, task_ids: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self._task_pos.get(int(t), -1) for t in task_ids), dtype=np.int64, count=len(task_ids))
+
+    @classmethod
+    def fit(
+            cls,
+            interactions: sparse.csr_matrix,
+            user_ids: Sequence[int],
+            task_ids: Sequence[int],
+            factors: int = 32,
+            regularization: float = 0.1,
+            alpha: float = 40.0,
+            iterations: int = 10,
+            seed: int = 42,
+    ) -> ALSModel:
+        # interactions: пользователи x задачи, значения score в [0, 1]
+        confidence = interactions.tocsr().astype(np.float64)
+        confidence.data = 1.0 + alpha * confidence.data
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        x = rng.normal(scale=0.01, size=(confidence.shape[0], factors))
+        y = rng.normal(scale=0.01, size=(confidence.shape[1], factors))
+        for _ in range(iterations):
+            x = cls._solve(confidence, y, regularization)
+            y = cls._solve(confidence_t, x, regularization)
+
+        return cls(
+            user_ids, x.astype(np.float32), task_ids, y.astype(np.float32),
+            regularization=regularization, alpha=alpha,
+        )
+
+    @staticmethod
+    def _solve(confidence: sparse.csr_matrix, fixed: np.ndarray, regularization: float) -> np.ndarray:
+        # для каждой строки: (Y^T Y + Y_u^T (C_u - I) Y_u + λI) x_u = Y_u^T C_u p_u
+        k = fixed.shape[1]
+        gram = fixed.T @ fixed + regularization * np.eye(k)
+        out = np.zeros((confidence.shape[0], k))
+        indptr, indices, data = confidence.indptr, confidence.indices, confidence.data
+        for row in range(confidence.shape[0]):
+            start, end = indptr[row], indptr[row + 1]
+            if start == end:
+                continue
+            y = fixed[indices[start:end]]
+            c = data[start:end]
+            a = gram + (y.T * (c - 1.0)) @ y
+            out[row] = np.linalg.solve(a, y.T @ c)
+        return out
+
+    @classmethod
+    async def build(
+            cls,
+            session: AsyncSession,
+            factors: int = 32,
+            regularization: float = 0.1,
+            alpha: float = 40.0,
+            iterations: int = 10,
+    ) -> ALSModel:
+        q = (
+            select(TaskHistory.user_id, TaskHistory.task_id, func.max(TaskHistory.score))
+            .join(Task, Task.id == TaskHistory.task_id)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .group_by(TaskHistory.user_id, TaskHistory.task_id)
+        )
+        rows = (await session.execute(q)).all()
+        if not rows:
+            return cls()
+
+        users = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        tasks = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        scores = np.fromiter((float(r[2] or 0.0) for r in rows), dtype=np.float64, count=len(rows))
+        user_ids, user_pos = np.unique(users, return_inverse=True)
+        task_ids, task_pos = np.unique(tasks, return_inverse=True)
+        peak = scores.max()
+        values = np.clip(scores / peak, 0.0, 1.0) if peak > 0 else np.zeros_like(scores)
+
+        interactions = sparse.csr_matrix((values, (user_pos, task_pos)), shape=(len(user_ids), len(task_ids)))
+        model = cls.fit(interactions, user_ids, task_ids, factors, regularization, alpha, iterations)
+        logger.info(f'ALS model trained: users={len(user_ids)}, tasks={len(task_ids)}, '
+                    f'interactions={len(rows)}, factors={factors}')
+        return model
+
+    def save(self, path: str = ALS_MODEL_PATH) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'user_ids.npy'), self.user_ids)
+        np.save(os.path.join(path, 'user_factors.npy'), self.user_factors)
+        np.save(os.path.join(path, 'task_ids.npy'), self.task_ids)
+        np.save(os.path.join(path, 'item_factors.npy'), self.item_factors)
+        np.save(os.path.join(path, 'params.npy'), np.array([self.regularization, self.alpha]))
+        logger.info(f'ALS model saved to {path}')
+
+    @classmethod
+    def load(cls, path: str = ALS_MODEL_PATH, mmap: bool = True) -> Optional[ALSModel]:
+        if not all(os.path.exists(os.path.join(path, f'{name}.npy')) for name in cls.FILES):
+            return None
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in cls.FILES}
+        regularization, alpha = (float(v) for v in arrays['params'])
+        model = cls(
+            np.asarray(arrays['user_ids']), arrays['user_factors'],
+            np.asarray(arrays['task_ids']), arrays['item_factors'],
+            regularization=regularization, alpha=alpha,
+        )
+        logger.info(f'ALS model loaded from {path}: users={len(model.user_ids)}, tasks={len(model)}')
+        return model
+
+    def user_vector(self, user_id: Optional[int], solved_task_ids: Sequence[int] = ()) -> Optional[np.ndarray]:
+        pos = self._user_pos.get(int(user_id)) if user_id is not None else None
+        if pos is not None:
+            return np.asarray(self.user_factors[pos])
+
+        # пользователя не было при обучении — fold-in по решённым задачам, один шаг ALS
+        solved = self.positions(solved_task_ids)
+        solved = solved[solved >= 0]
+        if self.is_empty or not len(solved):
+            return None
+        y = np.asarray(self.item_factors[solved], dtype=np.float64)
+        c = 1.0 + self.alpha
+        a = self._gram + (c - 1.0) * (y.T @ y) + self.regularization * np.eye(self.factors)
+        return np.linalg.solve(a, c * y.sum(axis=0)).astype(np.float32)
+
+    def scores(self, user_vector: np.ndarray, candidate_ids: Sequence[int]) -> np.ndarray:
+        cand = self.positions(candidate_ids)
+        known = cand >= 0
+        out = np.zeros(len(candidate_ids), dtype=np.float32)
+        if not known.any():
+            return out
+        out[known] = self.item_factors[cand[known]] @ user_vector
+        # задач, появившихся после обучения, в модели нет — ставим их в конец
+        out[~known] = out[known].min()
+        return out
+
+
+class ALSRanker(BaseRanker):
+    name = 'als'
+
+    def __init__(self, model: Optional[ALSModel] = None, fallback: Optional[BaseRanker] = None) -> None:
+        self.model = model if model is not None else ALSModel()
+        # пользователи без известных модели задач ранжируются запасным движком
+        self.fallback = fallback
+
+    @property
+    def is_ready(self) -> bool:
+        return not self.model.is_empty
+
+    def rank(self, request: RankingRequest, n: Optional[int] = None) -> List[RankedTask]:
+        if not len(request):
+            return []
+        vector = self.model.user_vector(request.user_id, request.solved_task_ids) if self.is_ready else None
+        if vector is None:
+            return self.fallback.rank(request, n) if self.fallback is not None else []
+
+        totals = self.model.scores(vector, request.ids)
+        difficulty_scores = 1.0 / (1.0 + np.abs(request.difficulties - request.optimal_difficulty))
+        return [
+            self._ranked(request.ids, request.subjects, request.problems, request.difficulties, i,
+                         totals[i], difficulty_scores[i])
+            for i in top_n(totals, n)
+        ]
+
+    def rank_batch(self, batch: BatchRankingRequest, n: int) -> List[List[RankedTask]]:
+        results: List[Optional[List[RankedTask]]] = [None] * len(batch)
+        if not len(batch.ids):
+            return [[] for _ in range(len(batch))]
+
+        vectors, rows = [], []
+        for row, user_id in enumerate(batch.user_ids):
+            vector = self.model.user_vector(user_id, batch.solved_task_ids[row]) if self.is_ready else None
+            if vector is None:
+                results[row] = self.fallback.rank(batch.request_for(row), n) if self.fallback is not None else []
+            else:
+                vectors.append(vector)
+                rows.append(row)
+
+        if rows:
+            # все пользователи с векторами — одно произведение (users x k) @ (k x candidates)
+            cand = self.model.positions(batch.ids)
+            known = cand >= 0
+            totals = np.zeros((len(rows), len(batch.ids)), dtype=np.float32)
+            if known.any():
+                totals[:, known] = np.stack(vectors) @ np.asarray(self.model.item_factors[cand[known]]).T
+                totals[:, ~known] = totals[:, known].min(axis=1, keepdims=True)
+            totals[batch.attempted[rows]] = -np.inf
+            difficulty_scores = 1.0 / (1.0 + np.abs(batch.difficulties[None, :] - batch.optimal_difficulty[rows, None]))
+            for k, top in enumerate(top_n_rows(totals, n)):
+                results[rows[k]] = [
+                    self._ranked(batch.ids, batch.subjects, batch.problems, batch.difficulties, i,
+                                 totals[k, i], difficulty_scores[k, i])
+                    for i in top
+                ]
+        return results
+
+    @staticmethod
+    def _ranked(ids, subjects, problems, difficulties, i: int, score: float, difficulty_score: float) -> RankedTask:
+        reason = "её решают похожие на вас пользователи"
+        if difficulty_score > 0.7:
+            reason += " и оптимальная сложность"
+        return RankedTask(
+            id=int(ids[i]),
+            subject=subjects[i],
+            problem=problems[i],
+            difficulty=float(difficulties[i]),
+            # скалярное произведение может быть отрицательным, в ответе API оценка неотрицательна
+            relevance_score=max(float(score), 0.0),
+            match_reason=reason,
+        )
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import abc
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class RankedTask:
+    id: int
+    subject: str
+    problem: str
+    difficulty: float
+    relevance_score: float
+    match_reason: str
+
+
+# Кандидаты одного пользователя в виде выровненных массивов
+@dataclass
+class RankingRequest:
+    user_id: Optional[int]
+    ids: np.ndarray
+    subjects: Sequence[str]
+    problems: Sequence[str]
+    difficulties: np.ndarray
+    in_preferred: np.ndarray
+    solved_task_ids: Sequence[int]
+    optimal_difficulty: float
+    # уже посчитанная текстовая близость (офлайн-путь считает её по матрице каталога)
+    similarity_scores: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# Общий пул кандидатов для нескольких пользователей: матрицы пользователи x кандидаты
+@dataclass
+class BatchRankingRequest:
+    user_ids: Sequence[int]
+    ids: np.ndarray
+    subjects: np.ndarray
+    problems: Sequence[Optional[str]]
+    difficulties: np.ndarray
+    in_preferred: np.ndarray
+    attempted: np.ndarray
+    solved_task_ids: Sequence[Sequence[int]]
+    optimal_difficulty: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def request_for(self, row: int) -> RankingRequest:
+        available = np.flatnonzero(~self.attempted[row])
+        return RankingRequest(
+            user_id=self.user_ids[row],
+            ids=self.ids[available],
+            subjects=self.subjects[available],
+            problems=[self.problems[i] for i in available],
+            difficulties=self.difficulties[available],
+            in_preferred=self.in_preferred[row, available],
+            solved_task_ids=self.solved_task_ids[row],
+            optimal_difficulty=float(self.optimal_difficulty[row]),
+        )
+
+
+class BaseRanker(abc.ABC):
+    name: str = 'base'
+
+    @property
+    def is_ready(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def rank(self, request: RankingRequest, n: Optional[int] = None) -> List[RankedTask]:
+        ...
+
+    def rank_batch(self, batch: BatchRankingRequest, n: int) -> List[List[RankedTask]]:
+        # движок без матричной реализации ранжирует пользователей по одному
+        return [self.rank(batch.request_for(row), n) for row in range(len(batch))]
+
+
+def top_n(scores: np.ndarray, n: Optional[int]) -> np.ndarray:
+    if n is None or n >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(-scores, n - 1)[:n]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def top_n_rows(scores: np.ndarray, n: int) -> List[np.ndarray]:
+    # top-n по каждой строке; -inf (недоступные кандидаты) отбрасываются
+    if not scores.shape[1]:
+        return [np.zeros(0, dtype=np.int64) for _ in range(scores.shape[0])]
+    n = min(n, scores.shape[1])
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    out = []
+    for row, cols in enumerate(top):
+        cols = cols[np.argsort(-scores[row, cols], kind='stable')]
+        out.append(cols[np.isfinite(scores[row, cols])])
+    return out
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+
+from app.services.recommendation_engines.base import BaseRanker, BatchRankingRequest, RankedTask, RankingRequest, \
+    top_n, top_n_rows
+from app.services.task_cooccurrence import TaskCooccurrence
+from app.services.task_text_index import TaskTextIndex
+
+
+# Прежнее ранжирование: сложность + тема + TF-IDF близость к решённым,
+# при cf_weight > 0 подмешивается item-item сигнал
+class ContentRanker(BaseRanker):
+    name = 'content'
+
+    def __init__(
+            self,
+            index: Optional[TaskTextIndex] = None,
+            cooccurrence: Optional[TaskCooccurrence] = None,
+            cf_weight: float = 0.0,
+    ) -> None:
+        self.index = index if index is not None else TaskTextIndex()
+        self.cooccurrence = cooccurrence
+        self.cf_weight = cf_weight
+
+    def rank(self, request: RankingRequest, n: Optional[int] = None) -> List[RankedTask]:
+        if not len(request):
+            return []
+
+        similarity_scores = request.similarity_scores
+        if similarity_scores is None:
+            similarity_scores = self.index.max_similarity(request.ids, request.problems, request.solved_task_ids)
+
+        difficulty_scores = 1.0 / (1.0 + np.abs(request.difficulties - request.optimal_difficulty))
+        subject_scores = np.where(request.in_preferred, 1.5, 1.0)
+        totals = 0.4 * difficulty_scores + 0.3 * subject_scores + 0.3 * similarity_scores
+        collaborative_scores = np.zeros_like(totals)
+        if self.cooccurrence is not None and self.cf_weight > 0:
+            collaborative_scores = self.cooccurrence.scores(request.ids, request.solved_task_ids)
+            totals = totals + self.cf_weight * collaborative_scores
+
+        # RankedTask создаём только для top-n
+        ranked: List[RankedTask] = []
+        for i in top_n(totals, n):
+            ranked.append(
+                RankedTask(
+                    id=int(request.ids[i]),
+                    subject=request.subjects[i],
+                    problem=request.problems[i],
+                    difficulty=float(request.difficulties[i]),
+                    relevance_score=float(totals[i]),
+                    match_reason=self.match_reason(
+                        difficulty_scores[i], subject_scores[i], similarity_scores[i], collaborative_scores[i]
+                    ),
+                )
+            )
+        return ranked
+
+    def rank_batch(self, batch: BatchRankingRequest, n: int) -> List[List[RankedTask]]:
+        if not len(batch) or not len(batch.ids):
+            return [[] for _ in range(len(batch))]
+
+        difficulty_scores = 1.0 / (1.0 + np.abs(batch.difficulties[None, :] - batch.optimal_difficulty[:, None]))
+        subject_scores = np.where(batch.in_preferred, 1.5, 1.0)
+        similarity_scores = self._batch_similarity(batch)
+        totals = 0.4 * difficulty_scores + 0.3 * subject_scores + 0.3 * similarity_scores
+        collaborative_scores = np.zeros_like(totals)
+        if self.cooccurrence is not None and self.cf_weight > 0:
+            collaborative_scores = self.cooccurrence.batch_scores(batch.ids, batch.solved_task_ids)
+            totals = totals + self.cf_weight * collaborative_scores
+        totals[batch.attempted] = -np.inf
+
+        results: List[List[RankedTask]] = []
+        for row, top in enumerate(top_n_rows(totals, n)):
+            results.append([
+                RankedTask(
+                    id=int(batch.ids[i]),
+                    subject=batch.subjects[i],
+                    problem=batch.problems[i],
+                    difficulty=float(batch.difficulties[i]),
+                    relevance_score=float(totals[row, i]),
+                    match_reason=self.match_reason(
+                        difficulty_scores[row, i], subject_scores[row, i],
+                        similarity_scores[row, i], collaborative_scores[row, i],
+                    ),
+                )
+                for i in top
+            ])
+        return results
+
+    def _batch_similarity(self, batch: BatchRankingRequest) -> np.ndarray:
+        # одна матрица кандидаты x (решённые задачи всех пользователей),
+        # максимум по столбцам каждого пользователя через reduceat
+        out = np.zeros((len(batch), len(batch.ids)), dtype=np.float64)
+        lengths = np.fromiter((len(s) for s in batch.solved_task_ids), dtype=np.int64, count=len(batch))
+        if self.index.is_empty or not lengths.sum():
+            return out
+        history = [int(t) for solved in batch.solved_task_ids for t in solved]
+        sim = (self.index.vectors(batch.ids, batch.problems) @ self.index.vectors(history).T).toarray()
+        has_history = lengths > 0
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])[has_history]
+        out[has_history] = np.maximum.reduceat(sim, starts, axis=1).T
+        return out
+
+    @staticmethod
+    def match_reason(
+            difficulty_score: float,
+            subject_score: float,
+            similarity_score: float,
+            collaborative_score: float = 0.0,
+    ) -> str:
+        reasons = []
+        if difficulty_score > 0.7:
+            reasons.append("оптимальная сложность")
+        if subject_score > 1.2:
+            reasons.append("предпочтительная тема")
+        if similarity_score > 0.5:
+            reasons.append("похожа на решенные вами задачи")
+        if collaborative_score > 0.5:
+            reasons.append("её решают вместе с вашими задачами")
+        return " и ".join(reasons) if reasons else "новый вызов"
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+
+from app.services.recommendation_engines.base import RankedTask
+
+
+# Maximal marginal relevance: жадно берём задачу с лучшим (1 - λ)·relevance - λ·max_sim к уже выбранным.
+# similarity — квадратная матрица близости кандидатов (косинус по эмбеддингам), задачи одной темы
+# считаются похожими не меньше чем на subject_similarity
+def mmr_rerank(
+        ranked: Sequence[RankedTask],
+        similarity: np.ndarray,
+        n: int,
+        diversity: float,
+        subject_similarity: float = 0.0,
+) -> List[RankedTask]:
+    if not len(ranked) or n <= 0:
+        return []
+    if diversity <= 0:
+        return list(ranked[:n])
+
+    subjects = np.array([r.subject for r in ranked], dtype=object)
+    similarity = np.maximum(similarity, subject_similarity * (subjects[:, None] == subjects[None, :]))
+    relevance = np.array([r.relevance_score for r in ranked], dtype=np.float64)
+    # релевантность делится на максимум, чтобы λ одинаково работал для всех движков
+    peak = relevance.max()
+    relevance = relevance / peak if peak > 0 else np.ones_like(relevance)
+
+    chosen = [int(np.argmax(relevance))]
+    max_sim = similarity[chosen[0]].astype(np.float64)
+    available = np.ones(len(ranked), dtype=bool)
+    available[chosen[0]] = False
+    for _ in range(min(n, len(ranked)) - 1):
+        scores = np.where(available, (1.0 - diversity) * relevance - diversity * max_sim, -np.inf)
+        pick = int(np.argmax(scores))
+        chosen.append(pick)
+        available[pick] = False
+        np.maximum(max_sim, similarity[pick], out=max_sim)
+    return [ranked[i] for i in chosen]
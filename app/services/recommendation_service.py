@@ -1,217 +1,699 @@
 from __future__ import annotations
-from typing import Sequence, List, Dict
-from dataclasses import dataclass
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, literal, and_, not_, desc
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Sequence, List, Optional, Dict, Set, Tuple
+from dataclasses import asdict
 
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func, and_, desc, exists
+
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.db.CRUD.user_profile import UserProfileCRUD
+from app.db.CRUD.user_recommendation import UserRecommendationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.user_role import UserRoleEnum
+from app.exceptions.recommendation_exception import PermissionDeniedRecommendation, PermissionDeniedSnapshot, \
+    SnapshotNotFound
+from app.logger import setup_logger
+from app.metrics import RECO_CANDIDATES_SCANNED, RECO_SHADOW_SKIPPED
 from app.models.task_table import Task
 from app.models.task_history_table import TaskHistory
+from app.models.task_stats_table import TaskStats
+from app.models.user_profile_table import UserProfile
+from app.models.user_table import User
+from app.services.candidate_stream import CandidateHeap, prescore, prescore_bound
+from app.services.recommendation_cache import RecommendationCache, recommendation_cache
+from app.services.recommendation_engines.als import ALSModel, ALSRanker
+from app.services.recommendation_engines.base import BaseRanker, BatchRankingRequest, RankedTask, RankingRequest
+from app.services.recommendation_engines.content import ContentRanker
+from app.services.recommendation_engines.mmr import mmr_rerank
+from app.services.ranking_executor import RankingExecutor
+from app.services.reco_snapshot import SnapshotStore
+from app.services.shadow_scoring import ShadowScorer
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_cooccurrence import TaskCooccurrence
+from app.services.task_text_index import TaskTextIndex, init_task_index
+from app.services.user_profile_service import UserProfileService
+from app.utils.skill_rating import RATING_BAND, RATING_SCALE, prior_rating, target_rating, user_skill
 
+logger = setup_logger(__name__)
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-_SKLEARN = True
+POPULAR_POOL_SIZE = 200
+# сколько секунд живёт пул популярных задач, прежде чем перечитать его из task_stats
+RECO_POPULAR_TTL = float(os.getenv('RECO_POPULAR_TTL', 60))
+RECO_PRECOMPUTED_MAX_AGE = int(os.getenv('RECO_PRECOMPUTED_MAX_AGE', 24 * 3600))
+RECO_CF_WEIGHT = float(os.getenv('RECO_CF_WEIGHT', 0.3))
+RECO_ENGINE = os.getenv('RECO_ENGINE', 'content')
+# сколько кандидатов брать из ANN-индекса вместо полного SQL-перебора, 0 — выключено
+RECO_ANN_CANDIDATES = int(os.getenv('RECO_ANN_CANDIDATES', 0))
+# кандидаты из SQL: не больше RECO_CANDIDATE_LIMIT самых популярных на каждом этапе,
+# сложность в окне optimal_difficulty ± RECO_DIFFICULTY_BAND
+RECO_CANDIDATE_LIMIT = int(os.getenv('RECO_CANDIDATE_LIMIT', 500))
+RECO_DIFFICULTY_BAND = float(os.getenv('RECO_DIFFICULTY_BAND', 1.5))
+# общий пул кандидатов для пакетного запроса по группе пользователей
+RECO_BATCH_POOL_SIZE = int(os.getenv('RECO_BATCH_POOL_SIZE', 2000))
+# размер пачки строк при потоковом чтении кандидатов
+RECO_CANDIDATE_CHUNK = int(os.getenv('RECO_CANDIDATE_CHUNK', 200))
+# MMR: из скольких лучших задач выбирается разнообразный top-n и насколько похожи задачи одной темы
+RECO_MMR_POOL = int(os.getenv('RECO_MMR_POOL', 200))
+RECO_MMR_SUBJECT_SIMILARITY = float(os.getenv('RECO_MMR_SUBJECT_SIMILARITY', 0.5))
+# как часто (сек) воркер проверяет, не переключена ли активная версия снимка другим процессом
+RECO_SNAPSHOT_CHECK_INTERVAL = float(os.getenv('RECO_SNAPSHOT_CHECK_INTERVAL', 30))
 
 
+class RecommendationService:
+    # один экземпляр на процесс (app.state.recommendation_service), держит прогретые индекс и популярность
+    def __init__(
+            self,
+            index: Optional[TaskTextIndex] = None,
+            cache: Optional[RecommendationCache] = None,
+            cooccurrence: Optional[TaskCooccurrence] = None,
+            cf_weight: float = RECO_CF_WEIGHT,
+            als_model: Optional[ALSModel] = None,
+            engine: str = RECO_ENGINE,
+            ann_index: Optional[TaskAnnIndex] = None,
+            ann_candidates: int = RECO_ANN_CANDIDATES,
+            candidate_limit: int = RECO_CANDIDATE_LIMIT,
+            difficulty_band: float = RECO_DIFFICULTY_BAND,
+            batch_pool_size: int = RECO_BATCH_POOL_SIZE,
+            executor: Optional[RankingExecutor] = None,
+            mmr_pool: int = RECO_MMR_POOL,
+            mmr_subject_similarity: float = RECO_MMR_SUBJECT_SIMILARITY,
+            snapshots: Optional[SnapshotStore] = None,
+            snapshot_check_interval: float = RECO_SNAPSHOT_CHECK_INTERVAL,
+            shadow: Optional[ShadowScorer] = None,
+            session_factory: Optional[async_sessionmaker] = None,
+            popular_ttl: float = RECO_POPULAR_TTL,
+    ) -> None:
+        self.index = index if index is not None else TaskTextIndex()
+        self.cache = cache if cache is not None else recommendation_cache
+        self.cooccurrence = cooccurrence if cooccurrence is not None else TaskCooccurrence()
+        self.als_model = als_model if als_model is not None else ALSModel()
+        self.ann_index = ann_index if ann_index is not None else TaskAnnIndex()
+        self.ann_candidates = ann_candidates
+        self.candidate_limit = candidate_limit
+        self.difficulty_band = difficulty_band
+        self.batch_pool_size = batch_pool_size
+        self.mmr_pool = mmr_pool
+        self.mmr_subject_similarity = mmr_subject_similarity
+        # вес коллаборативного сигнала в смешанном режиме, 0 — только контентное ранжирование
+        self.cf_weight = cf_weight
+        self.engine = engine
+        self.popular_ids: List[int] = []
+        self.popular_ttl = popular_ttl
+        self._popular_loaded_at = float('-inf')
+        self.rankers: Dict[str, BaseRanker] = self._build_rankers()
+        self.executor = executor if executor is not None else RankingExecutor()
+        self.executor.set_rankers(self.rankers)
+        self._reload_lock = threading.Lock()
+        self.snapshots = snapshots if snapshots is not None else SnapshotStore()
+        self.snapshot_version: Optional[str] = None
+        self.snapshot_check_interval = snapshot_check_interval
+        self._snapshot_checked_at = 0.0
+        self.shadow = shadow if shadow is not None else ShadowScorer()
+        # теневой расчёт идёт после ответа, поэтому открывает свою сессию
+        self.session_factory = session_factory
+        self._shadow_tasks: Set[asyncio.Task] = set()
 
-@dataclass
-class RankedTask:
-    id: int
-    subject: str
-    problem: str
-    difficulty: float
-    relevance_score: float
-    match_reason: str
+    def _build_rankers(self) -> Dict[str, BaseRanker]:
+        content = ContentRanker(self.index, self.cooccurrence, self.cf_weight)
+        return {
+            ContentRanker.name: content,
+            ALSRanker.name: ALSRanker(self.als_model, fallback=content),
+        }
 
+    def ranker(self, engine: Optional[str] = None) -> BaseRanker:
+        ranker = self.rankers.get(engine or self.engine)
+        if ranker is None or not ranker.is_ready:
+            return self.rankers[ContentRanker.name]
+        return ranker
 
-class RecommendationService:
-    def __init__(
+    async def warm_up(self, session: AsyncSession) -> None:
+        popular_ids = await self._load_popular_task_ids(session)
+        current = self.snapshots.current_version()
+        if current is not None:
+            # готовый снимок: ничего не пересобираем при старте
+            self.reload(popular_ids=popular_ids)
+            await asyncio.to_thread(self.load_snapshot, current)
+            return
+        index = await init_task_index(session)
+        self.reload(
+            index=index, popular_ids=popular_ids,
+            cooccurrence=TaskCooccurrence.load(), als_model=ALSModel.load(),
+            ann_index=TaskAnnIndex.load(text_index=index),
+        )
+
+    def reload(
             self,
-            vectorizer_max_features: int = 1000,
-            vectorizer_min_df: int = 2,
-            vectorizer_max_df: float = 0.8,
+            index: Optional[TaskTextIndex] = None,
+            popular_ids: Optional[Sequence[int]] = None,
+            cooccurrence: Optional[TaskCooccurrence] = None,
+            als_model: Optional[ALSModel] = None,
+            ann_index: Optional[TaskAnnIndex] = None,
     ) -> None:
-        self._use_text = _SKLEARN
-        if self._use_text:
-            self.vectorizer = TfidfVectorizer(
-                stop_words='russian',
-                max_features=vectorizer_max_features,
-                min_df=vectorizer_min_df,
-                max_df=vectorizer_max_df,
-            )
+        # подмена ссылок атомарна, читатели продолжают работать со старым состоянием
+        with self._reload_lock:
+            if index is not None:
+                self.index = index
+            if popular_ids is not None:
+                self.popular_ids = list(popular_ids)
+                self._popular_loaded_at = time.monotonic()
+            if cooccurrence is not None:
+                self.cooccurrence = cooccurrence
+            if als_model is not None:
+                self.als_model = als_model
+            if ann_index is not None:
+                self.ann_index = ann_index
+            self.rankers = self._build_rankers()
+            self.executor.set_rankers(self.rankers)
+        logger.info(f'Recommendation state reloaded: tasks_in_index={len(self.index)}, popular={len(self.popular_ids)}')
+
+    def load_snapshot(self, version: str) -> None:
+        snapshot = self.snapshots.open(version)
+        if snapshot is None:
+            raise SnapshotNotFound()
+        # массивы открываются через mmap, в память попадают только страницы, к которым обращаются
+        self.reload(
+            index=snapshot.index, cooccurrence=snapshot.cooccurrence,
+            als_model=snapshot.als_model, ann_index=snapshot.ann_index,
+        )
+        self.snapshot_version = version
+        logger.info(f'Recommendation snapshot loaded: {version}')
+
+    async def sync_snapshot(self) -> None:
+        # другие воркеры узнают о переключении версии по файлу CURRENT
+        now = time.monotonic()
+        if now - self._snapshot_checked_at < self.snapshot_check_interval:
+            return
+        self._snapshot_checked_at = now
+        current = self.snapshots.current_version()
+        if current is not None and current != self.snapshot_version:
+            await asyncio.to_thread(self.load_snapshot, current)
+
+    def snapshot_status(self, requesting_by: User) -> dict:
+        self._check_snapshot_admin(requesting_by)
+        return {
+            'current': self.snapshots.current_version(),
+            'loaded': self.snapshot_version,
+            'versions': self.snapshots.versions(),
+        }
+
+    async def activate_snapshot(self, version: str, requesting_by: User) -> str:
+        self._check_snapshot_admin(requesting_by)
+        if not self.snapshots.exists(version):
+            raise SnapshotNotFound()
+        # сначала загрузка в этом процессе, потом публикация: битый снимок не станет активным
+        await asyncio.to_thread(self.load_snapshot, version)
+        self.snapshots.publish(version)
+        return version
+
+    @staticmethod
+    def _check_snapshot_admin(user: User) -> None:
+        if user.role != UserRoleEnum.ADMIN:
+            raise PermissionDeniedSnapshot()
+
+    def close(self) -> None:
+        for task in list(self._shadow_tasks):
+            task.cancel()
+        self.executor.shutdown()
+
+    def on_task_approved(self, task) -> None:
+        # новая задача сразу доступна в поиске похожих без пересборки индекса;
+        # текстовый индекс первым — ANN берёт вектор задачи из него
+        self.index.add(task.id, task.problem)
+        if self.ann_index.add(task.id, task.problem):
+            logger.info(f'Task added to ANN index, task_id: {task.id}')
+
+    def on_task_deleted(self, task_id: int) -> None:
+        self.ann_index.remove(task_id)
 
     async def get_user_recommendations(
             self,
             session: AsyncSession,
             user_id: int,
             n_recommendations: int = 5,
+            diversity: float = 0.0,
+            diversity_pool: Optional[int] = None,
     ) -> List[RankedTask]:
-        user_history = await self._get_user_history(session, user_id)
+        if diversity > 0:
+            # пул кэшируется как обычный top-k, переранжирование дешёвое и делается на каждый запрос
+            pool_size = max(n_recommendations, diversity_pool or self.mmr_pool)
+            pool = await self._get_ranked(session, user_id, pool_size)
+            return self.diversify(pool, n_recommendations, diversity)
+
+        ranked = await self._get_ranked(session, user_id, n_recommendations)
+        if self.shadow.should_sample():
+            self._start_shadow(user_id, n_recommendations, ranked)
+        return ranked
+
+    async def _get_ranked(self, session: AsyncSession, user_id: int, n_recommendations: int) -> List[RankedTask]:
+        cached = await self.cache.get(user_id, n_recommendations)
+        if cached is not None:
+            return [RankedTask(**item) for item in cached]
+
+        # поколение до расчёта: если пользователя инвалидируют во время расчёта, результат не кэшируется
+        generation = await self.cache.generation(user_id)
+        ranked = await self._get_precomputed(session, user_id, n_recommendations)
+        if ranked is None:
+            ranked = await self._compute_user_recommendations(session, user_id, n_recommendations)
+        await self.cache.set(user_id, n_recommendations, [asdict(r) for r in ranked], generation)
+        return ranked
+
+    def _start_shadow(self, user_id: int, n: int, served: List[RankedTask]) -> None:
+        self.shadow.pending += 1
+        task = asyncio.create_task(self._shadow_score(user_id, n, served))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
 
-        if not user_history:
+    async def _shadow_score(self, user_id: int, n: int, served: List[RankedTask]) -> None:
+        try:
+            shadow = self.rankers.get(self.shadow.engine)
+            if shadow is None or not shadow.is_ready:
+                RECO_SHADOW_SKIPPED.labels('not_ready').inc()
+                return
+            async with self._session_factory()() as session:
+                _, request = await self.user_ranking_request(session, user_id, n)
+            if request is None:
+                RECO_SHADOW_SKIPPED.labels('no_candidates').inc()
+                return
+            # мимо очереди ранжирования: теневой расчёт не занимает места основных запросов
+            comparison = await asyncio.to_thread(self.shadow.compare, self.ranker(), shadow, request, served, n)
+            await asyncio.to_thread(self.shadow.record, comparison)
+        except Exception as e:
+            RECO_SHADOW_SKIPPED.labels('error').inc()
+            logger.warning(f'Shadow scoring failed, user_id: {user_id}: {e}')
+        finally:
+            self.shadow.pending -= 1
+
+    def _session_factory(self) -> async_sessionmaker:
+        if self.session_factory is None:
+            from app.database import async_session
+            self.session_factory = async_session
+        return self.session_factory
+
+    async def get_batch_recommendations(
+            self,
+            session: AsyncSession,
+            user_ids: Sequence[int],
+            n_recommendations: int = 5,
+            requesting_by: Optional[User] = None,
+    ) -> Dict[int, List[RankedTask]]:
+        user_ids = list(dict.fromkeys(int(u) for u in user_ids))
+        if requesting_by is not None and not self._can_view_others(requesting_by) \
+                and user_ids != [requesting_by.id]:
+            raise PermissionDeniedRecommendation()
+        results: Dict[int, List[RankedTask]] = {}
+        for user_id in user_ids:
+            cached = await self.cache.get(user_id, n_recommendations)
+            if cached is not None:
+                results[user_id] = [RankedTask(**item) for item in cached]
+
+        missing = [u for u in user_ids if u not in results]
+        generations = {user_id: await self.cache.generation(user_id) for user_id in missing}
+        if missing:
+            rows = await UserRecommendationCRUD(session).get_by_user_ids(missing)
+            results.update(await self._precomputed_items(session, rows, n_recommendations))
+
+        missing = [u for u in user_ids if u not in results]
+        if missing:
+            computed = await self._compute_batch(session, missing, n_recommendations)
+            for user_id, ranked in computed.items():
+                results[user_id] = ranked
+                await self.cache.set(user_id, n_recommendations, [asdict(r) for r in ranked], generations[user_id])
+        return {user_id: results.get(user_id, []) for user_id in user_ids}
+
+    def diversify(self, ranked: List[RankedTask], n: int, diversity: float) -> List[RankedTask]:
+        if diversity <= 0 or len(ranked) <= 1:
+            return ranked[:n]
+        return mmr_rerank(ranked, self._similarity_matrix(ranked), n, diversity, self.mmr_subject_similarity)
+
+    def _similarity_matrix(self, ranked: List[RankedTask]) -> np.ndarray:
+        # близость кандидатов по уже посчитанным векторам: плотные эмбеддинги ANN-индекса
+        # (пул x k), иначе строки TF-IDF; в БД не ходим
+        ids = [r.id for r in ranked]
+        problems = [r.problem for r in ranked]
+        ann_index, index = self.ann_index, self.index
+        if not ann_index.is_empty:
+            vectors = [ann_index.vector(t) for t in ids]
+            missing = [i for i, v in enumerate(vectors) if v is None]
+            if missing:
+                embedded = ann_index.embed([ids[i] for i in missing], [problems[i] for i in missing])
+                for i, v in zip(missing, embedded):
+                    vectors[i] = v
+            matrix = np.stack(vectors).astype(np.float32)
+            return matrix @ matrix.T
+        if not index.is_empty:
+            matrix = index.vectors(ids, problems)
+            return (matrix @ matrix.T).toarray()
+        return np.eye(len(ranked))
+
+    @staticmethod
+    def _can_view_others(user: User) -> bool:
+        return user.role in {UserRoleEnum.TEACHER, UserRoleEnum.MODERATOR, UserRoleEnum.ADMIN}
+
+    async def _compute_batch(
+            self,
+            session: AsyncSession,
+            user_ids: List[int],
+            n: int,
+    ) -> Dict[int, List[RankedTask]]:
+        batch = await self.batch_ranking_request(session, user_ids)
+        users = set(batch.user_ids) if batch is not None else set()
+
+        results: Dict[int, List[RankedTask]] = {}
+        cold = [u for u in user_ids if u not in users]
+        if cold:
+            defaults = await self._get_default_recommendations(session, n)
+            results.update({user_id: list(defaults) for user_id in cold})
+        if batch is None:
+            return results
+
+        ranked_lists = await self.executor.rank_batch(self.ranker(), batch, n)
+        # тексты для top-n всех пользователей одним запросом
+        flat = [r for ranked in ranked_lists for r in ranked]
+        await self.attach_problems(session, flat)
+        results.update(dict(zip(batch.user_ids, ranked_lists)))
+        return results
+
+    async def batch_ranking_request(
+            self,
+            session: AsyncSession,
+            user_ids: Sequence[int],
+    ) -> Optional[BatchRankingRequest]:
+        # профили и история группы — по одному запросу, кандидаты — общий пул на всех;
+        # пользователи без профиля (без попыток) в запрос не попадают
+        user_ids = list(user_ids)
+        profiles = {p.user_id: p for p in await UserProfileCRUD(session).get_by_user_ids(user_ids)}
+        profile_service = UserProfileService(session)
+        for user_id in user_ids:
+            if user_id not in profiles:
+                profile = await profile_service.rebuild(user_id)
+                if profile is not None:
+                    profiles[user_id] = profile
+        users = [u for u in user_ids if u in profiles]
+        if not users:
+            return None
+
+        preferred = [UserProfileService.preferred_subjects(profiles[u]) for u in users]
+        optimal = np.array([UserProfileService.optimal_difficulty(profiles[u]) for u in users], dtype=np.float64)
+
+        # один пул кандидатов на всех: окно сложности покрывает всех пользователей
+        pool_q = (
+            select(Task.id, Task.subject, Task.difficulty)
+            .join(TaskStats, TaskStats.task_id == Task.id, isouter=True)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .where(Task.difficulty >= float(optimal.min()) - self.difficulty_band)
+            .where(Task.difficulty <= float(optimal.max()) + self.difficulty_band)
+            .order_by(desc(func.coalesce(TaskStats.solve_count, 0)), Task.id)
+            .limit(self.batch_pool_size)
+        )
+        pool = (await session.execute(pool_q)).all()
+        ids = np.fromiter((r[0] for r in pool), dtype=np.int64, count=len(pool))
+        subjects = np.array([r[1] for r in pool], dtype=object)
+        pos_by_id = {int(t): i for i, t in enumerate(ids)}
+        row_by_user = {u: i for i, u in enumerate(users)}
+
+        # история всех пользователей одним запросом
+        attempted = np.zeros((len(users), len(pool)), dtype=bool)
+        history_q = (
+            select(TaskHistory.user_id, TaskHistory.task_id)
+            .where(TaskHistory.user_id.in_(users))
+            .distinct()
+        )
+        for user_id, task_id in (await session.execute(history_q)).all():
+            pos = pos_by_id.get(int(task_id))
+            if pos is not None:
+                attempted[row_by_user[user_id], pos] = True
+
+        index = self.index
+        missing = [] if index.is_empty else [int(t) for t in ids if t not in index]
+        problems = await self._load_problems(session, missing)
+        return BatchRankingRequest(
+            user_ids=users,
+            ids=ids,
+            subjects=subjects,
+            problems=[problems.get(int(t)) for t in ids],
+            difficulties=np.fromiter((float(r[2] or 0.0) for r in pool), dtype=np.float64, count=len(pool)),
+            in_preferred=np.stack([np.isin(subjects, p) for p in preferred]) if len(pool)
+            else np.zeros((len(users), 0), dtype=bool),
+            attempted=attempted,
+            solved_task_ids=[list(profiles[u].solved_task_ids or []) for u in users],
+            optimal_difficulty=optimal,
+        )
+
+    async def _get_precomputed(self, session: AsyncSession, user_id: int, n: int) -> Optional[List[RankedTask]]:
+        row = await UserRecommendationCRUD(session).get_by_user_id(user_id)
+        if row is None:
+            return None
+        return (await self._precomputed_items(session, [row], n)).get(user_id)
+
+    async def _precomputed_items(self, session: AsyncSession, rows, n: int) -> Dict[int, List[RankedTask]]:
+        expired_before = datetime.now() - timedelta(seconds=RECO_PRECOMPUTED_MAX_AGE)
+        rows = [row for row in rows if len(row.items) >= n and row.computed_at >= expired_before]
+        task_ids = {item['id'] for row in rows for item in row.items}
+        if not task_ids:
+            return {}
+        # списки посчитаны офлайн: задачи, которые с тех пор удалены или сняты с одобрения, не отдаём
+        approved = set((await session.execute(
+            select(Task.id).where(Task.id.in_(task_ids)).where(Task.status == TaskStatusEnum.APPROVED)
+        )).scalars().all())
+        results: Dict[int, List[RankedTask]] = {}
+        for row in rows:
+            ranked = [RankedTask(**item) for item in row.items if item['id'] in approved][:n]
+            if len(ranked) == n:
+                results[row.user_id] = ranked
+        return results
+
+    async def _compute_user_recommendations(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            n_recommendations: int,
+    ) -> List[RankedTask]:
+        profile, request = await self.user_ranking_request(session, user_id, n_recommendations)
+        if profile is None:
             defaults = await self._get_default_recommendations(session, n_recommendations)
             return defaults
+        if request is None:
+            return []
+        ranked = await self.executor.rank(self.ranker(), request, n_recommendations)
+        return await self.attach_problems(session, ranked)
 
-        preferred_subjects = self._analyze_subjects(user_history)
-        optimal_difficulty = self._analyze_difficulty(user_history)
-
-        candidate_tasks = await self._get_candidate_tasks(session, user_id, preferred_subjects)
-        if not candidate_tasks:
-            candidate_tasks = await self._get_all_unsolved_tasks(session, user_id)
+    async def user_ranking_request(
+            self,
+            session: AsyncSession,
+            user_id: int,
+            n_recommendations: int,
+    ) -> Tuple[Optional[UserProfile], Optional[RankingRequest]]:
+        profile = await UserProfileService(session).get_or_build(user_id)
+        if profile is None:
+            return None, None
 
-        ranked = self._rank_tasks(candidate_tasks, user_history, optimal_difficulty, preferred_subjects)
-        return ranked[:n_recommendations]
+        preferred_subjects = UserProfileService.preferred_subjects(profile)
+        optimal_difficulty = UserProfileService.optimal_difficulty(profile)
 
-    async def _get_user_history(self, session: AsyncSession, user_id: int):
-        q = (
-            select(
-                TaskHistory.task_id,
-                TaskHistory.status,
-                TaskHistory.score,
-                Task.subject,
-                Task.difficulty,
-                Task.problem,
+        solved_task_ids = profile.solved_task_ids or []
+        candidate_tasks = []
+        if self.ann_candidates > 0:
+            candidate_tasks = await self._get_ann_candidates(session, user_id, solved_task_ids)
+        if not candidate_tasks:
+            candidate_tasks = await self._get_candidate_tasks(
+                session, user_id, preferred_subjects, optimal_difficulty, n_recommendations,
+                skill=user_skill(profile),
             )
-            .join(Task, Task.id == TaskHistory.task_id)
-            .where(TaskHistory.user_id == user_id)
-            .order_by(TaskHistory.timestamp.desc())
-            .limit(50)
-        )
-        res = (await session.execute(q)).all()
-        return res
-
-    def _analyze_subjects(self, user_history: Sequence[tuple]) -> List[str]:
-        subject_scores: Dict[str, float] = {}
-        for task_id, status, score, subject, difficulty, problem in user_history:
-            weight = 1.0
-            if status == 'solved':
-                weight = 1.5
-            elif status == 'attempted':
-                weight = 0.7
-            subject_scores[subject] = subject_scores.get(subject, 0.0) + (float(score or 0.0) * weight)
-
-        sorted_subjects = sorted(subject_scores.items(), key=lambda x: x[1], reverse=True)
-        return [s for s, _ in sorted_subjects[:3]]
-
-    def _analyze_difficulty(self, user_history: Sequence[tuple]) -> float:
-        diffs: List[float] = []
-        weights: List[float] = []
-        for _, status, score, _, difficulty, _ in user_history:
-            score = float(score or 0.0)
-            if status == 'solved' or score > 0.7:
-                diffs.append(float(difficulty or 0.0))
-                weights.append(max(score, 0.01))
-        if not diffs:
-            return 2.5
-        # взвешенное среднее
-        total_w = sum(weights)
-        return sum(d * w for d, w in zip(diffs, weights)) / total_w
-
-    async def _get_candidate_tasks(self, session: AsyncSession, user_id: int, preferred_subjects: List[str]):
-        if not preferred_subjects:
-            return await self._get_all_unsolved_tasks(session, user_id)
-
-        subq = select(TaskHistory.task_id).where(TaskHistory.user_id == user_id)
-        q = (
-            select(Task.id, Task.subject, Task.problem, Task.solution, Task.answer, Task.difficulty)
-            .where(not_(Task.id.in_(subq)))
-            .where(Task.subject.in_(preferred_subjects))
+
+        index = self.index
+        missing = [] if index.is_empty else [t[0] for t in candidate_tasks if t[0] not in index]
+        problems = await self._load_problems(session, missing)
+        request = self._ranking_request(
+            candidate_tasks, solved_task_ids, optimal_difficulty, preferred_subjects, user_id, problems,
         )
-        return (await session.execute(q)).all()
+        return profile, request
 
-    async def _get_all_unsolved_tasks(self, session: AsyncSession, user_id: int):
-        subq = select(TaskHistory.task_id).where(TaskHistory.user_id == user_id)
+    def _candidate_query(self, user_id: int, *conditions, distance=None):
+        # кандидаты без текстов: (id, subject, difficulty); уже решавшиеся отсекаются анти-джойном.
+        # С distance — поток по возрастанию расстояния до целевой сложности, без LIMIT
+        attempted = exists().where(and_(TaskHistory.user_id == user_id, TaskHistory.task_id == Task.id))
+        popularity = desc(func.coalesce(TaskStats.solve_count, 0))
         q = (
-            select(Task.id, Task.subject, Task.problem, Task.solution, Task.answer, Task.difficulty)
-            .where(not_(Task.id.in_(subq)))
+            select(Task.id, Task.subject, Task.difficulty)
+            .join(TaskStats, TaskStats.task_id == Task.id, isouter=True)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .where(~attempted)
+            .where(*conditions)
         )
+        if distance is None:
+            return q.order_by(popularity, Task.id).limit(self.candidate_limit)
+        return q.add_columns(distance).order_by(distance, popularity, Task.id)
+
+    async def _get_ann_candidates(self, session: AsyncSession, user_id: int, solved_task_ids: Sequence[int]):
+        ann_index = self.ann_index
+        query = ann_index.query_for(solved_task_ids)
+        if query is None:
+            return []
+        task_ids, _ = ann_index.search(query, k=self.ann_candidates, exclude=solved_task_ids)
+        if not len(task_ids):
+            return []
+        q = self._candidate_query(user_id, Task.id.in_(task_ids.tolist()))
         return (await session.execute(q)).all()
 
-    def _rank_tasks(
+    async def _get_candidate_tasks(
             self,
-            candidate_tasks: Sequence[tuple],
-            user_history: Sequence[tuple],
-            optimal_difficulty: float,
+            session: AsyncSession,
+            user_id: int,
             preferred_subjects: List[str],
-    ) -> List[RankedTask]:
+            optimal_difficulty: float,
+            n: int,
+            skill: Optional[float] = None,
+    ):
+        # этапы от узкого к широкому: темы + окно сложности, только окно, все нерешённые;
+        # следующий этап нужен, только если кандидатов меньше n
+        band = [
+            Task.difficulty >= optimal_difficulty - self.difficulty_band,
+            Task.difficulty <= optimal_difficulty + self.difficulty_band,
+        ]
+        distance = func.abs(Task.difficulty - optimal_difficulty)
+        if skill is not None:
+            # есть рейтинг — окно по рейтингу задач (range scan по ix_task_stats_rating),
+            # расстояние в рейтинге переводится в уровни сложности
+            target = target_rating(skill)
+            band = [TaskStats.rating >= target - RATING_BAND, TaskStats.rating <= target + RATING_BAND]
+            rating = func.coalesce(TaskStats.rating, prior_rating(Task.difficulty))
+            distance = func.abs(rating - target) / RATING_SCALE
+        stages = [band, []]
+        if preferred_subjects:
+            stages.insert(0, [Task.subject.in_(preferred_subjects), *band])
 
-        solved_problems = [p for _, st, _, _, _, p in user_history if st == 'solved']
-        use_text = self._use_text and len(solved_problems) >= 2
+        rows, seen = [], set()
+        for conditions in stages:
+            q = self._candidate_query(user_id, *conditions, distance=distance)
+            for row in await self._stream_top_candidates(session, q, preferred_subjects, seen):
+                seen.add(row[0])
+                rows.append(row)
+            if len(rows) >= n:
+                break
+        return rows
 
-        if use_text:
-            try:
-                self.vectorizer.fit(solved_problems)
-            except Exception:
-                use_text = False
+    async def _stream_top_candidates(
+            self,
+            session: AsyncSession,
+            q,
+            preferred_subjects: Sequence[str],
+            seen: set,
+    ) -> List[tuple]:
+        # строки читаются пачками в кучу на candidate_limit; как только даже лучшая возможная
+        # оценка оставшихся строк не выше худшей в куче, курсор закрывается — память не растёт с каталогом
+        preferred = set(preferred_subjects)
+        heap = CandidateHeap(self.candidate_limit)
+        result = await session.stream(q.execution_options(yield_per=RECO_CANDIDATE_CHUNK))
+        try:
+            async for partition in result.partitions():
+                for task_id, subject, difficulty, distance in partition:
+                    distance = float(distance or 0.0)
+                    if not heap.can_improve(prescore_bound(distance)):
+                        break
+                    if task_id not in seen:
+                        heap.push(prescore(distance, subject in preferred), (task_id, subject, difficulty))
+                else:
+                    continue
+                break
+        finally:
+            await result.close()
+        RECO_CANDIDATES_SCANNED.observe(heap.scanned)
+        return heap.rows()
 
-        ranked: List[RankedTask] = []
-        for t in candidate_tasks:
-            task_id, subject, problem, solution, answer, difficulty = t
-            difficulty = float(difficulty or 0.0)
+    async def _load_problems(self, session: AsyncSession, task_ids: Sequence[int]) -> Dict[int, str]:
+        if not task_ids:
+            return {}
+        q = select(Task.id, Task.problem).where(Task.id.in_(list(task_ids)))
+        return {int(task_id): problem for task_id, problem in (await session.execute(q)).all()}
 
-            difficulty_score = 1.0 / (1.0 + abs(difficulty - optimal_difficulty))
+    async def attach_problems(self, session: AsyncSession, ranked: List[RankedTask]) -> List[RankedTask]:
+        # тексты подтягиваются только для итогового top-n
+        problems = await self._load_problems(session, [r.id for r in ranked if r.problem is None])
+        for r in ranked:
+            if r.problem is None:
+                r.problem = problems.get(r.id, "")
+        return ranked
 
-            subject_score = 1.5 if subject in set(preferred_subjects) else 1.0
+    def _rank_tasks(
+            self,
+            candidate_tasks: Sequence[tuple],
+            solved_task_ids: Sequence[int],
+            optimal_difficulty: float,
+            preferred_subjects: List[str],
+            n: Optional[int] = None,
+            user_id: Optional[int] = None,
+            engine: Optional[str] = None,
+            problems: Optional[Dict[int, str]] = None,
+    ) -> List[RankedTask]:
+        request = self._ranking_request(
+            candidate_tasks, solved_task_ids, optimal_difficulty, preferred_subjects, user_id, problems,
+        )
+        if request is None:
+            return []
+        return self.ranker(engine).rank(request, n)
 
-            similarity_score = 0.0
-            if use_text:
-                try:
-                    task_vec = self.vectorizer.transform([problem or ""])
-                    hist_vec = self.vectorizer.transform(solved_problems)
-                    sim = cosine_similarity(task_vec, hist_vec)
-                    similarity_score = float(sim.max()) if sim.size else 0.0
-                except Exception:
-                    similarity_score = 0.0
+    @staticmethod
+    def _ranking_request(
+            candidate_tasks: Sequence[tuple],
+            solved_task_ids: Sequence[int],
+            optimal_difficulty: float,
+            preferred_subjects: List[str],
+            user_id: Optional[int] = None,
+            problems: Optional[Dict[int, str]] = None,
+    ) -> Optional[RankingRequest]:
+        # candidate_tasks: (id, subject, difficulty); problems — тексты задач, которых нет в индексе
+        if not candidate_tasks:
+            return None
 
-            total = 0.4 * difficulty_score + 0.3 * subject_score + 0.3 * similarity_score
-            ranked.append(
-                RankedTask(
-                    id=int(task_id),
-                    subject=subject,
-                    problem=problem,
-                    difficulty=difficulty,
-                    relevance_score=total,
-                    match_reason=self._get_match_reason(difficulty_score, subject_score, similarity_score),
-                )
-            )
+        count = len(candidate_tasks)
+        preferred = set(preferred_subjects)
+        problems = problems or {}
+        return RankingRequest(
+            user_id=user_id,
+            ids=np.fromiter((t[0] for t in candidate_tasks), dtype=np.int64, count=count),
+            subjects=[t[1] for t in candidate_tasks],
+            problems=[problems.get(t[0]) for t in candidate_tasks],
+            difficulties=np.fromiter((float(t[2] or 0.0) for t in candidate_tasks), dtype=np.float64, count=count),
+            in_preferred=np.fromiter((t[1] in preferred for t in candidate_tasks), dtype=bool, count=count),
+            solved_task_ids=solved_task_ids,
+            optimal_difficulty=optimal_difficulty,
+        )
 
-        ranked.sort(key=lambda x: x.relevance_score, reverse=True)
-        return ranked
+    async def _load_popular_task_ids(self, session: AsyncSession, limit: int = POPULAR_POOL_SIZE) -> List[int]:
+        return await TaskStatsCRUD(session).get_popular_task_ids(limit, min_difficulty=2, max_difficulty=3)
 
-    def _get_match_reason(self, difficulty_score: float, subject_score: float, similarity_score: float) -> str:
-        reasons = []
-        if difficulty_score > 0.7:
-            reasons.append("оптимальная сложность")
-        if subject_score > 1.2:
-            reasons.append("предпочтительная тема")
-        if similarity_score > 0.5:
-            reasons.append("похожа на решенные вами задачи")
-        return " и ".join(reasons) if reasons else "новый вызов"
+    async def _popular_pool(self, session: AsyncSession) -> List[int]:
+        # task_stats обновляется на каждой попытке, поэтому пул не замораживается при старте,
+        # а перечитывается не чаще раза в popular_ttl секунд
+        if time.monotonic() - self._popular_loaded_at >= self.popular_ttl:
+            self.popular_ids = await self._load_popular_task_ids(session)
+            self._popular_loaded_at = time.monotonic()
+        return self.popular_ids
 
     async def _get_default_recommendations(self, session: AsyncSession, n: int) -> List[RankedTask]:
-        solved_cte = (
-            select(TaskHistory.task_id, func.count(literal(1)).label("cnt"))
-            .where(TaskHistory.status == 'solved')
-            .group_by(TaskHistory.task_id)
-            .cte("solved_counts")
-        )
+        popular_ids = (await self._popular_pool(session))[:n * 2]
+        if not popular_ids:
+            return []
         q = (
-            select(
-                Task.id, Task.subject, Task.problem, Task.solution, Task.answer, Task.difficulty,
-                func.coalesce(solved_cte.c.cnt, 0).label("s_cnt")
-            )
-            .join(solved_cte, solved_cte.c.task_id == Task.id, isouter=True)
-            .where(and_(Task.difficulty >= 2, Task.difficulty <= 3))
-            .order_by(desc("s_cnt"), Task.difficulty)
-            .limit(n * 2)
+            select(Task.id, Task.subject, Task.problem, Task.difficulty)
+            .where(Task.id.in_(popular_ids))
+            .where(Task.status == TaskStatusEnum.APPROVED)
         )
-        rows = (await session.execute(q)).all()
+        rows = {int(r[0]): r for r in (await session.execute(q)).all()}
         out: List[RankedTask] = []
-        for r in rows[:n]:
-            task_id, subject, problem, solution, answer, difficulty, _ = r
+        for task_id in popular_ids:
+            if task_id not in rows:
+                continue
+            _, subject, problem, difficulty = rows[task_id]
             out.append(
                 RankedTask(
-                    id=int(task_id),
+                    id=task_id,
                     subject=subject,
                     problem=problem,
                     difficulty=float(difficulty or 0.0),
@@ -219,4 +701,4 @@ class RecommendationService:
                     match_reason="популярная задача средней сложности",
                 )
             )
-        return out
+        return out[:n]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from app.logger import setup_logger
+from app.metrics import RECO_SHADOW_OVERLAP, RECO_SHADOW_SCORE_DELTA, RECO_SHADOW_SECONDS, RECO_SHADOW_SKIPPED
+from app.services.recommendation_engines.base import BaseRanker, RankedTask, RankingRequest
+
+logger = setup_logger(__name__)
+
+# Теневой режим: на доле запросов /recommendations кандидатный движок ранжирует тот же запрос
+# в фоне, ответ пользователю не ждёт. Пустой RECO_SHADOW_ENGINE — выключено.
+RECO_SHADOW_ENGINE = os.getenv('RECO_SHADOW_ENGINE', '')
+RECO_SHADOW_SAMPLE_RATE = float(os.getenv('RECO_SHADOW_SAMPLE_RATE', 0.05))
+# сколько теневых расчётов может идти одновременно, остальные пропускаются
+RECO_SHADOW_MAX_PENDING = int(os.getenv('RECO_SHADOW_MAX_PENDING', 4))
+# локальный журнал сравнений (jsonl), пустая строка — только метрики
+RECO_SHADOW_LOG = os.getenv('RECO_SHADOW_LOG', 'data/reco_shadow.jsonl')
+
+
+@dataclass
+class ShadowComparison:
+    user_id: int
+    k: int
+    primary_engine: str
+    shadow_engine: str
+    primary_seconds: float
+    shadow_seconds: float
+    overlap: float
+    score_delta: float
+    served_ids: List[int]
+    shadow_ids: List[int]
+
+
+def overlap_at_k(served: Sequence[int], shadow: Sequence[int], k: int) -> float:
+    if k <= 0:
+        return 0.0
+    return len(set(served[:k]) & set(shadow[:k])) / k
+
+
+def mean_score(task_ids: Sequence[int], scores: Dict[int, float]) -> float:
+    return sum(scores.get(t, 0.0) for t in task_ids) / len(task_ids) if task_ids else 0.0
+
+
+class ShadowScorer:
+    def __init__(
+            self,
+            engine: str = RECO_SHADOW_ENGINE,
+            sample_rate: float = RECO_SHADOW_SAMPLE_RATE,
+            max_pending: int = RECO_SHADOW_MAX_PENDING,
+            log_path: str = RECO_SHADOW_LOG,
+    ) -> None:
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.log_path = log_path
+        self.pending = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engine) and self.sample_rate > 0
+
+    def should_sample(self) -> bool:
+        if not self.enabled or random.random() >= self.sample_rate:
+            return False
+        if self.pending >= self.max_pending:
+            RECO_SHADOW_SKIPPED.labels('busy').inc()
+            return False
+        return True
+
+    def compare(
+            self,
+            primary: BaseRanker,
+            shadow: BaseRanker,
+            request: RankingRequest,
+            served: Sequence[RankedTask],
+            k: int,
+    ) -> ShadowComparison:
+        # оба движка считаются здесь же на одном запросе, чтобы задержки были сопоставимы;
+        # пересечение — с тем, что реально отдали пользователю (в том числе из кэша)
+        t0 = time.perf_counter()
+        primary_ranked = primary.rank(request, k)
+        primary_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        shadow_ranked = shadow.rank(request, k)
+        shadow_seconds = time.perf_counter() - t0
+        # оценки движков в разных шкалах (скалярные произведения ALS против суммы контентных
+        # признаков), поэтому оба top-k оцениваются одной моделью — основной, по всем кандидатам
+        primary_scores = {r.id: r.relevance_score for r in primary.rank(request)}
+
+        served_ids = [r.id for r in served[:k]]
+        shadow_ids = [r.id for r in shadow_ranked]
+        return ShadowComparison(
+            user_id=request.user_id,
+            k=k,
+            primary_engine=primary.name,
+            shadow_engine=shadow.name,
+            primary_seconds=primary_seconds,
+            shadow_seconds=shadow_seconds,
+            overlap=overlap_at_k(served_ids, shadow_ids, k),
+            score_delta=mean_score(shadow_ids, primary_scores)
+            - mean_score([r.id for r in primary_ranked], primary_scores),
+            served_ids=served_ids,
+            shadow_ids=shadow_ids,
+        )
+
+    def record(self, comparison: ShadowComparison) -> None:
+        RECO_SHADOW_SECONDS.labels('primary', comparison.primary_engine).observe(comparison.primary_seconds)
+        RECO_SHADOW_SECONDS.labels('shadow', comparison.shadow_engine).observe(comparison.shadow_seconds)
+        RECO_SHADOW_OVERLAP.labels(comparison.shadow_engine).observe(comparison.overlap)
+        RECO_SHADOW_SCORE_DELTA.labels(comparison.shadow_engine).observe(comparison.score_delta)
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps({'ts': datetime.now().isoformat(), **asdict(comparison)}) + '\n')
+        except OSError as e:
+            logger.warning(f'Shadow scoring log write failed: {e}')
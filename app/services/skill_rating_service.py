@@ -0,0 +1,99 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.logger import setup_logger
+from app.models.task_history_table import TaskHistory
+from app.models.task_stats_table import TaskStats
+from app.models.task_table import Task
+from app.models.user_profile_table import UserProfile
+from app.utils.skill_rating import MID_DIFFICULTY, elo_update, fit_ratings, prior_rating
+
+
+class SkillRatingService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._stats_crud = TaskStatsCRUD(db)
+        self.logger = setup_logger(__name__)
+
+    async def apply_attempt(
+            self,
+            history: TaskHistory,
+            profile: Optional[UserProfile],
+            commit: bool = True,
+    ) -> Optional[float]:
+        # O(1) на попытку: одна строка task_stats и профиль, уже загруженный вызывающим
+        if profile is None:
+            return None
+        stats = await self._stats_crud.get_by_task_id(history.task_id)
+        if stats is None:
+            return None
+        solved = history.status == TaskSolutionStatusEnum.RIGHT_SOLUTION
+        skill = float(profile.skill_rating or 0.0)
+        rating = float(stats.rating)
+        new_skill, new_rating = elo_update(skill, rating, solved, profile.rating_attempts or 0, stats.attempt_count)
+
+        # сдвиг, а не присваивание: параллельные попытки по той же задаче не теряются
+        await self._stats_crud.shift_rating(history.task_id, new_rating - rating, commit=False)
+        profile.skill_rating = new_skill
+        profile.rating_attempts = (profile.rating_attempts or 0) + 1
+        if commit:
+            await self.db.commit()
+        return new_skill
+
+    async def refit(self, iterations: int = 30, chunk_size: int = 100000) -> Tuple[int, int]:
+        tasks = (await self.db.execute(
+            select(Task.id, Task.difficulty).where(Task.status == TaskStatusEnum.APPROVED).order_by(Task.id)
+        )).all()
+        task_ids = np.fromiter((t[0] for t in tasks), dtype=np.int64, count=len(tasks))
+        task_prior = prior_rating(np.fromiter((float(t[1] or MID_DIFFICULTY) for t in tasks), dtype=np.float64,
+                                              count=len(tasks)))
+
+        users, items, outcomes = [], [], []
+        q = (
+            select(TaskHistory.user_id, TaskHistory.task_id, TaskHistory.status)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(q)
+        async for partition in result.partitions():
+            users.append(np.fromiter((r[0] for r in partition), dtype=np.int64, count=len(partition)))
+            items.append(np.fromiter((r[1] for r in partition), dtype=np.int64, count=len(partition)))
+            outcomes.append(np.fromiter((r[2] == TaskSolutionStatusEnum.RIGHT_SOLUTION for r in partition),
+                                        dtype=bool, count=len(partition)))
+        users = np.concatenate(users) if users else np.zeros(0, dtype=np.int64)
+        items = np.concatenate(items) if items else np.zeros(0, dtype=np.int64)
+        outcomes = np.concatenate(outcomes) if outcomes else np.zeros(0, dtype=bool)
+
+        # попытки по неодобренным задачам не участвуют
+        task_pos = np.searchsorted(task_ids, items)
+        task_pos = np.minimum(task_pos, max(len(task_ids) - 1, 0))
+        known = (task_ids[task_pos] == items) if len(task_ids) else np.zeros(len(items), dtype=bool)
+        user_ids, user_pos = np.unique(users[known], return_inverse=True)
+        skills, ratings = fit_ratings(user_pos, task_pos[known], outcomes[known], task_prior, len(user_ids), iterations)
+        attempts = np.bincount(user_pos, minlength=len(user_ids))
+
+        await self.db.execute(
+            update(TaskStats.__table__)
+            .where(TaskStats.__table__.c.task_id == bindparam('t_id'))
+            .values(rating=bindparam('t_rating')),
+            [{'t_id': int(t), 't_rating': float(r)} for t, r in zip(task_ids, ratings)],
+        )
+        if len(user_ids):
+            await self.db.execute(
+                update(UserProfile.__table__)
+                .where(UserProfile.__table__.c.user_id == bindparam('u_id'))
+                .values(skill_rating=bindparam('u_skill'), rating_attempts=bindparam('u_attempts')),
+                [
+                    {'u_id': int(u), 'u_skill': float(s), 'u_attempts': int(a)}
+                    for u, s, a in zip(user_ids, skills, attempts)
+                ],
+            )
+        await self.db.commit()
+        self.logger.info(f'Skill ratings refitted: attempts={int(known.sum())}, users={len(user_ids)}, '
+                         f'tasks={len(task_ids)}')
+        return len(user_ids), len(task_ids)
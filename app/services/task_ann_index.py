@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+from app.logger import setup_logger
+from app.services.recommendation_engines.base import top_n
+from app.services.task_text_index import TaskTextIndex
+
+logger = setup_logger(__name__)
+
+TASK_ANN_PATH = os.getenv('RECO_ANN_PATH', 'data/task_ann')
+RECO_ANN_NPROBE = int(os.getenv('RECO_ANN_NPROBE', 8))
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def spherical_kmeans(
+        vectors: np.ndarray,
+        k: int,
+        iterations: int = 20,
+        seed: int = 42,
+        sample_size: int = 50000,
+) -> np.ndarray:
+    # k-means по косинусу на подвыборке: центроиды нормируются после каждого шага
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~np.any(sums, axis=1)
+        # пустой кластер переинициализируем случайной точкой
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+# IVF-индекс: TF-IDF -> TruncatedSVD -> L2-нормированные float32 эмбеддинги,
+# грубое квантование сферическим k-means, поиск только по nprobe ближайшим спискам
+class TaskAnnIndex:
+    FILES = ('centroids', 'vectors', 'task_ids', 'assignments')
+    SVD_FILE = 'svd.joblib'
+    VOCABULARY_FILE = 'vocabulary.sha1'
+
+    def __init__(
+            self,
+            text_index: Optional[TaskTextIndex] = None,
+            svd: Optional[TruncatedSVD] = None,
+            centroids: Optional[np.ndarray] = None,
+            vectors: Optional[np.ndarray] = None,
+            task_ids: Optional[Sequence[int]] = None,
+            assignments: Optional[np.ndarray] = None,
+            nprobe: int = RECO_ANN_NPROBE,
+    ) -> None:
+        self.text_index = text_index if text_index is not None else TaskTextIndex()
+        self.svd = svd
+        self.nprobe = nprobe
+        dim = centroids.shape[1] if centroids is not None else 0
+        self.centroids = centroids if centroids is not None else np.zeros((0, dim), dtype=np.float32)
+
+        task_ids = np.asarray(task_ids if task_ids is not None else [], dtype=np.int64)
+        self._size = len(task_ids)
+        self._task_ids = task_ids
+        self._vectors = vectors if vectors is not None else np.zeros((0, dim), dtype=np.float32)
+        self._assignments = np.asarray(
+            assignments if assignments is not None else np.zeros(self._size), dtype=np.int64,
+        )
+        self._alive = np.ones(self._size, dtype=bool)
+        self._pos_by_id: Dict[int, int] = {int(t): i for i, t in enumerate(task_ids)}
+
+        # инвертированные списки: номер кластера -> позиции векторов
+        order = np.argsort(self._assignments, kind='stable')
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self.centroids) + 1))
+        self._lists: List[np.ndarray] = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.centroids) == 0
+
+    @property
+    def task_ids(self) -> np.ndarray:
+        return self._task_ids[:self._size][self._alive[:self._size]]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size][self._alive[:self._size]]
+
+    def __len__(self) -> int:
+        return int(self._alive[:self._size].sum())
+
+    def __contains__(self, task_id: int) -> bool:
+        pos = self._pos_by_id.get(int(task_id))
+        return pos is not None and bool(self._alive[pos])
+
+    @classmethod
+    def fit(
+            cls,
+            text_index: TaskTextIndex,
+            n_components: int = 128,
+            nlist: Optional[int] = None,
+            iterations: int = 20,
+            seed: int = 42,
+    ) -> TaskAnnIndex:
+        if text_index.is_empty:
+            return cls(text_index)
+        matrix = text_index.matrix
+        n_components = min(n_components, matrix.shape[0] - 1, matrix.shape[1] - 1)
+        if n_components < 1:
+            return cls(text_index)
+
+        svd = TruncatedSVD(n_components=n_components, random_state=seed)
+        vectors = svd.fit_transform(matrix)
+        index = cls.from_vectors(text_index.task_ids, vectors, nlist, iterations, seed)
+        index.text_index, index.svd = text_index, svd
+        return index
+
+    @classmethod
+    def from_vectors(
+            cls,
+            task_ids: Sequence[int],
+            vectors: np.ndarray,
+            nlist: Optional[int] = None,
+            iterations: int = 20,
+            seed: int = 42,
+    ) -> TaskAnnIndex:
+        # готовые эмбеддинги (например, факторы ALS); без svd вставка по тексту недоступна
+        vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        nlist = nlist or max(1, int(np.sqrt(len(vectors))))
+        centroids = spherical_kmeans(vectors, nlist, iterations=iterations, seed=seed)
+        assignments = cls._assign(vectors, centroids)
+        logger.info(f'Task ANN index built: tasks={len(vectors)}, dim={vectors.shape[1]}, lists={len(centroids)}')
+        return cls(None, None, centroids, vectors, task_ids, assignments)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            out[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        return out
+
+    def save(self, path: str = TASK_ANN_PATH) -> None:
+        os.makedirs(path, exist_ok=True)
+        alive = self._alive[:self._size]
+        np.save(os.path.join(path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(path, 'vectors.npy'), self._vectors[:self._size][alive])
+        np.save(os.path.join(path, 'task_ids.npy'), self._task_ids[:self._size][alive])
+        np.save(os.path.join(path, 'assignments.npy'), self._assignments[:self._size][alive])
+        if self.svd is not None:
+            joblib.dump(self.svd, os.path.join(path, self.SVD_FILE))
+            with open(os.path.join(path, self.VOCABULARY_FILE), 'w') as f:
+                f.write(self.text_index.vocabulary_fingerprint or '')
+        logger.info(f'Task ANN index saved to {path}')
+
+    @classmethod
+    def load(
+            cls,
+            path: str = TASK_ANN_PATH,
+            text_index: Optional[TaskTextIndex] = None,
+            mmap: bool = True,
+    ) -> Optional[TaskAnnIndex]:
+        if not all(os.path.exists(os.path.join(path, f'{name}.npy')) for name in cls.FILES):
+            return None
+        svd_path = os.path.join(path, cls.SVD_FILE)
+        if text_index is not None and os.path.exists(svd_path):
+            # SVD обучен на конкретном словаре TF-IDF: с другим словарём эмбеддинги новых задач бессмысленны
+            fingerprint = cls._read_fingerprint(path)
+            if fingerprint != text_index.vocabulary_fingerprint:
+                logger.warning(
+                    f'Task ANN index at {path} was built for another text index vocabulary, '
+                    f'not loaded: {fingerprint} != {text_index.vocabulary_fingerprint}'
+                )
+                return None
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in cls.FILES}
+        index = cls(
+            text_index, joblib.load(svd_path) if os.path.exists(svd_path) else None,
+            np.asarray(arrays['centroids']), arrays['vectors'],
+            np.asarray(arrays['task_ids']), np.asarray(arrays['assignments']),
+        )
+        logger.info(f'Task ANN index loaded from {path}: tasks={len(index)}, lists={len(index.centroids)}')
+        return index
+
+    @classmethod
+    def _read_fingerprint(cls, path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(path, cls.VOCABULARY_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def embed(self, task_ids: Sequence[int], problems: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+        if self.is_empty or self.svd is None or self.text_index.is_empty:
+            return np.zeros((len(task_ids), self.centroids.shape[1]), dtype=np.float32)
+        return _normalize_rows(self.svd.transform(self.text_index.vectors(task_ids, problems)))
+
+    def add(self, task_id: int, problem: Optional[str]) -> bool:
+        # вставка одной задачи (одобрение): только в памяти процесса, на диск попадёт при следующей сборке
+        if self.is_empty:
+            return False
+        vector = self.embed([task_id], [problem or ""])[0]
+        if not vector.any():
+            return False
+        cluster = int(np.argmax(self.centroids @ vector))
+
+        pos = self._pos_by_id.get(int(task_id))
+        self._reserve(self._size + (1 if pos is None else 0))
+        if pos is not None:
+            self._vectors[pos] = vector
+            self._alive[pos] = True
+            if self._assignments[pos] != cluster:
+                old = self._assignments[pos]
+                self._lists[old] = self._lists[old][self._lists[old] != pos]
+                self._lists[cluster] = np.append(self._lists[cluster], pos)
+                self._assignments[pos] = cluster
+            return True
+
+        pos = self._size
+        self._vectors[pos] = vector
+        self._task_ids[pos] = task_id
+        self._assignments[pos] = cluster
+        self._alive[pos] = True
+        self._pos_by_id[int(task_id)] = pos
+        self._lists[cluster] = np.append(self._lists[cluster], pos)
+        self._size += 1
+        return True
+
+    def remove(self, task_id: int) -> bool:
+        pos = self._pos_by_id.get(int(task_id))
+        if pos is None or not self._alive[pos]:
+            return False
+        self._alive[pos] = False
+        return True
+
+    def _reserve(self, size: int) -> None:
+        # буферы растут удвоением; после load это ещё и копия из read-only mmap
+        capacity = len(self._task_ids)
+        if size <= capacity and self._vectors.flags.writeable:
+            return
+        capacity = max(size, 2 * capacity, 16)
+
+        def grow(array: np.ndarray, fill=0) -> np.ndarray:
+            out = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            out[:self._size] = array[:self._size]
+            return out
+
+        self._vectors = grow(self._vectors)
+        self._task_ids = grow(self._task_ids)
+        self._assignments = grow(self._assignments)
+        self._alive = grow(self._alive, False)
+
+    def vector(self, task_id: int) -> Optional[np.ndarray]:
+        pos = self._pos_by_id.get(int(task_id))
+        if pos is None or not self._alive[pos]:
+            return None
+        return np.asarray(self._vectors[pos])
+
+    def query_for(self, task_ids: Sequence[int]) -> Optional[np.ndarray]:
+        # запрос «по профилю»: нормированная сумма эмбеддингов задач
+        positions = [self._pos_by_id.get(int(t)) for t in task_ids]
+        positions = [p for p in positions if p is not None and self._alive[p]]
+        if not positions:
+            return None
+        query = np.asarray(self._vectors[positions]).sum(axis=0)
+        norm = np.linalg.norm(query)
+        return (query / norm).astype(np.float32) if norm > 0 else None
+
+    def search(
+            self,
+            query: np.ndarray,
+            k: int = 10,
+            nprobe: Optional[int] = None,
+            exclude: Sequence[int] = (),
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self.is_empty or not self._size:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = top_n(self.centroids @ query, nprobe)
+        positions = np.concatenate([self._lists[c] for c in probe])
+        return self._top_k(positions, query, k, exclude)
+
+    def exact_search(self, query: np.ndarray, k: int = 10, exclude: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        return self._top_k(np.arange(self._size), query, k, exclude)
+
+    def _top_k(
+            self,
+            positions: np.ndarray,
+            query: np.ndarray,
+            k: int,
+            exclude: Sequence[int],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        positions = positions[self._alive[positions]]
+        if len(exclude):
+            positions = positions[~np.isin(self._task_ids[positions], np.asarray(exclude, dtype=np.int64))]
+        if not len(positions):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scores = self._vectors[positions] @ query
+        top = top_n(scores, k)
+        return self._task_ids[positions[top]], scores[top]
+
+    def similar(self, task_id: int, k: int = 10, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        vector = self.vector(task_id)
+        if vector is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return self.search(vector, k, nprobe, exclude=[task_id])
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import os
+from typing import Sequence, Dict, Optional, List
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.logger import setup_logger
+from app.models.task_history_table import TaskHistory
+from app.models.task_table import Task
+
+logger = setup_logger(__name__)
+
+TASK_COOCCURRENCE_PATH = os.getenv('RECO_COOCCURRENCE_PATH', 'data/task_cooccurrence')
+
+
+# Item-item матрица «решившие X решили и Y»: косинус по множествам решивших,
+# в каждой строке хранится не более top_k соседей
+class TaskCooccurrence:
+    FILES = ('indptr', 'indices', 'data', 'task_ids')
+
+    def __init__(self, matrix: Optional[sparse.csr_matrix] = None, task_ids: Optional[Sequence[int]] = None) -> None:
+        self.task_ids = np.asarray(task_ids if task_ids is not None else [], dtype=np.int64)
+        n = len(self.task_ids)
+        self.matrix = matrix if matrix is not None else sparse.csr_matrix((n, n), dtype=np.float32)
+        self._pos_by_id: Dict[int, int] = {int(t): i for i, t in enumerate(self.task_ids)}
+
+    @property
+    def is_empty(self) -> bool:
+        return self.matrix.nnz == 0
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def positions(self, task_ids: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self._pos_by_id.get(int(t), -1) for t in task_ids), dtype=np.int64, count=len(task_ids))
+
+    @classmethod
+    async def build(
+            cls,
+            session: AsyncSession,
+            top_k: int = 50,
+            max_items_per_user: int = 200,
+            chunk_size: int = 10000,
+            flush_pairs: int = 5_000_000,
+    ) -> TaskCooccurrence:
+        task_ids = (await session.execute(
+            select(Task.id).where(Task.status == TaskStatusEnum.APPROVED).order_by(Task.id)
+        )).scalars().all()
+        n = len(task_ids)
+        pos_by_id = {int(t): i for i, t in enumerate(task_ids)}
+
+        counts = sparse.csr_matrix((n, n), dtype=np.float32)
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        buffered = 0
+
+        def flush() -> None:
+            nonlocal counts, rows, cols, buffered
+            if not rows:
+                return
+            r, c = np.concatenate(rows), np.concatenate(cols)
+            counts = counts + sparse.csr_matrix((np.ones(len(r), dtype=np.float32), (r, c)), shape=(n, n))
+            rows, cols, buffered = [], [], 0
+
+        def add_basket(basket: List[int]) -> None:
+            nonlocal buffered
+            # корзина ограничена max_items_per_user, поэтому проход линеен по числу строк истории
+            p = np.unique(np.asarray(basket[:max_items_per_user], dtype=np.int64))
+            rr, cc = np.meshgrid(p, p, indexing='ij')
+            rows.append(rr.ravel())
+            cols.append(cc.ravel())
+            buffered += len(p) * len(p)
+            if buffered >= flush_pairs:
+                flush()
+
+        q = (
+            select(TaskHistory.user_id, TaskHistory.task_id)
+            .where(TaskHistory.status == TaskSolutionStatusEnum.RIGHT_SOLUTION)
+            .order_by(TaskHistory.user_id, TaskHistory.timestamp.desc())
+            .execution_options(yield_per=chunk_size)
+        )
+        current_user, basket, history_rows = None, [], 0
+        result = await session.stream(q)
+        async for partition in result.partitions():
+            for user_id, task_id in partition:
+                history_rows += 1
+                if user_id != current_user:
+                    if basket:
+                        add_basket(basket)
+                    current_user, basket = user_id, []
+                pos = pos_by_id.get(int(task_id))
+                if pos is not None:
+                    basket.append(pos)
+        if basket:
+            add_basket(basket)
+        flush()
+
+        matrix = cls._normalize(counts.tocsr(), top_k)
+        logger.info(f'Task co-occurrence built: history_rows={history_rows}, tasks={n}, nnz={matrix.nnz}')
+        return cls(matrix, task_ids)
+
+    @staticmethod
+    def _normalize(counts: sparse.csr_matrix, top_k: int) -> sparse.csr_matrix:
+        # C_ij / sqrt(n_i * n_j), диагональ (сама задача) обнуляется
+        solvers = counts.diagonal().astype(np.float32)
+        norm = np.sqrt(np.maximum(solvers, 1.0))
+        coo = counts.tocoo()
+        keep = coo.row != coo.col
+        r, c = coo.row[keep], coo.col[keep]
+        values = coo.data[keep] / (norm[r] * norm[c])
+
+        # оставляем top_k соседей в каждой строке
+        order = np.lexsort((-values, r))
+        r, c, values = r[order], c[order], values[order]
+        starts = np.searchsorted(r, r, side='left')
+        keep = (np.arange(len(r)) - starts) < top_k
+        n = counts.shape[0]
+        return sparse.csr_matrix((values[keep].astype(np.float32), (r[keep], c[keep])), shape=(n, n))
+
+    def save(self, path: str = TASK_COOCCURRENCE_PATH) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'indptr.npy'), self.matrix.indptr)
+        np.save(os.path.join(path, 'indices.npy'), self.matrix.indices)
+        np.save(os.path.join(path, 'data.npy'), self.matrix.data)
+        np.save(os.path.join(path, 'task_ids.npy'), self.task_ids)
+        logger.info(f'Task co-occurrence saved to {path}')
+
+    @classmethod
+    def load(cls, path: str = TASK_COOCCURRENCE_PATH, mmap: bool = True) -> Optional[TaskCooccurrence]:
+        if not all(os.path.exists(os.path.join(path, f'{name}.npy')) for name in cls.FILES):
+            return None
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in cls.FILES}
+        n = len(arrays['task_ids'])
+        matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=(n, n), copy=False)
+        logger.info(f'Task co-occurrence loaded from {path}: tasks={n}, nnz={matrix.nnz}')
+        return cls(matrix, np.asarray(arrays['task_ids']))
+
+    def scores(self, candidate_ids: Sequence[int], solved_ids: Sequence[int]) -> np.ndarray:
+        out = np.zeros(len(candidate_ids), dtype=np.float64)
+        if self.is_empty or not len(candidate_ids) or not len(solved_ids):
+            return out
+        solved = self.positions(solved_ids)
+        solved = solved[solved >= 0]
+        if not len(solved):
+            return out
+        # сумма строк соседей решённых задач, нормируем в [0, 1]
+        totals = np.asarray(self.matrix[solved].sum(axis=0)).ravel()
+        peak = totals.max()
+        if peak <= 0:
+            return out
+        cand = self.positions(candidate_ids)
+        known = cand >= 0
+        out[known] = totals[cand[known]] / peak
+        return out
+
+    def batch_scores(self, candidate_ids: Sequence[int], solved_lists: Sequence[Sequence[int]]) -> np.ndarray:
+        # то же, что scores(), для нескольких пользователей одним произведением матриц
+        out = np.zeros((len(solved_lists), len(candidate_ids)), dtype=np.float64)
+        if self.is_empty or not len(candidate_ids):
+            return out
+        rows, cols = [], []
+        for row, solved in enumerate(solved_lists):
+            pos = self.positions(solved)
+            pos = pos[pos >= 0]
+            rows.append(np.full(len(pos), row))
+            cols.append(pos)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        if not len(rows):
+            return out
+        indicator = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(solved_lists), len(self)),
+        )
+        totals = indicator @ self.matrix
+        peak = totals.max(axis=1).toarray().ravel()
+        cand = self.positions(candidate_ids)
+        known = np.flatnonzero(cand >= 0)
+        values = totals[:, cand[known]].toarray()
+        scale = np.divide(1.0, peak, out=np.zeros_like(peak, dtype=np.float64), where=peak > 0)
+        out[:, known] = values * scale[:, None]
+        return out
@@ -1,12 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.CRUD.task_history import TaskHistoryCRUD
+from app.db.CRUD.user_recommendation import UserRecommendationCRUD
 from app.enums.task_solution_status import TaskSolutionStatusEnum
 from app.enums.user_role import UserRoleEnum
 from app.exceptions.base_exception import PermissionDenied
 from app.logger import setup_logger
 from app.models.task_history_table import TaskHistory
 from app.models.user_table import User
+from app.services.recommendation_cache import recommendation_cache
+from app.services.skill_rating_service import SkillRatingService
+from app.services.user_profile_service import UserProfileService
 
 
 from datetime import datetime
@@ -16,7 +20,12 @@ from app.schemas.task_history import TaskHistoryCreate
 
 class TaskHistoryService:
     def __init__(self, db: AsyncSession):
+        self._db = db
         self._crud = TaskHistoryCRUD(db)
+        self._profile_service = UserProfileService(db)
+        self._rating_service = SkillRatingService(db)
+        self._precomputed_crud = UserRecommendationCRUD(db)
+        self._reco_cache = recommendation_cache
         self.logger = setup_logger(__name__)
 
     def _ensure_own_data(self, user: User, target_user_id: int):
@@ -32,7 +41,14 @@ class TaskHistoryService:
             user_id=user.id,
             timestamp=datetime.now()
         )
-        return await self._crud.create(history)
+        # попытка, task_stats, профиль, рейтинги и сброс предпосчитанного списка — одна транзакция
+        created = await self._crud.create(history, commit=False)
+        profile = await self._profile_service.apply_attempt(created, commit=False)
+        await self._rating_service.apply_attempt(created, profile, commit=False)
+        await self._precomputed_crud.delete_by_user_id(user.id, commit=False)
+        await self._db.commit()
+        await self._reco_cache.invalidate_user(user.id)
+        return await self._crud.get_with_relations(created.id)
 
     async def get_user_history(self, current_user: User, target_user_id: int) -> list[TaskHistory]:
         self._ensure_own_data(current_user, target_user_id)
@@ -0,0 +1,115 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.task_neighbour import TaskNeighbourCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.logger import setup_logger
+from app.models.task_table import Task
+from app.services.recommendation_engines.base import top_n
+from app.services.task_text_index import TaskTextIndex
+
+TASK_NEIGHBOURS_K = int(os.getenv('RECO_TASK_NEIGHBOURS_K', 20))
+# ограничение на размер плотного блока chunk x n_tasks при массовой сборке
+BUILD_BLOCK_SIZE = 20_000_000
+
+
+class TaskNeighbourService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._crud = TaskNeighbourCRUD(db)
+        self.logger = setup_logger(__name__)
+
+    async def get_similar(self, task_id: int, k: int = 10):
+        return await self._crud.get_similar(task_id, k)
+
+    async def rebuild(self, index: TaskTextIndex, k: int = TASK_NEIGHBOURS_K, insert_batch: int = 10000) -> int:
+        # вся таблица заменяется в одной транзакции, читатели видят либо старые, либо новые списки
+        await self._crud.delete_all(commit=False)
+        if index.is_empty:
+            await self.db.commit()
+            return 0
+
+        # индекс с диска мог устареть: удалённые и снятые с одобрения задачи не попадают в списки
+        approved = (await self.db.execute(
+            select(Task.id).where(Task.status == TaskStatusEnum.APPROVED)
+        )).scalars().all()
+        alive = np.isin(index.task_ids, np.asarray(approved, dtype=np.int64))
+        matrix, task_ids = index.matrix[alive], index.task_ids[alive]
+        if len(task_ids) == 0:
+            await self.db.commit()
+            return 0
+        chunk_size = max(1, BUILD_BLOCK_SIZE // max(len(task_ids), 1))
+        total, batch = 0, []
+        for start in range(0, len(task_ids), chunk_size):
+            sim = (matrix[start:start + chunk_size] @ matrix.T).toarray()
+            rows = np.arange(sim.shape[0])
+            sim[rows, rows + start] = 0.0
+            for row in rows:
+                for pos, score in zip(*self._top_k(sim[row], k)):
+                    batch.append({
+                        'task_id': int(task_ids[start + row]),
+                        'neighbour_id': int(task_ids[pos]),
+                        'score': float(score),
+                    })
+            if len(batch) >= insert_batch:
+                total += await self._crud.insert_rows(batch, commit=False)
+                batch = []
+        total += await self._crud.insert_rows(batch, commit=False)
+        await self.db.commit()
+        self.logger.info(f'Task neighbours rebuilt: tasks={len(task_ids)}, rows={total}, k={k}')
+        return total
+
+    async def add_task(self, task: Task, index: TaskTextIndex, k: int = TASK_NEIGHBOURS_K) -> int:
+        if index.is_empty:
+            return 0
+        # поиск идёт и по задачам, одобренным после сборки индекса (TaskTextIndex.add)
+        task_ids, sim = index.similarities(index.vectors([task.id], [task.problem]))
+        positions, scores = self._top_k(sim, 2 * k)
+        candidates = {
+            int(task_ids[p]): float(s) for p, s in zip(positions, scores) if task_ids[p] != task.id
+        }
+
+        # индекс мог устареть: оставляем только существующие одобренные задачи
+        alive = set((await self.db.execute(
+            select(Task.id).where(Task.id.in_(list(candidates))).where(Task.status == TaskStatusEnum.APPROVED)
+        )).scalars().all())
+        neighbours = [(t, s) for t, s in candidates.items() if t in alive][:k]
+        if not neighbours:
+            return 0
+
+        # повторное одобрение: старые рёбра задачи заменяются целиком
+        await self._crud.delete_for_task(task.id, commit=False)
+
+        # обратные рёбра: новая задача вытесняет самого слабого соседа, если список уже полный
+        existing = {}
+        for task_id, neighbour_id, score in await self._crud.get_for_tasks([t for t, _ in neighbours]):
+            existing.setdefault(task_id, []).append((score, neighbour_id))
+        rows = [{'task_id': task.id, 'neighbour_id': t, 'score': s} for t, s in neighbours]
+        evicted: List[Tuple[int, int]] = []
+        for neighbour_id, score in neighbours:
+            current = existing.get(neighbour_id, [])
+            if len(current) >= k:
+                weakest = min(current)
+                if weakest[0] >= score:
+                    continue
+                evicted.append((neighbour_id, weakest[1]))
+            rows.append({'task_id': neighbour_id, 'neighbour_id': task.id, 'score': score})
+
+        await self._crud.delete_pairs(evicted, commit=False)
+        inserted = await self._crud.insert_rows(rows)
+        self.logger.info(f'Task neighbours updated, task_id: {task.id}, rows: {inserted}')
+        return inserted
+
+    async def remove_task(self, task_id: int, commit: bool = True) -> int:
+        # списки соседей укорачиваются до следующей полной сборки
+        return await self._crud.delete_for_task(task_id, commit=commit)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        top = top_n(scores, k)
+        top = top[scores[top] > 0]
+        return top, scores[top]
@@ -1,20 +1,39 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.CRUD.task import TaskCRUD
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.db.CRUD.task_translation import TaskTranslationCRUD
 from app.enums.task_moderation_status import TaskStatusEnum
 from app.enums.user_role import UserRoleEnum
 from app.exceptions.task_exception import PermissionDeniedTask, TaskNotPendingModeration, TaskNotFound
 from app.logger import setup_logger
 from app.metrics import TASKS_CREATED
 from app.models.task_table import Task
+from app.models.task_translation_table import TaskTranslation
 from app.models.user_table import User
 from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_service import RecommendationService
+from app.services.task_neighbour_service import TaskNeighbourService
+from app.services.translation_worker import TranslationWorker
 from app.utils.metrics_utils import count
 
 
 class TaskService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+            self,
+            db: AsyncSession,
+            recommendation_service: RecommendationService | None = None,
+            translation_worker: TranslationWorker | None = None,
+    ):
+        self._db = db
         self._task_crud = TaskCRUD(db)
+        self._reco_cache = recommendation_cache
+        self._reco_service = recommendation_service
+        self._neighbour_service = TaskNeighbourService(db)
+        self._stats_crud = TaskStatsCRUD(db)
+        self._translation_crud = TaskTranslationCRUD(db)
+        self._translation_worker = translation_worker
         self.logger = setup_logger(__name__)
 
     def _task_labels(_self, task_data, *_, **__):
@@ -32,6 +51,8 @@ class TaskService:
 
         created_task = await self._task_crud.create(task)
         self.logger.info(f'Task by user {creator.id} created with id {created_task.id}')
+        if created_task.status == TaskStatusEnum.APPROVED:
+            await self._on_task_approved(created_task)
 
         return created_task
 
@@ -56,9 +77,28 @@ class TaskService:
             'status': TaskStatusEnum.APPROVED
         })
         self.logger.info(f'Task approved, task_id: {task_id}')
+        await self._on_task_approved(updated_task)
         return updated_task
 
 
+    async def _on_task_approved(self, task: Task) -> None:
+        await self._stats_crud.ensure_task(task.id)
+        await self._reco_cache.invalidate_all()
+        if self._reco_service is not None:
+            # задача уже одобрена и сохранена: сбой обновления индексов не должен ронять запрос,
+            # индексы догонят при следующей пересборке
+            try:
+                self._reco_service.on_task_approved(task)
+            except Exception as e:
+                self.logger.error(f'ANN index update failed, task_id: {task.id}: {e}')
+            try:
+                await self._neighbour_service.add_task(task, self._reco_service.index)
+            except Exception as e:
+                self.logger.error(f'Task neighbours update failed, task_id: {task.id}: {e}')
+        if self._translation_worker is not None:
+            await self._translation_worker.enqueue(task.id)
+
+
     async def reject_task(self, task_id: int, moderator: User) -> Task:
         self.logger.info(f'Starting rejecting task, task_id: {task_id}, moderator: {moderator.id}')
         if not self._can_moderate(moderator):
@@ -103,8 +143,15 @@ class TaskService:
             self.logger.exception(f'Task not found, task_id: {task_id}')
             raise TaskNotFound()
 
+        # задача и её рёбра в списках соседей удаляются одной транзакцией
+        result = await self._task_crud.delete_task_by_id(task_id, commit=False)
+        await self._neighbour_service.remove_task(task_id, commit=False)
+        await self._db.commit()
+        await self._reco_cache.invalidate_all()
+        if self._reco_service is not None:
+            self._reco_service.on_task_deleted(task_id)
         self.logger.info(f'Task deleted, task_id: {task_id}, moderator: {requesting_by.id}')
-        return await self._task_crud.delete_task_by_id(task_id)
+        return result
 
 
     async def get_tasks_by_filters(self, requesting_by: User, **filters):
@@ -128,6 +175,20 @@ class TaskService:
         return task
 
 
+    async def get_task_with_translation(self, requesting_by: User, task_id: int, lang: str) \
+            -> tuple[Task, TaskTranslation | None]:
+        # только чтение готового перевода, модель на этом пути не вызывается
+        task = await self.get_task_by_id(requesting_by, task_id)
+        return task, await self._translation_crud.get_translation(task_id, lang)
+
+
+    async def get_similar_tasks(self, requesting_by: User, task_id: int, k: int = 10):
+        self.logger.info(f'Getting similar tasks, task_id: {task_id}, user: {requesting_by.id}')
+        # та же проверка существования и видимости, что и при чтении самой задачи
+        await self.get_task_by_id(requesting_by, task_id)
+        return await self._neighbour_service.get_similar(task_id, k)
+
+
     async def get_own_tasks(self, user: User) -> list[Task]:
         return await self._task_crud.get_all(creator_id=user.id)
 
@@ -150,7 +211,11 @@ class TaskService:
     async def update_task(self, task_id: int, updated_data: TaskUpdate, requesting_by: User) -> Task:
         task = await self._task_crud.get_task_by_id(task_id)
         if task.creator_id == requesting_by.id or self._can_moderate(requesting_by):
-            return await self._task_crud.update(task, updated_data.model_dump(exclude_unset=True))
+            updated_task = await self._task_crud.update(task, updated_data.model_dump(exclude_unset=True))
+            # изменённый текст одобренной задачи переводится заново
+            if self._translation_worker is not None and updated_task.status == TaskStatusEnum.APPROVED:
+                await self._translation_worker.enqueue(updated_task.id)
+            return updated_task
         raise PermissionDeniedTask('User is not a moderator and not the creator of the task')
 
 
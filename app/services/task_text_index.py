@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from functools import cached_property
+from typing import Sequence, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.logger import setup_logger
+from app.models.task_table import Task
+
+logger = setup_logger(__name__)
+
+TASK_INDEX_PATH = os.getenv('RECO_TASK_INDEX_PATH', 'data/task_index')
+
+
+# TF-IDF матрица по текстам всех одобренных задач: строка = задача, строки L2-нормированы
+class TaskTextIndex:
+    # CSR по частям в .npy, чтобы загружать через mmap и делить страницы между воркерами
+    CSR_FILES = ('data', 'indices', 'indptr')
+    IDS_FILE = 'task_ids.npy'
+    VECTORIZER_FILE = 'vectorizer.joblib'
+
+    def __init__(
+            self,
+            vectorizer: Optional[TfidfVectorizer] = None,
+            matrix: Optional[sparse.csr_matrix] = None,
+            task_ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.vectorizer = vectorizer
+        self.task_ids = np.asarray(task_ids if task_ids is not None else [], dtype=np.int64)
+        n_features = len(vectorizer.vocabulary_) if vectorizer is not None else 0
+        self.matrix = (
+            sparse.csr_matrix(matrix) if matrix is not None
+            else sparse.csr_matrix((len(self.task_ids), n_features), dtype=np.float64)
+        )
+        self._row_by_id: Dict[int, int] = {int(t): i for i, t in enumerate(self.task_ids)}
+        # задачи, одобренные после сборки: (матрица, id, id -> строка), заменяется целиком,
+        # чтобы ранжирование в потоках executor'а не видело состояние посреди вставки
+        self._delta: Tuple[sparse.csr_matrix, np.ndarray, Dict[int, int]] = (
+            sparse.csr_matrix((0, n_features), dtype=np.float64), np.empty(0, dtype=np.int64), {},
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return self.vectorizer is None or self.matrix.shape[0] == 0
+
+    @cached_property
+    def vocabulary_fingerprint(self) -> Optional[str]:
+        # отпечаток словаря и idf: производные модели (SVD в ANN-индексе) валидны только для него
+        if self.vectorizer is None:
+            return None
+        terms = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+        digest = hashlib.sha1('\n'.join(terms).encode())
+        digest.update(np.asarray(self.vectorizer.idf_, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def __contains__(self, task_id: int) -> bool:
+        return int(task_id) in self._row_by_id or int(task_id) in self._delta[2]
+
+    @classmethod
+    def fit(
+            cls,
+            rows: Sequence[tuple],
+            max_features: int = 20000,
+            min_df: int = 2,
+            max_df: float = 0.8,
+    ) -> TaskTextIndex:
+        if not rows:
+            return cls()
+        task_ids = [int(task_id) for task_id, _ in rows]
+        problems = [problem or "" for _, problem in rows]
+        vectorizer = TfidfVectorizer(max_features=max_features, min_df=min_df, max_df=max_df)
+        try:
+            matrix = vectorizer.fit_transform(problems)
+        except ValueError as e:
+            # слишком маленький корпус для min_df/max_df или пустой словарь
+            logger.warning(f'Task text index is not built: {e}')
+            return cls()
+        return cls(vectorizer, matrix.tocsr(), task_ids)
+
+    @classmethod
+    async def build(cls, session: AsyncSession, **vectorizer_params) -> TaskTextIndex:
+        q = (
+            select(Task.id, Task.problem)
+            .where(Task.status == TaskStatusEnum.APPROVED)
+            .order_by(Task.id)
+        )
+        rows = (await session.execute(q)).all()
+        index = cls.fit(rows, **vectorizer_params)
+        logger.info(f'Task text index built: tasks={len(index)}, features={index.matrix.shape[1]}')
+        return index
+
+    def save(self, path: str = TASK_INDEX_PATH) -> None:
+        if self.is_empty:
+            logger.warning('Task text index is empty, nothing to save')
+            return
+        os.makedirs(path, exist_ok=True)
+        for name in self.CSR_FILES:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self.matrix, name))
+        np.save(os.path.join(path, self.IDS_FILE), self.task_ids)
+        joblib.dump(self.vectorizer, os.path.join(path, self.VECTORIZER_FILE))
+        logger.info(f'Task text index saved to {path}')
+
+    @classmethod
+    def load(cls, path: str = TASK_INDEX_PATH, mmap: bool = True) -> Optional[TaskTextIndex]:
+        if not all(os.path.exists(os.path.join(path, f'{name}.npy')) for name in cls.CSR_FILES):
+            return None
+        task_ids = np.load(os.path.join(path, cls.IDS_FILE))
+        vectorizer = joblib.load(os.path.join(path, cls.VECTORIZER_FILE))
+        mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in cls.CSR_FILES]
+        shape = (len(task_ids), len(vectorizer.vocabulary_))
+        matrix = sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+        logger.info(f'Task text index loaded from {path}: tasks={len(task_ids)}')
+        return cls(vectorizer, matrix, task_ids)
+
+    def add(self, task_id: int, problem: Optional[str]) -> bool:
+        # вставка одной задачи (одобрение): только в памяти процесса, в основную матрицу
+        # попадёт при следующей сборке. Базовая матрица не копируется — она может быть в mmap
+        if self.is_empty:
+            return False
+        vector = self.vectorizer.transform([problem or ""]).tocsr()
+        if not vector.nnz:
+            return False
+        matrix, ids, _ = self._delta
+        keep = ids != int(task_id)
+        matrix = sparse.vstack([matrix[keep], vector]).tocsr()
+        ids = np.append(ids[keep], np.int64(task_id))
+        self._delta = (matrix, ids, {int(t): i for i, t in enumerate(ids)})
+        return True
+
+    def similarities(self, vector: sparse.csr_matrix) -> Tuple[np.ndarray, np.ndarray]:
+        # близость одного вектора ко всем задачам индекса, включая добавленные после сборки
+        delta, delta_ids, delta_rows = self._delta
+        scores = (vector @ self.matrix.T).toarray().ravel()
+        if not delta_rows:
+            return self.task_ids, scores
+        # переодобренная задача представлена свежим вектором, старая строка не участвует
+        stale = [self._row_by_id[t] for t in delta_rows if t in self._row_by_id]
+        scores[stale] = 0.0
+        return (
+            np.concatenate([self.task_ids, delta_ids]),
+            np.concatenate([scores, (vector @ delta.T).toarray().ravel()]),
+        )
+
+    def vectors(self, task_ids: Sequence[int], problems: Optional[Sequence[str]] = None) -> sparse.csr_matrix:
+        delta, _, delta_rows = self._delta
+        rows = np.fromiter((self._row_by_id.get(int(t), -1) for t in task_ids), dtype=np.int64, count=len(task_ids))
+        if not delta_rows and (rows >= 0).all():
+            return self.matrix[rows]
+
+        fresh = np.fromiter((delta_rows.get(int(t), -1) for t in task_ids), dtype=np.int64, count=len(task_ids))
+        rows[fresh >= 0] = -1
+        known, added = np.flatnonzero(rows >= 0), np.flatnonzero(fresh >= 0)
+        # задач нет в индексе (созданы после сборки) — векторизуем текст на лету
+        missing = np.flatnonzero((rows < 0) & (fresh < 0))
+        parts = [self.matrix[rows[known]], delta[fresh[added]]]
+        if len(missing):
+            texts = [(problems[i] if problems is not None else None) or "" for i in missing]
+            parts.append(self.vectorizer.transform(texts))
+        out = sparse.vstack(parts).tocsr()
+        order = np.empty(len(rows), dtype=np.int64)
+        order[np.concatenate([known, added, missing])] = np.arange(len(rows))
+        return out[order]
+
+    def max_similarity(
+            self,
+            candidate_ids: Sequence[int],
+            candidate_problems: Sequence[str],
+            history_ids: Sequence[int],
+            history_problems: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        if self.is_empty or not len(candidate_ids) or not len(history_ids):
+            return np.zeros(len(candidate_ids), dtype=np.float64)
+        cand = self.vectors(candidate_ids, candidate_problems)
+        hist = self.vectors(history_ids, history_problems)
+        # строки нормированы, поэтому скалярное произведение = косинусная близость
+        sim = cand @ hist.T
+        return sim.max(axis=1).toarray().ravel()
+
+
+async def init_task_index(session: AsyncSession, path: str = TASK_INDEX_PATH) -> TaskTextIndex:
+    index = TaskTextIndex.load(path)
+    if index is None:
+        index = await TaskTextIndex.build(session)
+        index.save(path)
+    return index
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.task_translation import TaskTranslationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.logger import setup_logger
+from app.models.task_table import Task
+
+TRANSLATION_TARGET_LANG = os.getenv('TRANSLATION_TARGET_LANG', 'ru')
+TRANSLATED_FIELDS = ('problem', 'solution', 'answer')
+
+
+@dataclass
+class CatalogCheckpoint:
+    # последний обработанный id задачи и накопленная статистика; сохраняется после каждой пачки
+    last_id: int = 0
+    tasks: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds > 0 else 0.0
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'CatalogCheckpoint':
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path: Optional[str]) -> None:
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp, path)
+
+
+class TaskTranslationService:
+    # translator — TranslationService (или совместимый объект с translate_documents/needs_translation/stats)
+    def __init__(self, db: AsyncSession, translator):
+        self.db = db
+        self.translator = translator
+        self._crud = TaskTranslationCRUD(db)
+        self.logger = setup_logger(__name__)
+
+    async def get_translation(self, task_id: int, lang: str = TRANSLATION_TARGET_LANG):
+        return await self._crud.get_translation(task_id, lang)
+
+    async def translate_catalog(
+            self,
+            lang: str = TRANSLATION_TARGET_LANG,
+            chunk_size: int = 200,
+            batch_size: Optional[int] = 64,
+            checkpoint_path: Optional[str] = None,
+            reset: bool = False,
+            max_tasks: Optional[int] = None,
+    ) -> CatalogCheckpoint:
+        checkpoint = CatalogCheckpoint() if reset else CatalogCheckpoint.load(checkpoint_path)
+        processed = 0
+        while max_tasks is None or processed < max_tasks:
+            limit = chunk_size if max_tasks is None else min(chunk_size, max_tasks - processed)
+            # keyset по id: пачки читаются с места остановки, перезапуск продолжает с чекпойнта
+            rows = (await self.db.execute(
+                select(Task.id, Task.problem, Task.solution, Task.answer)
+                .where(Task.status == TaskStatusEnum.APPROVED)
+                .where(Task.id > checkpoint.last_id)
+                .order_by(Task.id)
+                .limit(limit)
+            )).all()
+            if not rows:
+                break
+
+            t0 = time.perf_counter()
+            tokens_before = self.translator.stats.tokens
+            translated = await self.translate_rows(rows, lang, batch_size)
+            await self._crud.bulk_replace(translated)
+            elapsed = time.perf_counter() - t0
+            tokens = self.translator.stats.tokens - tokens_before
+
+            checkpoint.last_id = rows[-1].id
+            checkpoint.tasks += len(rows)
+            checkpoint.tokens += tokens
+            checkpoint.seconds += elapsed
+            checkpoint.save(checkpoint_path)
+            processed += len(rows)
+            self.logger.info(
+                f'Catalog translation chunk: tasks={len(rows)}, last_id={checkpoint.last_id}, '
+                f'tokens/s={tokens / elapsed if elapsed > 0 else 0.0:.0f}, total_tasks={checkpoint.tasks}'
+            )
+        return checkpoint
+
+    async def translate_rows(self, rows: Sequence, lang: str, batch_size: Optional[int] = None) -> List[dict]:
+        texts = [getattr(row, field) or '' for row in rows for field in TRANSLATED_FIELDS]
+        # через модель идут только английские тексты, остальные сохраняются как есть
+        pending = [i for i, text in enumerate(texts) if self.translator.needs_translation(text)]
+        translated = await self.translator.translate_documents([texts[i] for i in pending], lang, batch_size)
+        for i, text in zip(pending, translated):
+            texts[i] = text
+
+        width = len(TRANSLATED_FIELDS)
+        return [
+            {
+                'task_id': row.id,
+                'lang': lang,
+                'model_version': self.translator.model_version,
+                **dict(zip(TRANSLATED_FIELDS, texts[i * width:(i + 1) * width])),
+            }
+            for i, row in enumerate(rows)
+        ]
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from typing import List, Optional, Set, Tuple
+
+from app.metrics import TRANSLATION_BATCH_SIZE
+from .providers.base import BaseMTProvider
+
+# запросы копятся не дольше TRANSLATION_BATCH_WAIT_MS или до TRANSLATION_BATCH_MAX_SIZE предложений
+TRANSLATION_BATCH_MAX_SIZE = int(os.getenv("TRANSLATION_BATCH_MAX_SIZE", 32))
+TRANSLATION_BATCH_WAIT_MS = float(os.getenv("TRANSLATION_BATCH_WAIT_MS", 10))
+# собранные предложения декодируются группами близкой длины: батч дополняется паддингом до самого
+# длинного, поэтому в группу не больше TRANSLATION_BUCKET_SIZE предложений и самое длинное
+# не более чем в TRANSLATION_BUCKET_LENGTH_RATIO раз длиннее самого короткого
+TRANSLATION_BUCKET_SIZE = int(os.getenv("TRANSLATION_BUCKET_SIZE", 8))
+TRANSLATION_BUCKET_LENGTH_RATIO = float(os.getenv("TRANSLATION_BUCKET_LENGTH_RATIO", 2.0))
+
+
+class MicroBatchingProvider(BaseMTProvider):
+    # Собирает одиночные запросы от конкурентных вызовов и отдаёт их provider.translate группами
+    # близкой длины, каждый вызывающий получает свой результат через отдельный future
+    def __init__(
+        self,
+        provider: BaseMTProvider,
+        max_batch_size: int = TRANSLATION_BATCH_MAX_SIZE,
+        max_wait_ms: float = TRANSLATION_BATCH_WAIT_MS,
+        bucket_size: int = TRANSLATION_BUCKET_SIZE,
+        bucket_length_ratio: float = TRANSLATION_BUCKET_LENGTH_RATIO,
+    ):
+        self.provider = provider
+        self.model_version = getattr(provider, "model_version", type(provider).__name__)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.bucket_size = bucket_size
+        self.bucket_length_ratio = bucket_length_ratio
+        # длина в токенах, если провайдер её умеет считать, иначе в символах
+        self._length = getattr(provider, "token_length", len)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def translate(self, batch: List[str]) -> List[str]:
+        if not batch:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in batch:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def token_length(self, s: str) -> int:
+        return self._length(s)
+
+    def close(self) -> None:
+        self.provider.close()
+
+    async def _lengths(self, texts: List[str]) -> List[int]:
+        if self._length is len:
+            return [len(t) for t in texts]
+        # токенизация SentencePiece блокирует, event loop её не ждёт
+        return await asyncio.to_thread(lambda: [self._length(t) for t in texts])
+
+    def _buckets(self, items: List[Tuple[str, asyncio.Future]], lengths: List[int]) -> List[list]:
+        order = sorted(range(len(items)), key=lengths.__getitem__)
+        buckets, shortest = [], 0
+        for i in order:
+            if not buckets or len(buckets[-1]) >= self.bucket_size \
+                    or lengths[i] > max(shortest, 1) * self.bucket_length_ratio:
+                buckets.append([])
+                shortest = lengths[i]
+            buckets[-1].append(items[i])
+        return buckets
+
+    async def _run(self, items: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            lengths = await self._lengths([text for text, _ in items])
+        except Exception as e:
+            self._fail(items, e)
+            return
+        buckets = self._buckets(items, lengths)
+        # группы уходят провайдеру одновременно: у CTranslate2 несколько реплик модели
+        await asyncio.gather(*(self._run_bucket(bucket) for bucket in buckets))
+
+    async def _run_bucket(self, items: List[Tuple[str, asyncio.Future]]) -> None:
+        TRANSLATION_BATCH_SIZE.observe(len(items))
+        try:
+            results = await self.provider.translate([text for text, _ in items])
+        except Exception as e:
+            self._fail(items, e)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(items: List[Tuple[str, asyncio.Future]], error: Exception) -> None:
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
@@ -1,3 +1,4 @@
+import hashlib
 import re
 from typing import Dict, List
 
@@ -5,6 +6,12 @@ class Glossary:
     def __init__(self, en2ru: Dict[str, str] | None = None):
         self.en2ru = {k.lower(): v for k, v in (en2ru or {}).items()}
 
+    @property
+    def version(self) -> str:
+        # меняется вместе с содержимым глоссария: старые переводы в кэше перестают совпадать
+        payload = "\n".join(f"{k}\t{v}" for k, v in sorted(self.en2ru.items()))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
     def vocab_constraints(self) -> List[List[str]]:
         return [v.split() for v in self.en2ru.values()]
 
@@ -5,3 +5,6 @@ class BaseMTProvider(abc.ABC):
     @abc.abstractmethod
     async def translate(self, batch: List[str]) -> List[str]:
         ...
+
+    def close(self) -> None:
+        pass
@@ -1,9 +1,18 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 import ctranslate2
 from sentencepiece import SentencePieceProcessor
+from app.metrics import TRANSLATION_DECODE_SECONDS, TRANSLATION_QUEUE_DEPTH, TRANSLATION_WAIT_SECONDS
 from .base import BaseMTProvider
 from ..glossary import Glossary
 
+# inter_threads — сколько батчей декодируется параллельно (реплики модели), intra_threads — потоки на батч
+TRANSLATION_INTER_THREADS = int(os.getenv("TRANSLATION_INTER_THREADS", 1))
+TRANSLATION_INTRA_THREADS = int(os.getenv("TRANSLATION_INTRA_THREADS", 0))
+
 class MarianCTranslate2Provider(BaseMTProvider):
     def __init__(
         self,
@@ -11,11 +20,17 @@ class MarianCTranslate2Provider(BaseMTProvider):
         spm_path: str,
         glossary: Optional[Glossary] = None,
         beam_size: int = 4,
+        inter_threads: int = TRANSLATION_INTER_THREADS,
+        intra_threads: int = TRANSLATION_INTRA_THREADS,
     ):
-        self.translator = ctranslate2.Translator(model_dir, inter_threads=1, intra_threads=0)
+        self.translator = ctranslate2.Translator(model_dir, inter_threads=inter_threads, intra_threads=intra_threads)
         self.spm = SentencePieceProcessor(model_file=spm_path)
         self.glossary = glossary
         self.beam_size = beam_size
+        self.model_version = os.getenv("TRANSLATION_MODEL_VERSION") or os.path.basename(os.path.normpath(model_dir))
+        # beam search блокирует поток: декодирование идёт в отдельном пуле, event loop свободен.
+        # Потоков столько же, сколько реплик, — больше всё равно ждали бы в очереди CTranslate2
+        self._executor = ThreadPoolExecutor(max_workers=inter_threads, thread_name_prefix="ct2-decode")
 
     def _encode(self, s: str) -> List[str]:
         return self.spm.encode(s, out_type=str)
@@ -23,10 +38,16 @@ class MarianCTranslate2Provider(BaseMTProvider):
     def _decode(self, toks: List[str]) -> str:
         return self.spm.decode(toks)
 
-    async def translate(self, batch: List[str]) -> List[str]:
+    def token_length(self, s: str) -> int:
+        return len(self._encode(s))
+
+    def _translate_sync(self, batch: List[str], submitted: float) -> List[str]:
+        TRANSLATION_WAIT_SECONDS.observe(max(time.time() - submitted, 0.0))
+        t0 = time.perf_counter()
         src_tokens = [self._encode(t) for t in batch]
         vocab = self.glossary.vocab_constraints() if self.glossary else None
 
+        # asynchronous=True: задание уходит в очередь реплик CTranslate2, поток ждёт только result()
         results = self.translator.translate_batch(
             src_tokens,
             beam_size=self.beam_size,
@@ -35,5 +56,22 @@ class MarianCTranslate2Provider(BaseMTProvider):
             repetition_penalty=1.05,
             disable_unk=True,
             vocabulary=vocab,
+            asynchronous=True,
         )
-        return [self._decode(r.hypotheses[0]) for r in results]
+        out = [self._decode(r.result().hypotheses[0]) for r in results]
+        TRANSLATION_DECODE_SECONDS.observe(time.perf_counter() - t0)
+        return out
+
+    async def translate(self, batch: List[str]) -> List[str]:
+        if not batch:
+            return []
+        TRANSLATION_QUEUE_DEPTH.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._translate_sync, batch, time.time(),
+            )
+        finally:
+            TRANSLATION_QUEUE_DEPTH.dec()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,26 @@
+import re
+from typing import List, Tuple
+
+# граница предложения: знак конца и пробел/перевод строки, дальше заглавная буква, цифра или маска.
+# Текст уже маскирован, поэтому точки внутри формул и кода не режут предложение
+_BOUNDARY = re.compile(r"(?<=[.!?])(\s+)(?=[A-ZА-ЯЁ0-9⟪(\"«])|(\n\s*\n\s*)")
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    # (предложение, разделитель после него): склейка обратно сохраняет абзацы
+    parts: List[Tuple[str, str]] = []
+    start = 0
+    for m in _BOUNDARY.finditer(text):
+        sentence = text[start:m.start()]
+        if sentence:
+            parts.append((sentence, m.group(0)))
+        elif parts:
+            parts[-1] = (parts[-1][0], parts[-1][1] + m.group(0))
+        start = m.end()
+    if start < len(text) or not parts:
+        parts.append((text[start:], ""))
+    return parts
+
+
+def join_sentences(sentences: List[str], separators: List[str]) -> str:
+    return "".join(s + sep for s, sep in zip(sentences, separators))
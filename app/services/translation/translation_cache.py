@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from redis.asyncio import Redis
+
+from app.logger import setup_logger
+from app.metrics import TRANSLATION_CACHE_REQUESTS
+from app.utils.redis_client import redis_client
+
+logger = setup_logger(__name__)
+
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", 30 * 24 * 3600))
+TRANSLATION_CACHE_LRU_SIZE = int(os.getenv("TRANSLATION_CACHE_LRU_SIZE", 10000))
+TRANSLATION_CACHE_PREFIX = "tr"
+
+_SPACES = re.compile(r"[ \t]+")
+
+
+def normalize_source(masked: str) -> str:
+    # переносы строк сохраняются: абзацы переводятся как есть
+    return "\n".join(_SPACES.sub(" ", line).strip() for line in masked.strip().splitlines())
+
+
+def translation_key(masked: str, model_version: str, glossary_version: str, target_lang: str) -> str:
+    # ключ по маскированному тексту: формулы и код заменены на ⟪MASK_i⟫, поэтому задачи,
+    # отличающиеся только числами в формулах, переводятся один раз
+    payload = "\x1f".join((model_version, glossary_version, target_lang, normalize_source(masked)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    # Кэш перевода по хэшу содержимого: LRU в процессе перед Redis. Значение по ключу
+    # не меняется (версия модели и глоссария входит в ключ), поэтому локальный TTL не нужен.
+    def __init__(
+        self,
+        redis: Optional[Redis] = redis_client,
+        lru_size: int = TRANSLATION_CACHE_LRU_SIZE,
+        ttl: int = TRANSLATION_CACHE_TTL,
+    ):
+        self._redis = redis
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self.lru_size = lru_size
+        self.ttl = ttl
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"{TRANSLATION_CACHE_PREFIX}:{key}"
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self._lru.get(key)
+            if value is None:
+                missing.append(key)
+                continue
+            self._lru.move_to_end(key)
+            found[key] = value
+        TRANSLATION_CACHE_REQUESTS.labels(tier="local", result="hit").inc(len(found))
+        TRANSLATION_CACHE_REQUESTS.labels(tier="local", result="miss").inc(len(missing))
+
+        if not missing or self._redis is None:
+            return found
+        try:
+            values = await self._redis.mget([self._redis_key(k) for k in missing])
+        except Exception as e:
+            logger.warning(f"Translation cache read failed: {e}")
+            return found
+        hits = 0
+        for key, value in zip(missing, values):
+            if value is not None:
+                hits += 1
+                found[key] = value
+                self._put_local(key, value)
+        TRANSLATION_CACHE_REQUESTS.labels(tier="redis", result="hit").inc(hits)
+        TRANSLATION_CACHE_REQUESTS.labels(tier="redis", result="miss").inc(len(missing) - hits)
+        return found
+
+    async def set_many(self, items: Dict[str, str]) -> None:
+        for key, value in items.items():
+            self._put_local(key, value)
+        if self._redis is None or not items:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._redis_key(key), value, ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Translation cache write failed: {e}")
+
+    def _put_local(self, key: str, value: str) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
@@ -1,9 +1,13 @@
 import os
-from typing import Optional
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
 from .latex_masker import LatexMasker
 from .glossary import Glossary, DEFAULT_GLOSSARY
+from .batcher import MicroBatchingProvider
 from .providers.base import BaseMTProvider
-from .providers.ctranslate2_marian import MarianCTranslate2Provider
+from .sentences import join_sentences, split_sentences
+from .translation_cache import TranslationCache, normalize_source, translation_key
 
 try:
     # необязательная зависимость для простого детекта языка
@@ -11,20 +15,42 @@ try:
 except Exception:  # если не установлено — считаем английским по эвристике
     detect = None
 
+_LATIN_WORD = re.compile(r"[A-Za-z]{2,}")
+
+
+@dataclass
+class TranslationStats:
+    sentences: int = 0
+    cached: int = 0
+    # токены исходного текста, прошедшие через модель (промахи кэша)
+    tokens: int = 0
+
+
 class TranslationService:
     def __init__(
         self,
         provider: Optional[BaseMTProvider] = None,
         glossary: Optional[Glossary] = DEFAULT_GLOSSARY,
+        cache: Optional[TranslationCache] = None,
     ):
         self.masker = LatexMasker()
         self.glossary = glossary
+        self.cache = cache if cache is not None else TranslationCache()
 
         if provider is None:
+            # ctranslate2 импортируется только для модели по умолчанию
+            from .providers.ctranslate2_marian import MarianCTranslate2Provider
             model_dir = os.getenv("TRANSLATION_MODEL_DIR", "/models/opus-mt-en-ru-ctranslate2")
             spm_path  = os.getenv("TRANSLATION_SPM_PATH",  "/models/opus-mt-en-ru-ctranslate2/spm.model")
-            provider = MarianCTranslate2Provider(model_dir, spm_path, glossary=self.glossary)
+            # одиночные вызовы translate_text от конкурентных запросов декодируются общим батчем
+            provider = MicroBatchingProvider(MarianCTranslate2Provider(model_dir, spm_path, glossary=self.glossary))
         self.provider = provider
+        self.model_version = getattr(provider, "model_version", type(provider).__name__)
+        self.glossary_version = glossary.version if glossary else ""
+        self.stats = TranslationStats()
+
+    def close(self) -> None:
+        self.provider.close()
 
     @staticmethod
     def _looks_english(text: str) -> bool:
@@ -39,12 +65,76 @@ class TranslationService:
         return latin > cyr
 
     async def translate_text(self, text: str, target_lang: str = "ru") -> str:
-        masked, repl = self.masker.mask(text)
-        translated = (await self.provider.translate([masked]))[0]
-        out = self.masker.unmask(translated, repl)
-        if self.glossary:
-            out = self.glossary.apply_post(out)
+        return (await self.translate_many([text], target_lang))[0]
+
+    async def translate_many(self, texts: Sequence[str], target_lang: str = "ru") -> List[str]:
+        masked = [self.masker.mask(t) for t in texts]
+        translated = await self._translate_sources([m for m, _ in masked], target_lang)
+        return [self._finish(t, repl) for t, (_, repl) in zip(translated, masked)]
+
+    async def translate_documents(
+        self,
+        texts: Sequence[str],
+        target_lang: str = "ru",
+        batch_size: Optional[int] = None,
+    ) -> List[str]:
+        # длинные тексты переводятся по предложениям: короткие последовательности декодируются
+        # быстрее, а одинаковые предложения разных задач попадают в кэш
+        masked = [self.masker.mask(t) for t in texts]
+        splits = [split_sentences(m) for m, _ in masked]
+        sentences = [s for parts in splits for s, _ in parts]
+        translated = iter(await self._translate_sources(sentences, target_lang, batch_size))
+
+        out = []
+        for parts, (_, repl) in zip(splits, masked):
+            joined = join_sentences([next(translated) for _ in parts], [sep for _, sep in parts])
+            out.append(self._finish(joined, repl))
         return out
 
+    async def _translate_sources(
+        self,
+        masked: Sequence[str],
+        target_lang: str,
+        batch_size: Optional[int] = None,
+    ) -> List[str]:
+        sources = [normalize_source(m) for m in masked]
+        keys = [translation_key(s, self.model_version, self.glossary_version, target_lang) for s in sources]
+
+        # в модель идёт только то, чего нет в кэше, и каждый уникальный текст один раз
+        translated = await self.cache.get_many(keys)
+        misses: Dict[str, str] = {}
+        for key, source in zip(keys, sources):
+            if key not in translated and source:
+                misses.setdefault(key, source)
+        self.stats.sentences += len(sources)
+        self.stats.cached += sum(1 for k in keys if k in translated)
+
+        if misses:
+            # батчи из близких по длине последовательностей: меньше паддинга
+            length = getattr(self.provider, "token_length", None) or (lambda t: len(t.split()))
+            lengths = {key: length(source) for key, source in misses.items()}
+            order = sorted(misses, key=lengths.get)
+            step = batch_size or len(order)
+            fresh: Dict[str, str] = {}
+            for start in range(0, len(order), step):
+                chunk = order[start:start + step]
+                results = await self.provider.translate([misses[k] for k in chunk])
+                fresh.update(zip(chunk, results))
+            self.stats.tokens += sum(lengths.values())
+            await self.cache.set_many(fresh)
+            translated.update(fresh)
+        return [translated.get(key, source) for key, source in zip(keys, sources)]
+
+    def _finish(self, translated: str, repl: Dict[str, str]) -> str:
+        text = self.masker.unmask(translated, repl)
+        if self.glossary:
+            text = self.glossary.apply_post(text)
+        return text
+
+    def needs_translation(self, text: str) -> bool:
+        # формулы и код не считаются: ответ вида «2x» или «$x^2$» переводить нечего
+        masked, _ = self.masker.mask(text)
+        return bool(_LATIN_WORD.search(masked)) and self._looks_english(masked)
+
     async def translate_if_english(self, text: str) -> str:
         return await self.translate_text(text) if self._looks_english(text) else text
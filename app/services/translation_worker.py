@@ -0,0 +1,215 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.CRUD.task_translation import TaskTranslationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.logger import setup_logger
+from app.metrics import TRANSLATION_JOBS, TRANSLATION_JOB_QUEUE_DEPTH
+from app.models.task_table import Task
+from app.services.task_translation_service import TaskTranslationService, TRANSLATION_TARGET_LANG
+
+logger = setup_logger(__name__)
+
+# перевод задач после одобрения в фоне процесса; читатели получают готовый текст из task_translations
+TRANSLATION_ON_APPROVE = os.getenv('TRANSLATION_ON_APPROVE', '0') == '1'
+TRANSLATION_QUEUE_SIZE = int(os.getenv('TRANSLATION_QUEUE_SIZE', 1000))
+# 1 — очередь в Redis: общая для всех воркеров и переживает перезапуск процесса
+TRANSLATION_QUEUE_PERSIST = os.getenv('TRANSLATION_QUEUE_PERSIST', '0') == '1'
+# сколько раз пробовать перевести задачу, прежде чем отказаться
+TRANSLATION_MAX_ATTEMPTS = int(os.getenv('TRANSLATION_MAX_ATTEMPTS', 3))
+# воркер, не обновлявший heartbeat дольше этого срока, считается упавшим, его задачи возвращаются в очередь
+TRANSLATION_WORKER_HEARTBEAT_TTL = int(os.getenv('TRANSLATION_WORKER_HEARTBEAT_TTL', 60))
+
+# Redis: ожидающие задачи в TRANSLATION_QUEUE_KEY; взятая задача атомарно (LMOVE) переносится
+# в список processing своего воркера и удаляется оттуда только после успеха или исчерпания попыток
+TRANSLATION_QUEUE_KEY = 'tr:queue'
+PROCESSING_PREFIX = f'{TRANSLATION_QUEUE_KEY}:processing'
+HEARTBEAT_PREFIX = f'{TRANSLATION_QUEUE_KEY}:heartbeat'
+ATTEMPTS_KEY = f'{TRANSLATION_QUEUE_KEY}:attempts'
+
+
+def _default_translator():
+    from app.services.translation.translation_service import TranslationService
+    return TranslationService()
+
+
+class TranslationWorker:
+    def __init__(
+            self,
+            session_factory: Optional[async_sessionmaker] = None,
+            translator_factory: Callable = _default_translator,
+            lang: str = TRANSLATION_TARGET_LANG,
+            queue_size: int = TRANSLATION_QUEUE_SIZE,
+            redis: Optional[Redis] = None,
+            max_attempts: int = TRANSLATION_MAX_ATTEMPTS,
+            worker_id: Optional[str] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.translator_factory = translator_factory
+        self.lang = lang
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.queue: asyncio.Queue[int] = asyncio.Queue(maxsize=queue_size)
+        self._attempts: Dict[int, int] = {}
+        self._redis = redis
+        self._translator = None
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat_at = 0.0
+
+    @property
+    def _processing_key(self) -> str:
+        return f'{PROCESSING_PREFIX}:{self.worker_id}'
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if self.session_factory is None:
+            from app.database import async_session
+            self.session_factory = async_session
+        if self._redis is not None:
+            await self._heartbeat()
+            await self._recover_abandoned()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f'Translation worker started: lang={self.lang}, worker={self.worker_id}')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._translator is not None:
+            self._translator.close()
+
+    async def join(self) -> None:
+        await self.queue.join()
+
+    async def enqueue(self, task_id: int) -> bool:
+        # ответ модератору не ждёт перевода: только постановка в очередь
+        if self._redis is None:
+            return self._put(task_id)
+        try:
+            await self._redis.rpush(TRANSLATION_QUEUE_KEY, int(task_id))
+        except Exception as e:
+            logger.warning(f'Translation enqueue to Redis failed, task_id: {task_id}: {e}')
+            return self._put(task_id)
+        return True
+
+    def _put(self, task_id: int) -> bool:
+        try:
+            self.queue.put_nowait(int(task_id))
+        except asyncio.QueueFull:
+            TRANSLATION_JOBS.labels('dropped').inc()
+            logger.warning(f'Translation queue is full, task_id: {task_id}')
+            return False
+        TRANSLATION_JOB_QUEUE_DEPTH.set(self.queue.qsize())
+        return True
+
+    async def _heartbeat(self) -> None:
+        self._heartbeat_at = time.monotonic()
+        await self._redis.set(f'{HEARTBEAT_PREFIX}:{self.worker_id}', 1, ex=TRANSLATION_WORKER_HEARTBEAT_TTL)
+
+    async def _recover_abandoned(self) -> None:
+        # задачи упавших воркеров возвращаются в общую очередь; LMOVE атомарен,
+        # поэтому при одновременном старте каждую задачу забирает ровно один воркер
+        recovered = 0
+        try:
+            async for key in self._redis.scan_iter(match=f'{PROCESSING_PREFIX}:*', count=100):
+                worker_id = key.split(f'{PROCESSING_PREFIX}:', 1)[1]
+                if worker_id != self.worker_id and await self._redis.exists(f'{HEARTBEAT_PREFIX}:{worker_id}'):
+                    continue
+                while await self._redis.lmove(key, TRANSLATION_QUEUE_KEY, 'LEFT', 'RIGHT') is not None:
+                    recovered += 1
+        except Exception as e:
+            logger.warning(f'Translation queue recovery failed: {e}')
+        if recovered:
+            logger.info(f'Translation jobs returned to queue: {recovered}')
+
+    async def _claim(self) -> Optional[int]:
+        if self._redis is None:
+            task_id = await self.queue.get()
+            TRANSLATION_JOB_QUEUE_DEPTH.set(self.queue.qsize())
+            return task_id
+        if time.monotonic() - self._heartbeat_at > TRANSLATION_WORKER_HEARTBEAT_TTL / 3:
+            await self._heartbeat()
+        raw = await self._redis.blmove(TRANSLATION_QUEUE_KEY, self._processing_key, 1, 'LEFT', 'RIGHT')
+        return int(raw) if raw is not None else None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                task_id = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'Translation queue read failed: {e}')
+                await asyncio.sleep(1)
+                continue
+            if task_id is not None:
+                await self._run_one(task_id)
+
+    async def _run_one(self, task_id: int) -> None:
+        try:
+            await self.translate_task(task_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._retry(task_id, e)
+        else:
+            await self._finish(task_id)
+
+    async def _finish(self, task_id: int) -> None:
+        if self._redis is None:
+            self._attempts.pop(task_id, None)
+            self.queue.task_done()
+            return
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(self._processing_key, 1, task_id)
+                pipe.hdel(ATTEMPTS_KEY, task_id)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f'Translation queue cleanup failed, task_id: {task_id}: {e}')
+
+    async def _retry(self, task_id: int, error: Exception) -> None:
+        if self._redis is None:
+            attempts = self._attempts[task_id] = self._attempts.get(task_id, 0) + 1
+        else:
+            attempts = await self._redis.hincrby(ATTEMPTS_KEY, task_id, 1)
+        if attempts < self.max_attempts:
+            TRANSLATION_JOBS.labels('retried').inc()
+            logger.warning(f'Task translation failed, retrying, task_id: {task_id}, attempt: {attempts}: {error}')
+            if self._redis is None:
+                self._put(task_id)
+                self.queue.task_done()
+            else:
+                # в конец общей очереди и только потом из processing: задача не теряется между шагами
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    pipe.rpush(TRANSLATION_QUEUE_KEY, task_id)
+                    pipe.lrem(self._processing_key, 1, task_id)
+                    await pipe.execute()
+            return
+        TRANSLATION_JOBS.labels('failed').inc()
+        logger.error(f'Task translation failed, giving up, task_id: {task_id}, attempts: {attempts}: {error}')
+        await self._finish(task_id)
+
+    async def translate_task(self, task_id: int) -> bool:
+        if self._translator is None:
+            # загрузка модели блокирует, поэтому в потоке и только при первой задаче
+            self._translator = await asyncio.to_thread(self.translator_factory)
+        async with self.session_factory() as session:
+            task = await session.get(Task, task_id)
+            if task is None or task.status != TaskStatusEnum.APPROVED:
+                TRANSLATION_JOBS.labels('skipped').inc()
+                return False
+            service = TaskTranslationService(session, self._translator)
+            rows = await service.translate_rows([task], self.lang)
+            await TaskTranslationCRUD(session).bulk_replace(rows)
+        TRANSLATION_JOBS.labels('done').inc()
+        logger.info(f'Task translated, task_id: {task_id}, lang: {self.lang}')
+        return True
@@ -0,0 +1,118 @@
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.CRUD.user_profile import UserProfileCRUD
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.logger import setup_logger
+from app.models.task_history_table import TaskHistory
+from app.models.task_table import Task
+from app.models.user_profile_table import UserProfile
+from app.utils.skill_rating import difficulty_from_rating, target_rating, user_skill
+
+# затухание старых попыток: эффективное окно ~50 последних, как у прежнего запроса истории
+PROFILE_DECAY = 0.98
+HISTORY_LIMIT = 50
+DEFAULT_DIFFICULTY = 2.5
+
+
+class UserProfileService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._crud = UserProfileCRUD(db)
+        self.logger = setup_logger(__name__)
+
+    async def get_profile(self, user_id: int) -> UserProfile | None:
+        return await self._crud.get_by_user_id(user_id)
+
+    async def get_or_build(self, user_id: int) -> UserProfile | None:
+        profile = await self._crud.get_by_user_id(user_id)
+        if profile is None:
+            profile = await self.rebuild(user_id)
+        return profile
+
+    async def rebuild(self, user_id: int) -> UserProfile | None:
+        if not await self._history_rows(user_id):
+            return None
+
+        # строка создаётся или блокируется так же, как при записи попытки: параллельная
+        # пересборка или попытка того же пользователя не упадёт на уникальном user_id
+        profile = await self._crud.get_for_update(user_id)
+        # историю перечитываем под блокировкой, чтобы не потерять только что записанную попытку
+        rows = await self._history_rows(user_id)
+        self._reset(profile)
+        for task_id, status, score, subject, difficulty in reversed(rows):
+            self._apply(profile, task_id, subject, difficulty, status, score)
+        await self.db.commit()
+        self.logger.info(f'User profile rebuilt from {len(rows)} attempts, user_id={user_id}')
+        return profile
+
+    async def _history_rows(self, user_id: int) -> list:
+        q = (
+            select(TaskHistory.task_id, TaskHistory.status, TaskHistory.score, Task.subject, Task.difficulty)
+            .join(Task, Task.id == TaskHistory.task_id)
+            .where(TaskHistory.user_id == user_id)
+            .order_by(TaskHistory.timestamp.desc())
+            .limit(HISTORY_LIMIT)
+        )
+        return list((await self.db.execute(q)).all())
+
+    async def apply_attempt(self, history: TaskHistory, commit: bool = True) -> UserProfile | None:
+        task = await self.db.get(Task, history.task_id)
+        if task is None:
+            return None
+        # новая строка создаётся со значениями по умолчанию, они же — пустой профиль
+        profile = await self._crud.get_for_update(history.user_id)
+        self._apply(profile, history.task_id, task.subject, task.difficulty, history.status, history.score)
+        if commit:
+            await self.db.commit()
+        else:
+            await self.db.flush()
+        return profile
+
+    @staticmethod
+    def _reset(profile: UserProfile) -> None:
+        profile.subject_weights = {}
+        profile.difficulty_weighted_sum = 0.0
+        profile.difficulty_weight_total = 0.0
+        profile.solved_task_ids = []
+        profile.attempts_count = 0
+
+    @staticmethod
+    def _apply(profile: UserProfile, task_id: int, subject: str, difficulty, status, score) -> None:
+        score = float(score or 0.0)
+        solved = status == TaskSolutionStatusEnum.RIGHT_SOLUTION
+
+        weight = 1.5 if solved else 0.7
+        # JSON-поля переприсваиваем целиком, чтобы SQLAlchemy увидел изменение
+        weights = {s: w * PROFILE_DECAY for s, w in (profile.subject_weights or {}).items()}
+        weights[subject] = weights.get(subject, 0.0) + score * weight
+        profile.subject_weights = weights
+
+        profile.difficulty_weighted_sum = (profile.difficulty_weighted_sum or 0.0) * PROFILE_DECAY
+        profile.difficulty_weight_total = (profile.difficulty_weight_total or 0.0) * PROFILE_DECAY
+        if solved or score > 0.7:
+            w = max(score, 0.01)
+            profile.difficulty_weighted_sum += float(difficulty or 0.0) * w
+            profile.difficulty_weight_total += w
+
+        if solved:
+            solved_ids = [t for t in (profile.solved_task_ids or []) if t != task_id]
+            profile.solved_task_ids = [int(task_id)] + solved_ids[:HISTORY_LIMIT - 1]
+        profile.attempts_count = (profile.attempts_count or 0) + 1
+
+    @staticmethod
+    def preferred_subjects(profile: UserProfile, k: int = 3) -> List[str]:
+        ranked = sorted((profile.subject_weights or {}).items(), key=lambda x: x[1], reverse=True)
+        return [s for s, _ in ranked[:k]]
+
+    @staticmethod
+    def optimal_difficulty(profile: UserProfile) -> float:
+        # при накопленном рейтинге — сложность, которую пользователь решит с целевой вероятностью
+        skill = user_skill(profile)
+        if skill is not None:
+            return difficulty_from_rating(target_rating(skill))
+        if not profile.difficulty_weight_total:
+            return DEFAULT_DIFFICULTY
+        return profile.difficulty_weighted_sum / profile.difficulty_weight_total
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.models.user_profile_table import UserProfile
+
+# 1PL IRT (модель Раша) в логитах: P(верно) = sigmoid(skill - rating).
+# Онлайн — шаг Эло на каждую попытку, шаг уменьшается с числом попыток (как уверенность в Glicko);
+# периодически — полная переоценка по всей истории (fit_ratings).
+RATING_K = float(os.getenv('RECO_RATING_K', 0.4))
+RATING_K_DECAY = float(os.getenv('RECO_RATING_K_DECAY', 20))
+# рейтинг пользователя используется, только когда за ним достаточно попыток
+RATING_MIN_ATTEMPTS = int(os.getenv('RECO_RATING_MIN_ATTEMPTS', 5))
+# целевая вероятность решить рекомендованную задачу и ширина окна рейтинга при подборе
+RATING_TARGET_SUCCESS = float(os.getenv('RECO_RATING_TARGET_SUCCESS', 0.8))
+RATING_BAND = float(os.getenv('RECO_RATING_BAND', 1.0))
+# логитов на один уровень авторской сложности: из неё берётся априорный рейтинг задачи
+RATING_SCALE = 0.8
+MID_DIFFICULTY = 3.0
+MIN_DIFFICULTY, MAX_DIFFICULTY = 1.0, 5.0
+
+
+def prior_rating(difficulty):
+    return (difficulty - MID_DIFFICULTY) * RATING_SCALE
+
+
+def difficulty_from_rating(rating: float) -> float:
+    return float(np.clip(MID_DIFFICULTY + rating / RATING_SCALE, MIN_DIFFICULTY, MAX_DIFFICULTY))
+
+
+def expected(skill, rating):
+    return 1.0 / (1.0 + np.exp(rating - skill))
+
+
+def k_factor(attempts: int) -> float:
+    return RATING_K / (1.0 + attempts / RATING_K_DECAY)
+
+
+def elo_update(
+        skill: float,
+        rating: float,
+        solved: bool,
+        user_attempts: int = 0,
+        task_attempts: int = 0,
+) -> Tuple[float, float]:
+    surprise = float(solved) - float(expected(skill, rating))
+    return skill + k_factor(user_attempts) * surprise, rating - k_factor(task_attempts) * surprise
+
+
+def target_rating(skill: float, success: float = RATING_TARGET_SUCCESS) -> float:
+    # задача, которую пользователь решит с вероятностью success
+    return skill - math.log(success / (1.0 - success))
+
+
+def user_skill(profile: Optional[UserProfile]) -> Optional[float]:
+    if profile is None or (profile.rating_attempts or 0) < RATING_MIN_ATTEMPTS or profile.skill_rating is None:
+        return None
+    return float(profile.skill_rating)
+
+
+def fit_ratings(
+        user_idx: np.ndarray,
+        task_idx: np.ndarray,
+        outcomes: np.ndarray,
+        task_prior: np.ndarray,
+        n_users: int,
+        iterations: int = 30,
+        l2: float = 1.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # MAP-оценка: skill ~ N(0, 1/l2), rating ~ N(prior, 1/l2); поочерёдные шаги Ньютона
+    # по диагонали гессиана, суммы по пользователям/задачам через bincount
+    n_tasks = len(task_prior)
+    skills = np.zeros(n_users)
+    ratings = np.asarray(task_prior, dtype=np.float64).copy()
+    y = outcomes.astype(np.float64)
+    for _ in range(iterations):
+        p = expected(skills[user_idx], ratings[task_idx])
+        grad = np.bincount(user_idx, y - p, n_users) - l2 * skills
+        hess = np.bincount(user_idx, p * (1 - p), n_users) + l2
+        skills += grad / hess
+
+        p = expected(skills[user_idx], ratings[task_idx])
+        grad = np.bincount(task_idx, p - y, n_tasks) - l2 * (ratings - task_prior)
+        hess = np.bincount(task_idx, p * (1 - p), n_tasks) + l2
+        ratings += grad / hess
+    return skills, ratings
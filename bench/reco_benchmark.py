@@ -0,0 +1,224 @@
+import asyncio
+import json
+import math
+import os
+import resource
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_engines.als import ALSModel
+from app.services.recommendation_service import RecommendationService, RECO_CF_WEIGHT
+from app.services.skill_rating_service import SkillRatingService
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_cooccurrence import TaskCooccurrence
+from app.services.task_text_index import TaskTextIndex
+from app.services.user_profile_service import UserProfileService
+from bench.synthetic import SyntheticConfig, generate, load_holdout
+
+# Офлайн-оценка RecommendationService: leave-last-out на синтетическом каталоге в SQLite.
+# Для каждого ранжировщика: precision@K, hit rate@K, NDCG@K, p50/p95 задержки и пиковая память.
+#   python -m bench.reco_benchmark
+#   BENCH_TASKS=1000000 BENCH_HISTORY=10000000 BENCH_USERS=500000 python -m bench.reco_benchmark
+BENCH_DB = os.getenv("BENCH_DB", "data/bench/reco.db")
+BENCH_TASKS = int(os.getenv("BENCH_TASKS", "10000"))
+BENCH_HISTORY = int(os.getenv("BENCH_HISTORY", "100000"))
+BENCH_USERS = int(os.getenv("BENCH_USERS", "5000"))
+EVAL_USERS = int(os.getenv("EVAL_USERS", "1000"))
+MEMORY_USERS = int(os.getenv("MEMORY_USERS", "100"))
+REGENERATE = os.getenv("REGENERATE", "0") == "1"
+K = int(os.getenv("K", "10"))
+RANKERS = os.getenv("RANKERS", "content,blended,als,ann").split(",")
+# результаты в JSON и сравнение с прошлым прогоном
+BENCH_OUTPUT = os.getenv("BENCH_OUTPUT", "")
+BENCH_BASELINE = os.getenv("BENCH_BASELINE", "")
+
+
+@dataclass
+class RankerReport:
+    ranker: str
+    users: int
+    precision: float
+    hit_rate: float
+    ndcg: float
+    p50_ms: float
+    p95_ms: float
+    peak_mb: float
+
+
+@dataclass
+class Artifacts:
+    index: TaskTextIndex
+    cooccurrence: Optional[TaskCooccurrence] = None
+    als_model: Optional[ALSModel] = None
+    ann_index: Optional[TaskAnnIndex] = None
+
+
+def hit_rank(recommended: Sequence[int], target: int) -> Optional[int]:
+    for rank, task_id in enumerate(recommended):
+        if task_id == target:
+            return rank
+    return None
+
+
+def precision_at_k(rank: Optional[int], k: int) -> float:
+    # отложена одна задача, поэтому precision@K = 1/K при попадании
+    return 1.0 / k if rank is not None and rank < k else 0.0
+
+
+def ndcg_at_k(rank: Optional[int], k: int) -> float:
+    # идеальный DCG для одной релевантной задачи равен 1
+    return 1.0 / math.log2(rank + 2) if rank is not None and rank < k else 0.0
+
+
+def make_service(name: str, artifacts: Artifacts) -> RecommendationService:
+    params = dict(index=artifacts.index, cache=RecommendationCache(redis=None, lru_size=0), cf_weight=0.0)
+    if name == 'blended':
+        params.update(cooccurrence=artifacts.cooccurrence, cf_weight=RECO_CF_WEIGHT)
+    elif name == 'als':
+        params.update(als_model=artifacts.als_model, engine='als')
+    elif name == 'ann':
+        params.update(ann_index=artifacts.ann_index, ann_candidates=200)
+    elif name != 'content':
+        raise ValueError(f'Unknown ranker: {name}')
+    return RecommendationService(**params)
+
+
+async def prepare(session: AsyncSession, rankers: Sequence[str], users: Sequence[int]) -> Artifacts:
+    t0 = time.perf_counter()
+    await TaskStatsCRUD(session).rebuild()
+    profiles = UserProfileService(session)
+    for user_id in users:
+        await profiles.rebuild(user_id)
+    await SkillRatingService(session).refit()
+    print(f"task_stats + {len(users)} profiles + ratings: {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    artifacts = Artifacts(index=await TaskTextIndex.build(session))
+    print(f"text index: tasks={len(artifacts.index)}, {time.perf_counter() - t0:.1f}s")
+    if 'blended' in rankers:
+        t0 = time.perf_counter()
+        artifacts.cooccurrence = await TaskCooccurrence.build(session)
+        print(f"co-occurrence: nnz={artifacts.cooccurrence.matrix.nnz}, {time.perf_counter() - t0:.1f}s")
+    if 'als' in rankers:
+        t0 = time.perf_counter()
+        artifacts.als_model = await ALSModel.build(session)
+        print(f"ALS: users={len(artifacts.als_model.user_ids)}, {time.perf_counter() - t0:.1f}s")
+    if 'ann' in rankers:
+        t0 = time.perf_counter()
+        artifacts.ann_index = TaskAnnIndex.fit(artifacts.index)
+        print(f"ANN index: tasks={len(artifacts.ann_index)}, {time.perf_counter() - t0:.1f}s")
+    return artifacts
+
+
+async def evaluate(
+        session: AsyncSession,
+        service: RecommendationService,
+        name: str,
+        holdout: Sequence[Tuple[int, int]],
+        k: int = K,
+        memory_users: int = MEMORY_USERS,
+) -> RankerReport:
+    service.reload(popular_ids=await service._load_popular_task_ids(session))
+
+    latencies, precision, hits, ndcg = [], [], [], []
+    for user_id, target in holdout:
+        t0 = time.perf_counter()
+        ranked = await service.get_user_recommendations(session, user_id, k)
+        latencies.append(time.perf_counter() - t0)
+        rank = hit_rank([r.id for r in ranked], target)
+        precision.append(precision_at_k(rank, k))
+        hits.append(rank is not None)
+        ndcg.append(ndcg_at_k(rank, k))
+
+    # пиковая память отдельным проходом: tracemalloc замедляет аллокации и исказил бы задержки
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for user_id, _ in holdout[:memory_users]:
+        await service.get_user_recommendations(session, user_id, k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return RankerReport(
+        ranker=name,
+        users=len(holdout),
+        precision=float(np.mean(precision)) if precision else 0.0,
+        hit_rate=float(np.mean(hits)) if hits else 0.0,
+        ndcg=float(np.mean(ndcg)) if ndcg else 0.0,
+        p50_ms=float(np.percentile(ms, 50)),
+        p95_ms=float(np.percentile(ms, 95)),
+        peak_mb=(peak - base) / 2 ** 20,
+    )
+
+
+def print_reports(reports: List[RankerReport], baseline: Dict[str, dict], k: int = K) -> None:
+    print(f"{'ranker':>8} {'P@' + str(k):>7} {'HR@' + str(k):>7} {'NDCG@' + str(k):>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8}")
+    for r in reports:
+        print(f"{r.ranker:>8} {r.precision:7.4f} {r.hit_rate:7.4f} {r.ndcg:8.4f} "
+              f"{r.p50_ms:8.2f} {r.p95_ms:8.2f} {r.peak_mb:8.1f}")
+        old = baseline.get(r.ranker)
+        if old:
+            print(f"{'Δ':>8} {r.precision - old['precision']:+7.4f} {r.hit_rate - old['hit_rate']:+7.4f} "
+                  f"{r.ndcg - old['ndcg']:+8.4f} {r.p50_ms - old['p50_ms']:+8.2f} "
+                  f"{r.p95_ms - old['p95_ms']:+8.2f} {r.peak_mb - old['peak_mb']:+8.1f}")
+
+
+async def run_benchmark(
+        db_path: str,
+        config: SyntheticConfig,
+        rankers: Sequence[str] = RANKERS,
+        k: int = K,
+        regenerate: bool = REGENERATE,
+        memory_users: int = MEMORY_USERS,
+) -> List[RankerReport]:
+    if regenerate or not os.path.exists(db_path):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        t0 = time.perf_counter()
+        stats = generate(db_path, config)
+        print(f"Synthetic catalog: {stats}, {time.perf_counter() - t0:.1f}s")
+    holdout = load_holdout(db_path)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", echo=False)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    reports: List[RankerReport] = []
+    try:
+        async with session_factory() as session:
+            artifacts = await prepare(session, rankers, [u for u, _ in holdout])
+            for name in rankers:
+                service = make_service(name, artifacts)
+                try:
+                    reports.append(await evaluate(session, service, name, holdout, k, memory_users))
+                finally:
+                    # у каждого сервиса свой пул ранжирования — не копим потоки между прогонами
+                    service.close()
+    finally:
+        await engine.dispose()
+    return reports
+
+
+async def main():
+    config = SyntheticConfig(tasks=BENCH_TASKS, history_rows=BENCH_HISTORY, users=BENCH_USERS, eval_users=EVAL_USERS)
+    reports = await run_benchmark(BENCH_DB, config)
+
+    baseline = {}
+    if BENCH_BASELINE and os.path.exists(BENCH_BASELINE):
+        with open(BENCH_BASELINE) as f:
+            baseline = {r['ranker']: r for r in json.load(f)['reports']}
+    print_reports(reports, baseline)
+    print(f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if BENCH_OUTPUT:
+        with open(BENCH_OUTPUT, 'w') as f:
+            json.dump({'config': asdict(config), 'k': K, 'reports': [asdict(r) for r in reports]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from app.models import user_table, task_table, task_history_table, task_stats_table  # регистрация всех мапперов
+from app.models.base_db_models import Base
+
+# Синтетический каталог: у задачи тема (subject), подтема и сложность 1..5.
+# Текст задачи собран из слов подтемы и темы, поэтому TF-IDF близость осмысленна.
+# У пользователя любимые тема/подтема и уровень; попытки выбираются в основном из них,
+# с перекосом популярности внутри группы и сложностью около уровня пользователя.
+SUBJECTS = 8
+TOPICS_PER_SUBJECT = 10
+DIFFICULTIES = 5
+INSERT_CHUNK = 50000
+
+HOLDOUT_TABLE = 'bench_holdout'
+
+
+@dataclass
+class SyntheticConfig:
+    tasks: int = 10000
+    history_rows: int = 100000
+    users: int = 5000
+    eval_users: int = 1000
+    seed: int = 0
+
+
+def _task_text(rng: np.random.Generator, subject: int, topic: int) -> str:
+    words = [f"s{subject}t{topic}w{j}" for j in rng.integers(20, size=4)]
+    words += [f"s{subject}w{j}" for j in rng.integers(30, size=3)]
+    words += [f"common{j}" for j in rng.integers(50, size=2)]
+    return " ".join(words)
+
+
+def generate_tasks(rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    subjects = rng.integers(SUBJECTS, size=n)
+    topics = rng.integers(TOPICS_PER_SUBJECT, size=n)
+    difficulties = rng.integers(1, DIFFICULTIES + 1, size=n)
+    return subjects, topics, difficulties
+
+
+def generate_history(
+        rng: np.random.Generator,
+        subjects: np.ndarray,
+        topics: np.ndarray,
+        difficulties: np.ndarray,
+        users: int,
+        rows: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_tasks = len(subjects)
+    # задачи группируются по (тема, подтема, сложность), внутри группы — в порядке популярности
+    group = (subjects * TOPICS_PER_SUBJECT + topics) * DIFFICULTIES + (difficulties - 1)
+    order = np.argsort(group, kind='stable')
+    n_groups = SUBJECTS * TOPICS_PER_SUBJECT * DIFFICULTIES
+    sizes = np.bincount(group, minlength=n_groups)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    # активность пользователей неравномерна (лог-нормальная)
+    activity = rng.lognormal(sigma=1.0, size=users)
+    user_of_row = rng.choice(users, size=rows, p=activity / activity.sum())
+    fav_subject = rng.integers(SUBJECTS, size=users)
+    fav_topic = rng.integers(TOPICS_PER_SUBJECT, size=users)
+    level = rng.uniform(1, DIFFICULTIES, size=users)
+
+    s = np.where(rng.random(rows) < 0.8, fav_subject[user_of_row], rng.integers(SUBJECTS, size=rows))
+    t = np.where(rng.random(rows) < 0.6, fav_topic[user_of_row], rng.integers(TOPICS_PER_SUBJECT, size=rows))
+    d = np.clip(np.rint(level[user_of_row] + rng.normal(scale=0.7, size=rows)), 1, DIFFICULTIES).astype(np.int64)
+    g = (s * TOPICS_PER_SUBJECT + t) * DIFFICULTIES + (d - 1)
+    # перекос популярности: r**2 смещает выбор к началу группы
+    within = np.floor(sizes[g] * rng.random(rows) ** 2).astype(np.int64)
+    task_pos = np.where(
+        sizes[g] > 0,
+        order[np.minimum(offsets[g] + within, n_tasks - 1)],
+        rng.integers(n_tasks, size=rows),
+    )
+
+    # оценка выше, если задача не сложнее уровня пользователя
+    gap = difficulties[task_pos] - level[user_of_row]
+    scores = np.clip(1.0 - 0.3 * np.maximum(gap, 0) + rng.normal(scale=0.15, size=rows), 0.0, 1.0)
+
+    # повторные попытки той же задачи не нужны для оценки: оставляем первую
+    _, first = np.unique(user_of_row * n_tasks + task_pos, return_index=True)
+    first.sort()
+    return user_of_row[first], task_pos[first], scores[first]
+
+
+def split_leave_last_out(
+        user_of_row: np.ndarray,
+        eval_users: int,
+        rng: np.random.Generator,
+) -> np.ndarray:
+    # последняя по времени попытка у eval_users случайных пользователей (хотя бы с двумя попытками)
+    counts = np.bincount(user_of_row)
+    eligible = np.flatnonzero(counts >= 2)
+    chosen = rng.choice(eligible, size=min(eval_users, len(eligible)), replace=False)
+    last = np.full(len(counts), -1, dtype=np.int64)
+    last[user_of_row] = np.arange(len(user_of_row))
+    return np.sort(last[chosen])
+
+
+def generate(path: str, config: SyntheticConfig) -> dict:
+    if os.path.exists(path):
+        os.remove(path)
+    rng = np.random.default_rng(config.seed)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    subjects, topics, difficulties = generate_tasks(rng, config.tasks)
+    user_of_row, task_pos, scores = generate_history(
+        rng, subjects, topics, difficulties, config.users, config.history_rows,
+    )
+    holdout = split_leave_last_out(user_of_row, config.eval_users, rng)
+    train = np.ones(len(user_of_row), dtype=bool)
+    train[holdout] = False
+
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO users (id, username, email, hashed_password, is_active, role) VALUES (?, ?, ?, ?, 1, 'STUDENT')",
+        ((u + 1, f"user{u + 1}", f"user{u + 1}@bench.local", "x") for u in range(config.users)),
+    )
+    conn.executemany(
+        "INSERT INTO tasks (id, subject, problem, solution, answer, difficulty, status, creator_id) "
+        "VALUES (?, ?, ?, '', '', ?, 'APPROVED', 1)",
+        (
+            (i + 1, f"subject{subjects[i]}", _task_text(rng, subjects[i], topics[i]), int(difficulties[i]))
+            for i in range(config.tasks)
+        ),
+    )
+
+    rows = np.flatnonzero(train)
+    for chunk_start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[chunk_start:chunk_start + INSERT_CHUNK]
+        conn.executemany(
+            "INSERT INTO task_history (user_id, task_id, status, timestamp, answer, score) VALUES (?, ?, ?, ?, '', ?)",
+            (
+                (
+                    int(user_of_row[i]) + 1, int(task_pos[i]) + 1,
+                    'RIGHT_SOLUTION' if scores[i] >= 0.5 else 'WRONG_SOLUTION',
+                    (start + timedelta(seconds=int(i))).isoformat(sep=' '), float(scores[i]),
+                )
+                for i in chunk
+            ),
+        )
+
+    conn.execute(f"CREATE TABLE {HOLDOUT_TABLE} (user_id INTEGER PRIMARY KEY, task_id INTEGER NOT NULL)")
+    conn.executemany(
+        f"INSERT INTO {HOLDOUT_TABLE} (user_id, task_id) VALUES (?, ?)",
+        ((int(user_of_row[i]) + 1, int(task_pos[i]) + 1) for i in holdout),
+    )
+    conn.commit()
+    conn.close()
+    return {
+        'tasks': config.tasks,
+        'users': config.users,
+        'history_rows': int(train.sum()),
+        'holdout': len(holdout),
+    }
+
+
+def load_holdout(path: str) -> List[Tuple[int, int]]:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT user_id, task_id FROM {HOLDOUT_TABLE} ORDER BY user_id").fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,60 @@
+import os
+import time
+
+import numpy as np
+
+from app.services.task_ann_index import TaskAnnIndex, TASK_ANN_PATH
+
+# Recall@K относительно точного перебора и задержка поиска при разных nprobe.
+# Без собранного индекса (или при SYNTHETIC_TASKS > 0) меряем на синтетических кластерах.
+INDEX_PATH = os.getenv("INDEX_PATH", TASK_ANN_PATH)
+SYNTHETIC_TASKS = int(os.getenv("SYNTHETIC_TASKS", "0"))
+DIM = int(os.getenv("DIM", "128"))
+K = int(os.getenv("K", "10"))
+QUERIES = int(os.getenv("QUERIES", "500"))
+NPROBES = [int(x) for x in os.getenv("NPROBES", "1,2,4,8,16,32,64").split(",")]
+
+
+def synthetic_index(n: int, dim: int) -> TaskAnnIndex:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, n // 200), dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + 2.0 * rng.normal(size=(n, dim))
+    return TaskAnnIndex.from_vectors(np.arange(1, n + 1), vectors.astype(np.float32))
+
+
+def measure(index: TaskAnnIndex, queries: np.ndarray, search) -> tuple:
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        ids, _ = search(q)
+        latencies.append(time.perf_counter() - t0)
+        results.append(ids)
+    return results, np.asarray(latencies) * 1000
+
+
+def main():
+    t0 = time.perf_counter()
+    index = None if SYNTHETIC_TASKS else TaskAnnIndex.load(INDEX_PATH, mmap=False)
+    if index is None:
+        index = synthetic_index(SYNTHETIC_TASKS or 50000, DIM)
+    print(f"Index: tasks={len(index)}, lists={len(index.centroids)}, dim={index.centroids.shape[1]}, "
+          f"load/build={time.perf_counter() - t0:.1f}s")
+
+    rng = np.random.default_rng(1)
+    vectors = index.vectors
+    queries = vectors[rng.choice(len(vectors), min(QUERIES, len(vectors)), replace=False)]
+
+    exact, exact_ms = measure(index, queries, lambda q: index.exact_search(q, K))
+    print(f"{'exact':>8} recall@{K}=1.000 p50={np.percentile(exact_ms, 50):.3f}ms "
+          f"p95={np.percentile(exact_ms, 95):.3f}ms")
+    for nprobe in NPROBES:
+        if nprobe > len(index.centroids):
+            break
+        approx, ms = measure(index, queries, lambda q: index.search(q, K, nprobe=nprobe))
+        recall = np.mean([len(np.intersect1d(a, e)) / max(len(e), 1) for a, e in zip(approx, exact)])
+        print(f"nprobe={nprobe:>3} recall@{K}={recall:.3f} p50={np.percentile(ms, 50):.3f}ms "
+              f"p95={np.percentile(ms, 95):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
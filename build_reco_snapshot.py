@@ -0,0 +1,31 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.reco_snapshot import SnapshotStore, RECO_SNAPSHOT_ROOT
+
+OUTPUT_ROOT = os.getenv("OUTPUT_ROOT", RECO_SNAPSHOT_ROOT)
+VERSION = os.getenv("VERSION") or None
+FACTORS = int(os.getenv("FACTORS", "32"))
+COMPONENTS = int(os.getenv("COMPONENTS", "128"))
+# сразу сделать версию активной; запущенные воркеры подхватят её по файлу CURRENT
+PUBLISH = os.getenv("PUBLISH", "0") == "1"
+KEEP = int(os.getenv("KEEP", "0"))
+
+
+async def build():
+    t0 = time.perf_counter()
+    store = SnapshotStore(OUTPUT_ROOT)
+    async with async_session() as session:
+        version = await store.build(session, version=VERSION, als_factors=FACTORS, ann_components=COMPONENTS)
+    if PUBLISH:
+        store.publish(version)
+    pruned = store.prune(KEEP) if KEEP else []
+    print(f"Recommendation snapshot built. version={version}, published={PUBLISH}, pruned={pruned}, "
+          f"path={OUTPUT_ROOT}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
@@ -0,0 +1,28 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.task_ann_index import TaskAnnIndex, TASK_ANN_PATH
+from app.services.task_text_index import TaskTextIndex
+
+OUTPUT_PATH = os.getenv("OUTPUT_PATH", TASK_ANN_PATH)
+COMPONENTS = int(os.getenv("COMPONENTS", "128"))
+NLIST = int(os.getenv("NLIST", "0")) or None
+
+
+async def build():
+    t0 = time.perf_counter()
+    index = TaskTextIndex.load()
+    if index is None:
+        async with async_session() as session:
+            index = await TaskTextIndex.build(session)
+    ann_index = TaskAnnIndex.fit(index, n_components=COMPONENTS, nlist=NLIST)
+    ann_index.save(OUTPUT_PATH)
+    print(f"ANN index built. tasks={len(ann_index)}, lists={len(ann_index.centroids)}, "
+          f"path={OUTPUT_PATH}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
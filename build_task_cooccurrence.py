@@ -0,0 +1,27 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.task_cooccurrence import TaskCooccurrence, TASK_COOCCURRENCE_PATH
+
+OUTPUT_PATH = os.getenv("OUTPUT_PATH", TASK_COOCCURRENCE_PATH)
+TOP_K = int(os.getenv("TOP_K", "50"))
+MAX_ITEMS_PER_USER = int(os.getenv("MAX_ITEMS_PER_USER", "200"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "10000"))
+
+
+async def build():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        cooccurrence = await TaskCooccurrence.build(
+            session, top_k=TOP_K, max_items_per_user=MAX_ITEMS_PER_USER, chunk_size=CHUNK_SIZE,
+        )
+    cooccurrence.save(OUTPUT_PATH)
+    print(f"Co-occurrence built. tasks={len(cooccurrence)}, nnz={cooccurrence.matrix.nnz}, "
+          f"path={OUTPUT_PATH}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
@@ -0,0 +1,23 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.task_text_index import TaskTextIndex, TASK_INDEX_PATH
+
+INDEX_PATH = os.getenv("INDEX_PATH", TASK_INDEX_PATH)
+MAX_FEATURES = int(os.getenv("INDEX_MAX_FEATURES", "20000"))
+
+
+async def build():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        index = await TaskTextIndex.build(session, max_features=MAX_FEATURES)
+    index.save(INDEX_PATH)
+    print(f"Index built. tasks={len(index)}, features={index.matrix.shape[1]}, "
+          f"nnz={index.matrix.nnz}, path={INDEX_PATH}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
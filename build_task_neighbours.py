@@ -0,0 +1,24 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.task_neighbour_service import TaskNeighbourService, TASK_NEIGHBOURS_K
+from app.services.task_text_index import TaskTextIndex
+
+TOP_K = int(os.getenv("TOP_K", str(TASK_NEIGHBOURS_K)))
+
+
+async def build():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        # индекс собирается заново по текущим одобренным задачам, а не берётся с диска
+        index = await TaskTextIndex.build(session)
+        rows = await TaskNeighbourService(session).rebuild(index, k=TOP_K)
+    print(f"Task neighbours built. tasks={len(index)}, rows={rows}, k={TOP_K}, "
+          f"took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
@@ -0,0 +1,20 @@
+import asyncio
+import time
+
+from app.database import async_session
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.skill_rating_service import SkillRatingService
+
+
+async def build():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        rows = await TaskStatsCRUD(session).rebuild()
+        # rebuild сбрасывает рейтинги задач к априорным — сразу переобучаем
+        users, _ = await SkillRatingService(session).refit()
+    print(f"Task stats rebuilt. tasks={rows}, rated_users={users}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
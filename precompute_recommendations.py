@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.db.CRUD.user_recommendation import UserRecommendationCRUD
+from app.services.recommendation_batch import load_active_user_ids, rank_users, active_since, \
+    RECO_PRECOMPUTE_N, RECO_ACTIVE_DAYS
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_service import RecommendationService
+
+TOP_N = int(os.getenv("TOP_N", str(RECO_PRECOMPUTE_N)))
+ACTIVE_DAYS = int(os.getenv("ACTIVE_DAYS", str(RECO_ACTIVE_DAYS)))
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "256"))
+WRITE_BATCH = int(os.getenv("WRITE_BATCH", "1000"))
+
+
+async def precompute():
+    t0 = time.perf_counter()
+    # то же состояние, что у API: активный снимок или индексы с диска
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+    try:
+        async with async_session() as session:
+            await service.warm_up(session)
+            user_ids = await load_active_user_ids(session, active_since(ACTIVE_DAYS))
+            t_load = time.perf_counter()
+            print(f"Loaded tasks={len(service.index)}, active users={len(user_ids)} in {t_load - t0:.1f}s")
+
+            results = await rank_users(service, session, user_ids, n=TOP_N, workers=WORKERS, chunk_size=CHUNK_SIZE)
+        t_rank = time.perf_counter()
+        print(f"Ranked {len(results)} users in {t_rank - t_load:.1f}s (workers={WORKERS})")
+    finally:
+        service.close()
+
+    computed_at = datetime.now()
+    written = 0
+    async with async_session() as session:
+        crud = UserRecommendationCRUD(session)
+        for i in range(0, len(results), WRITE_BATCH):
+            rows = [
+                {"user_id": user_id, "items": items, "computed_at": computed_at}
+                for user_id, items in results[i:i + WRITE_BATCH]
+            ]
+            written += await crud.bulk_replace(rows)
+    print(f"Precompute finished. written={written}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(precompute())
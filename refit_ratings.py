@@ -0,0 +1,21 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.skill_rating_service import SkillRatingService
+
+ITERATIONS = int(os.getenv("ITERATIONS", "30"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "100000"))
+
+
+async def refit():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        users, tasks = await SkillRatingService(session).refit(iterations=ITERATIONS, chunk_size=CHUNK_SIZE)
+    print(f"Skill ratings refitted. users={users}, tasks={tasks}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(refit())
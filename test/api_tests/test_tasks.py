@@ -270,4 +270,26 @@ async def test_tasks_filters_and_visibility(client, registered_user_and_token, a
     student_pending = {t["id"] for t in res.json()}
 
     assert one_id in approved_ids
-    assert student_pending == set()
\ No newline at end of file
+    assert student_pending == set()
+
+@pytest.mark.anyio
+async def test_similar_tasks_endpoint(client, admin_user_and_token):
+    _, _, admin_headers = admin_user_and_token
+
+    res = await client.post("/tasks/", json={
+        "subject": "math",
+        "problem": "найдите производную функции синус",
+        "solution": "cos x",
+        "answer": "cos x",
+        "difficulty": 2,
+    }, headers=admin_headers)
+    assert res.status_code == 201
+    task_id = res.json()["id"]
+
+    res = await client.get(f"/tasks/{task_id}/similar", params={"k": 5}, headers=admin_headers)
+    assert res.status_code == 200
+    assert isinstance(res.json(), list)
+    assert all(item["id"] != task_id for item in res.json())
+
+    res = await client.get(f"/tasks/{task_id}/similar", params={"k": 0}, headers=admin_headers)
+    assert res.status_code == 422
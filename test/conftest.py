@@ -0,0 +1,27 @@
+from typing import List
+
+import pytest
+
+from app.services.translation.providers.base import BaseMTProvider
+
+
+class TaggingProvider(BaseMTProvider):
+    # фейковый MT: помечает каждое предложение шаблоном, первые failures вызовов падают
+    model_version = "fake-mt"
+
+    def __init__(self, template: str = "[ru] {}", failures: int = 0):
+        self.template = template
+        self.failures = failures
+        self.calls: List[List[str]] = []
+
+    async def translate(self, batch: List[str]) -> List[str]:
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("decoder crashed")
+        self.calls.append(list(batch))
+        return [self.template.format(s) for s in batch]
+
+
+@pytest.fixture
+def tagging_provider():
+    return TaggingProvider
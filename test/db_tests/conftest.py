@@ -5,7 +5,9 @@ import pytest
 from app.db.CRUD.task import TaskCRUD
 from app.db.CRUD.task_history import TaskHistoryCRUD
 from app.db.CRUD.user import UserCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
 from app.models.base_db_models import Base
+from app.models.task_table import Task
 
 DATABASE_URL = 'sqlite+aiosqlite:///:memory:'
 
@@ -36,4 +38,18 @@ async def task_crud(db_session) -> TaskCRUD:
 
 @pytest_asyncio.fixture
 async def task_history_crud(db_session) -> TaskHistoryCRUD:
-    return TaskHistoryCRUD(db_session)
\ No newline at end of file
+    return TaskHistoryCRUD(db_session)
+
+@pytest.fixture
+def add_task(db_session):
+    # одобренная задача с заполненными обязательными полями; любое поле переопределяется по имени
+    def _add_task(task_id: int, **overrides) -> Task:
+        fields = dict(
+            id=task_id, subject="math", problem=f"problem {task_id}", solution="s", answer="a",
+            difficulty=2, status=TaskStatusEnum.APPROVED, creator_id=1,
+        )
+        fields.update(overrides)
+        task = Task(**fields)
+        db_session.add(task)
+        return task
+    return _add_task
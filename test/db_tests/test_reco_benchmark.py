@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from bench.reco_benchmark import hit_rank, ndcg_at_k, precision_at_k, run_benchmark
+from bench.synthetic import SyntheticConfig, load_holdout
+
+
+def test_ranking_metrics():
+    assert hit_rank([5, 7, 9], 9) == 2
+    assert hit_rank([5, 7, 9], 1) is None
+    assert precision_at_k(0, 10) == pytest.approx(0.1)
+    assert precision_at_k(None, 10) == 0.0
+    assert ndcg_at_k(0, 10) == 1.0
+    assert ndcg_at_k(2, 10) == pytest.approx(1 / math.log2(4))
+    assert ndcg_at_k(12, 10) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_on_small_synthetic_catalog(tmp_path):
+    path = str(tmp_path / "reco.db")
+    config = SyntheticConfig(tasks=400, history_rows=3000, users=100, eval_users=20)
+
+    reports = await run_benchmark(path, config, rankers=['content', 'als'], k=5, regenerate=True, memory_users=5)
+    holdout = load_holdout(path)
+
+    assert len(holdout) == 20
+    assert [r.ranker for r in reports] == ['content', 'als']
+    for r in reports:
+        assert r.users == 20
+        assert 0.0 <= r.precision <= 0.2
+        assert 0.0 <= r.ndcg <= 1.0
+        assert 0.0 < r.p50_ms <= r.p95_ms
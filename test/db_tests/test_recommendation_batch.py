@@ -0,0 +1,102 @@
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.db.CRUD.user_recommendation import UserRecommendationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.models.task_history_table import TaskHistory
+from app.models.task_table import Task
+from app.services.recommendation_batch import load_active_user_ids, rank_users
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_service import RecommendationService
+
+
+@pytest_asyncio.fixture
+async def catalog_data(db_session):
+    for task_id, subject, difficulty in [
+        (1, "algebra", 2), (2, "algebra", 3), (3, "algebra", 2), (4, "geometry", 2), (5, "geometry", 4),
+    ]:
+        db_session.add(Task(
+            id=task_id, subject=subject, problem=f"{subject} problem {task_id}", solution="s", answer="a",
+            difficulty=difficulty, status=TaskStatusEnum.APPROVED, creator_id=1,
+        ))
+    db_session.add(Task(
+        id=6, subject="algebra", problem="pending", solution="s", answer="a",
+        difficulty=2, status=TaskStatusEnum.PENDING, creator_id=1,
+    ))
+    now = datetime.now()
+    for user_id, task_id, ts in [(1, 1, now), (2, 4, now), (3, 2, now - timedelta(days=90))]:
+        db_session.add(TaskHistory(
+            user_id=user_id, task_id=task_id, status=TaskSolutionStatusEnum.RIGHT_SOLUTION,
+            answer="a", score=1.0, timestamp=ts,
+        ))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers, chunk_size", [(1, 1), (2, 1), (1, 2)])
+async def test_rank_active_users(db_session, catalog_data, workers, chunk_size):
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+    user_ids = await load_active_user_ids(db_session, datetime.now() - timedelta(days=30))
+
+    results = dict(await rank_users(service, db_session, user_ids, n=3, workers=workers, chunk_size=chunk_size))
+
+    assert set(results) == {1, 2}
+    # пачка ранжируется так же, как онлайн-запрос рекомендаций для той же группы
+    for start in range(0, len(user_ids), chunk_size):
+        online = await service._compute_batch(db_session, user_ids[start:start + chunk_size], 3)
+        for user_id, ranked in online.items():
+            assert results[user_id] == [asdict(r) for r in ranked]
+    assert 1 not in [item["id"] for item in results[1]]
+    assert 6 not in [item["id"] for items in results.values() for item in items]
+    assert all(item["problem"] for items in results.values() for item in items)
+
+
+@pytest.mark.asyncio
+async def test_users_without_history_are_skipped(db_session, catalog_data):
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+
+    results = dict(await rank_users(service, db_session, [1, 404], n=3))
+
+    assert set(results) == {1}
+
+
+@pytest.mark.asyncio
+async def test_service_serves_precomputed_list(db_session, catalog_data):
+    items = [
+        {"id": i, "subject": "algebra", "problem": "p", "difficulty": 2.0,
+         "relevance_score": 1.0 - i / 10, "match_reason": "новый вызов"}
+        for i in range(1, 4)
+    ]
+    await UserRecommendationCRUD(db_session).bulk_replace(
+        [{"user_id": 42, "items": items, "computed_at": datetime.now()}]
+    )
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+
+    result = await service.get_user_recommendations(db_session, user_id=42, n_recommendations=2)
+
+    assert [r.id for r in result] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_precomputed_list_skips_tasks_no_longer_approved(db_session, catalog_data):
+    items = [
+        {"id": i, "subject": "algebra", "problem": "p", "difficulty": 2.0,
+         "relevance_score": 1.0 - i / 10, "match_reason": "новый вызов"}
+        for i in (6, 1, 2, 3)
+    ]
+    await UserRecommendationCRUD(db_session).bulk_replace(
+        [{"user_id": 42, "items": items, "computed_at": datetime.now()}]
+    )
+    await db_session.delete(await db_session.get(Task, 2))
+    await db_session.commit()
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+
+    result = await service.get_user_recommendations(db_session, user_id=42, n_recommendations=2)
+    batch = await service.get_batch_recommendations(db_session, [42], n_recommendations=2)
+
+    assert [r.id for r in result] == [1, 3]
+    assert [r.id for r in batch[42]] == [1, 3]
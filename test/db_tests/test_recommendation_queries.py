@@ -0,0 +1,293 @@
+from datetime import datetime
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.db.CRUD.task_history import TaskHistoryCRUD
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.db.CRUD.user_profile import UserProfileCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.enums.user_role import UserRoleEnum
+from app.exceptions.recommendation_exception import PermissionDeniedRecommendation
+from app.models.task_history_table import TaskHistory
+from app.models.user_table import User
+from app.services.candidate_stream import prescore
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_service import RecommendationService
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_text_index import TaskTextIndex
+from app.services.user_profile_service import UserProfileService
+
+
+async def _add_attempt(session, user_id, task_id, status=TaskSolutionStatusEnum.RIGHT_SOLUTION, score=1.0):
+    session.add(TaskHistory(user_id=user_id, task_id=task_id, status=status, answer="a", score=score))
+
+
+@pytest.mark.asyncio
+async def test_popular_task_ids_order_by_solved_count(db_session, add_task):
+    for task_id in (1, 2, 3):
+        add_task(task_id)
+    add_task(4, status=TaskStatusEnum.PENDING)
+    add_task(5, difficulty=5)
+    for user_id in (10, 11):
+        await _add_attempt(db_session, user_id, 2)
+    await _add_attempt(db_session, 12, 3)
+    await _add_attempt(db_session, 13, 1, status=TaskSolutionStatusEnum.WRONG_SOLUTION)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+
+    popular = await RecommendationService()._load_popular_task_ids(db_session)
+
+    assert popular == [2, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_default_recommendations_use_warm_popularity(db_session, add_task):
+    for task_id in (1, 2, 3):
+        add_task(task_id)
+    await db_session.commit()
+
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+    service.reload(popular_ids=[3, 1, 2])
+    result = await service.get_user_recommendations(db_session, user_id=99, n_recommendations=2)
+
+    assert [r.id for r in result] == [3, 1]
+
+
+@pytest.mark.asyncio
+async def test_popular_pool_is_reread_after_ttl(db_session, add_task):
+    for task_id in (1, 2, 3):
+        add_task(task_id)
+    await db_session.commit()
+    service = RecommendationService(cache=RecommendationCache(redis=None), popular_ttl=0)
+    service.reload(popular_ids=[3, 1])
+
+    await _add_attempt(db_session, 10, 2)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+    result = await service.get_user_recommendations(db_session, user_id=99, n_recommendations=1)
+
+    assert [r.id for r in result] == [2]
+
+
+@pytest.mark.asyncio
+async def test_popular_pool_follows_incremental_task_stats(db_session, add_task):
+    stats = TaskStatsCRUD(db_session)
+    for task_id in (1, 2, 3):
+        add_task(task_id)
+        await stats.ensure_task(task_id)
+    service = RecommendationService(cache=RecommendationCache(redis=None), popular_ttl=0)
+    assert [r.id for r in await service.get_user_recommendations(db_session, 98, 1)] == [1]
+
+    for user_id in (10, 11):
+        history = TaskHistory(user_id=user_id, task_id=3, status=TaskSolutionStatusEnum.RIGHT_SOLUTION,
+                              answer="a", score=1.0, timestamp=datetime.now())
+        db_session.add(history)
+        await stats.record_attempt(history)
+
+    assert [r.id for r in await service.get_user_recommendations(db_session, 99, 1)] == [3]
+
+
+@pytest.mark.asyncio
+async def test_profile_rebuilt_from_history_and_updated_on_attempt(db_session, add_task):
+    add_task(1, subject="algebra", difficulty=2)
+    add_task(2, subject="geometry", difficulty=4)
+    await _add_attempt(db_session, 7, 1)
+    await db_session.commit()
+
+    profiles = UserProfileService(db_session)
+    profile = await profiles.get_or_build(7)
+    assert profile.solved_task_ids == [1]
+    assert UserProfileService.preferred_subjects(profile) == ["algebra"]
+
+    history = await TaskHistoryCRUD(db_session).create(TaskHistory(
+        user_id=7, task_id=2, status=TaskSolutionStatusEnum.RIGHT_SOLUTION, answer="a", score=3.0,
+    ))
+    await profiles.apply_attempt(history)
+
+    profile = await profiles.get_profile(7)
+    assert profile.solved_task_ids == [2, 1]
+    assert UserProfileService.preferred_subjects(profile) == ["geometry", "algebra"]
+    assert profile.attempts_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rebuild_reuses_profile_row_created_concurrently(db_session, add_task):
+    add_task(1, subject="algebra", difficulty=2)
+    await _add_attempt(db_session, 7, 1)
+    # пустую строку успел вставить параллельный запрос
+    await UserProfileCRUD(db_session).get_for_update(7)
+    await db_session.commit()
+
+    profile = await UserProfileService(db_session).rebuild(7)
+
+    assert profile.solved_task_ids == [1]
+    assert len(await UserProfileCRUD(db_session).get_by_user_ids([7])) == 1
+
+
+@pytest.mark.asyncio
+async def test_user_without_history_has_no_profile(db_session):
+    assert await UserProfileService(db_session).get_or_build(404) is None
+
+
+@pytest.mark.asyncio
+async def test_ann_candidates_exclude_attempted_tasks(db_session, add_task):
+    problems = {
+        1: "найдите производную функции синус",
+        2: "найдите производную функции косинус",
+        3: "решите квадратное уравнение",
+        4: "найдите производную функции тангенс",
+    }
+    for task_id, problem in problems.items():
+        add_task(task_id, problem=problem)
+    await _add_attempt(db_session, 7, 1)
+    await _add_attempt(db_session, 7, 4, status=TaskSolutionStatusEnum.WRONG_SOLUTION, score=0.0)
+    await db_session.commit()
+
+    text_index = TaskTextIndex.fit(list(problems.items()), min_df=1, max_df=1.0)
+    service = RecommendationService(
+        index=text_index, ann_index=TaskAnnIndex.fit(text_index, n_components=2, nlist=1), ann_candidates=2,
+    )
+    rows = await service._get_ann_candidates(db_session, user_id=7, solved_task_ids=[1])
+
+    assert [r[0] for r in rows] == [2]
+
+
+@pytest.mark.asyncio
+async def test_candidates_use_anti_join_band_and_popularity(db_session, add_task):
+    add_task(1, subject="algebra", difficulty=2)
+    add_task(2, subject="algebra", difficulty=3)
+    add_task(3, subject="algebra", difficulty=2)
+    add_task(4, subject="algebra", difficulty=5)
+    add_task(5, subject="algebra", difficulty=2, status=TaskStatusEnum.PENDING)
+    add_task(6, subject="geometry", difficulty=2)
+    await _add_attempt(db_session, 7, 1, status=TaskSolutionStatusEnum.WRONG_SOLUTION, score=0.0)
+    for user_id in (10, 11):
+        await _add_attempt(db_session, user_id, 3)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+
+    service = RecommendationService(difficulty_band=1.0)
+    rows = await service._get_candidate_tasks(db_session, 7, ["algebra"], optimal_difficulty=2.0, n=2)
+
+    assert [r[0] for r in rows] == [3, 2]
+    assert all(len(r) == 3 for r in rows)
+
+    rows = await service._get_candidate_tasks(db_session, 7, ["algebra"], optimal_difficulty=2.0, n=5)
+    assert [r[0] for r in rows] == [3, 2, 6, 4]
+
+
+def test_candidate_query_does_not_select_text_columns():
+    sql = str(RecommendationService()._candidate_query(1))
+
+    assert "solution" not in sql and "answer" not in sql and "problem" not in sql
+    assert "NOT (EXISTS" in sql
+
+
+@pytest.mark.asyncio
+async def test_recommendations_fetch_text_for_top_n(db_session, add_task):
+    for task_id in range(1, 6):
+        add_task(task_id, problem=f"текст задачи {task_id}")
+    await _add_attempt(db_session, 7, 1)
+    await db_session.commit()
+
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+    result = await service.get_user_recommendations(db_session, user_id=7, n_recommendations=2)
+
+    assert len(result) == 2
+    assert 1 not in [r.id for r in result]
+    assert all(r.problem == f"текст задачи {r.id}" for r in result)
+
+
+@pytest.mark.asyncio
+async def test_task_stats_updated_on_attempt_and_rebuilt(db_session, add_task):
+    add_task(1)
+    add_task(2)
+    await db_session.commit()
+
+    crud = TaskHistoryCRUD(db_session)
+    for status, score in ((TaskSolutionStatusEnum.RIGHT_SOLUTION, 1.0), (TaskSolutionStatusEnum.WRONG_SOLUTION, 0.0)):
+        await crud.create(TaskHistory(user_id=7, task_id=1, status=status, answer="a", score=score))
+
+    stats_crud = TaskStatsCRUD(db_session)
+    stats = await stats_crud.get_by_task_id(1)
+    assert (stats.solve_count, stats.attempt_count, stats.mean_score) == (1, 2, 0.5)
+    assert stats.last_attempt_at is not None
+
+    await stats_crud.rebuild()
+    db_session.expire_all()
+    rebuilt = await stats_crud.get_by_task_id(1)
+    assert (rebuilt.solve_count, rebuilt.attempt_count, rebuilt.mean_score) == (1, 2, 0.5)
+    assert (await stats_crud.get_by_task_id(2)).attempt_count == 0
+    assert await stats_crud.get_popular_task_ids(limit=5) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_batch_recommendations_for_class(db_session, add_task):
+    for task_id in range(1, 7):
+        add_task(task_id, subject="algebra" if task_id % 2 else "geometry",
+                        difficulty=2, problem=f"текст задачи {task_id}")
+    await _add_attempt(db_session, 7, 1)
+    await _add_attempt(db_session, 8, 2)
+    await _add_attempt(db_session, 8, 4)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+
+    service = RecommendationService(cache=RecommendationCache(redis=None))
+    teacher = User(id=50, username="t", email="t@example.com", hashed_password="x", role=UserRoleEnum.TEACHER)
+    results = await service.get_batch_recommendations(db_session, [7, 8, 99, 7], 3, requesting_by=teacher)
+
+    assert list(results) == [7, 8, 99]
+    assert len(results[7]) == 3 and 1 not in [r.id for r in results[7]]
+    assert not {2, 4} & {r.id for r in results[8]}
+    assert all(r.problem == f"текст задачи {r.id}" for rs in results.values() for r in rs)
+    assert results[99]
+
+    student = User(id=7, username="s", email="s@example.com", hashed_password="x", role=UserRoleEnum.STUDENT)
+    assert await service.get_batch_recommendations(db_session, [7], 3, requesting_by=student)
+    with pytest.raises(PermissionDeniedRecommendation):
+        await service.get_batch_recommendations(db_session, [7, 8], 3, requesting_by=student)
+
+
+@pytest.mark.asyncio
+async def test_streamed_candidates_stop_early_and_match_full_scan(db_session, add_task):
+    for task_id in range(1, 301):
+        add_task(task_id, subject="algebra" if task_id % 3 else "geometry",
+                        difficulty=1 + task_id % 5)
+    await _add_attempt(db_session, 7, 1)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+
+    service = RecommendationService(candidate_limit=20, difficulty_band=10.0)
+    scanned = REGISTRY.get_sample_value("recommendation_candidates_scanned_sum") or 0.0
+    rows = await service._get_candidate_tasks(db_session, 7, ["algebra"], optimal_difficulty=3.0, n=5)
+    scanned = REGISTRY.get_sample_value("recommendation_candidates_scanned_sum") - scanned
+
+    # полный перебор той же предварительной оценки
+    expected = sorted(
+        (t for t in range(2, 301) if t % 3),
+        key=lambda t: (-prescore(abs(1 + t % 5 - 3.0), True), t),
+    )[:20]
+    assert [r[0] for r in rows] == expected
+    assert all(len(r) == 3 for r in rows)
+    assert scanned < 200
+
+
+@pytest.mark.asyncio
+async def test_diverse_recommendations_rerank_cached_pool(db_session, add_task):
+    for task_id in range(1, 9):
+        add_task(task_id, subject="algebra" if task_id <= 6 else "geometry",
+                        problem=f"текст задачи {task_id}")
+    await _add_attempt(db_session, 7, 1)
+    await db_session.commit()
+
+    cache = RecommendationCache(redis=None)
+    service = RecommendationService(cache=cache, mmr_pool=10, mmr_subject_similarity=0.9)
+    plain = await service.get_user_recommendations(db_session, user_id=7, n_recommendations=3)
+    diverse = await service.get_user_recommendations(db_session, user_id=7, n_recommendations=3, diversity=0.7)
+
+    assert len(diverse) == 3
+    assert {r.subject for r in diverse} == {"algebra", "geometry"}
+    assert {r.subject for r in plain} == {"algebra"}
+    assert await cache.get(7, 10) is not None
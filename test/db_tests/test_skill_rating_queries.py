@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+
+from app.db.CRUD.task_history import TaskHistoryCRUD
+from app.db.CRUD.task_stats import TaskStatsCRUD
+from app.db.CRUD.user_profile import UserProfileCRUD
+from app.db.CRUD.user_recommendation import UserRecommendationCRUD
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.enums.user_role import UserRoleEnum
+from app.models.task_history_table import TaskHistory
+from app.models.user_table import User
+from app.schemas.task_history import TaskHistoryCreate
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_service import RecommendationService
+from app.services.skill_rating_service import SkillRatingService
+from app.services.task_history_service import TaskHistoryService
+from app.services.user_profile_service import UserProfileService
+from app.utils.skill_rating import prior_rating, target_rating
+
+
+async def _log(session, user_id, task_id, solved):
+    status = TaskSolutionStatusEnum.RIGHT_SOLUTION if solved else TaskSolutionStatusEnum.WRONG_SOLUTION
+    history = await TaskHistoryCRUD(session).create(TaskHistory(
+        user_id=user_id, task_id=task_id, status=status, answer="a", score=1.0 if solved else 0.0,
+    ))
+    profile = await UserProfileService(session).apply_attempt(history)
+    await SkillRatingService(session).apply_attempt(history, profile)
+    return history
+
+
+@pytest.mark.asyncio
+async def test_attempt_updates_user_and_task_ratings(db_session, add_task):
+    add_task(1, difficulty=4)
+    await db_session.commit()
+
+    await _log(db_session, 7, 1, solved=True)
+
+    stats = await TaskStatsCRUD(db_session).get_by_task_id(1)
+    profile = await UserProfileService(db_session).get_profile(7)
+    assert stats.rating < prior_rating(4)
+    assert profile.skill_rating > 0.0
+    assert profile.rating_attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_refit_orders_tasks_by_observed_difficulty(db_session, add_task):
+    for task_id in (1, 2):
+        add_task(task_id, difficulty=3)
+    await db_session.commit()
+    for user_id in range(10, 20):
+        await _log(db_session, user_id, 1, solved=True)
+        await _log(db_session, user_id, 2, solved=user_id < 12)
+    await TaskStatsCRUD(db_session).rebuild()
+
+    users, tasks = await SkillRatingService(db_session).refit()
+    db_session.expire_all()
+
+    stats = TaskStatsCRUD(db_session)
+    assert (users, tasks) == (10, 2)
+    assert (await stats.get_by_task_id(2)).rating > (await stats.get_by_task_id(1)).rating
+    assert (await UserProfileService(db_session).get_profile(10)).rating_attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_candidates_use_rating_window(db_session, add_task):
+    for task_id, difficulty in ((1, 1), (2, 3), (3, 5), (4, 3)):
+        add_task(task_id, difficulty=difficulty)
+    await db_session.commit()
+    await TaskStatsCRUD(db_session).rebuild()
+    await TaskStatsCRUD(db_session).ensure_task(4)
+
+    service = RecommendationService(difficulty_band=10.0)
+    # уровень, для которого целевой рейтинг задачи равен рейтингу сложности 3
+    skill = -target_rating(0.0)
+    rows = await service._get_candidate_tasks(db_session, 7, [], optimal_difficulty=3.0, n=2, skill=skill)
+
+    assert {r[0] for r in rows} == {2, 4}
+
+
+@pytest.mark.asyncio
+async def test_log_attempt_writes_everything_in_one_commit(db_session, monkeypatch, add_task):
+    add_task(1, difficulty=2)
+    add_task(2, difficulty=4)
+    await db_session.commit()
+    await UserRecommendationCRUD(db_session).bulk_replace([{"user_id": 7, "items": [], "computed_at": datetime.now()}])
+    service = TaskHistoryService(db_session)
+    service._reco_cache = RecommendationCache(redis=None)
+    commits = []
+    commit = db_session.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await commit()
+
+    monkeypatch.setattr(db_session, "commit", counting_commit)
+    user = User(id=7, username="student", role=UserRoleEnum.STUDENT)
+    for task_id in (1, 2):
+        created = await service.log_attempt(user, TaskHistoryCreate(
+            task_id=task_id, status=TaskSolutionStatusEnum.RIGHT_SOLUTION, answer="a", score=1.0,
+        ))
+        assert created.task.id == task_id
+
+    assert len(commits) == 2
+    profiles = await UserProfileCRUD(db_session).get_all(user_id=7)
+    assert len(profiles) == 1
+    assert profiles[0].attempts_count == profiles[0].rating_attempts == 2
+    assert profiles[0].solved_task_ids == [2, 1]
+    assert (await TaskStatsCRUD(db_session).get_by_task_id(2)).attempt_count == 1
+    assert await UserRecommendationCRUD(db_session).get_by_user_id(7) is None
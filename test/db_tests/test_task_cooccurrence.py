@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.models.task_history_table import TaskHistory
+from app.models.task_table import Task
+from app.services.task_cooccurrence import TaskCooccurrence
+
+RIGHT = TaskSolutionStatusEnum.RIGHT_SOLUTION
+WRONG = TaskSolutionStatusEnum.WRONG_SOLUTION
+
+
+async def _build(db_session, baskets, **kwargs):
+    for task_id in range(1, 6):
+        db_session.add(Task(
+            id=task_id, subject="math", problem="p", solution="s", answer="a",
+            difficulty=2, status=TaskStatusEnum.APPROVED, creator_id=1,
+        ))
+    for user_id, tasks in baskets.items():
+        for task_id, status in tasks:
+            db_session.add(TaskHistory(user_id=user_id, task_id=task_id, status=status, answer="a", score=1.0))
+    await db_session.commit()
+    return await TaskCooccurrence.build(db_session, chunk_size=2, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_build_counts_only_solved_pairs(db_session):
+    cooc = await _build(db_session, {
+        1: [(1, RIGHT), (2, RIGHT)],
+        2: [(1, RIGHT), (2, RIGHT), (3, RIGHT)],
+        3: [(1, RIGHT), (4, WRONG)],
+    })
+    m = cooc.matrix.toarray()
+
+    assert m[0, 0] == 0
+    assert m[0, 1] == pytest.approx(2 / np.sqrt(3 * 2))
+    assert m[0, 2] == pytest.approx(1 / np.sqrt(3 * 1))
+    assert m[0, 3] == 0
+    assert np.allclose(m, m.T)
+
+
+@pytest.mark.asyncio
+async def test_build_keeps_top_k_neighbours(db_session):
+    cooc = await _build(db_session, {1: [(t, RIGHT) for t in range(1, 6)]}, top_k=2)
+
+    assert (cooc.matrix.getnnz(axis=1) <= 2).all()
+
+
+@pytest.mark.asyncio
+async def test_save_load_mmap_and_scores(db_session, tmp_path):
+    cooc = await _build(db_session, {
+        1: [(1, RIGHT), (2, RIGHT)],
+        2: [(1, RIGHT), (2, RIGHT)],
+        3: [(1, RIGHT), (3, RIGHT)],
+    })
+    cooc.save(str(tmp_path))
+    loaded = TaskCooccurrence.load(str(tmp_path))
+
+    assert not loaded.matrix.data.flags.writeable
+    scores = loaded.scores([2, 3, 5, 99], solved_ids=[1])
+    assert scores[0] == pytest.approx(1.0)
+    assert 0 < scores[1] < 1
+    assert scores[2] == scores[3] == 0
+
+
+def test_empty_matrix_gives_zero_scores():
+    assert TaskCooccurrence().scores([1, 2], [3]).tolist() == [0.0, 0.0]
@@ -0,0 +1,110 @@
+import pytest
+import pytest_asyncio
+
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.models.task_table import Task
+from app.services.task_neighbour_service import TaskNeighbourService
+from app.services.task_text_index import TaskTextIndex
+
+PROBLEMS = {
+    1: "найдите производную функции синус",
+    2: "найдите производную функции косинус",
+    3: "решите квадратное уравнение через дискриминант",
+    4: "решите линейное уравнение",
+    5: "вычислите интеграл функции синус",
+}
+
+
+@pytest.fixture
+def index() -> TaskTextIndex:
+    return TaskTextIndex.fit(list(PROBLEMS.items()), min_df=1, max_df=1.0)
+
+
+@pytest_asyncio.fixture
+async def seeded(db_session, add_task):
+    for task_id, problem in PROBLEMS.items():
+        add_task(task_id, problem=problem)
+    await db_session.commit()
+    return db_session
+
+
+@pytest.mark.asyncio
+async def test_rebuild_and_lookup(seeded, index):
+    service = TaskNeighbourService(seeded)
+    rows = await service.rebuild(index, k=2)
+
+    similar = await service.get_similar(1, k=5)
+
+    assert rows > 0
+    assert [r[0] for r in similar][0] == 2
+    assert 1 not in [r[0] for r in similar]
+    assert len(similar) <= 2
+    assert [r[4] for r in similar] == sorted((r[4] for r in similar), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_add_task_inserts_both_directions(seeded, index, add_task):
+    service = TaskNeighbourService(seeded)
+    await service.rebuild(index, k=2)
+
+    add_task(6, problem="найдите производную функции синус и косинус")
+    await seeded.commit()
+    task = await seeded.get(Task, 6)
+    index.add(task.id, task.problem)
+    await service.add_task(task, index, k=2)
+
+    assert {r[0] for r in await service.get_similar(6)} == {1, 2}
+    assert 6 in [r[0] for r in await service.get_similar(1)]
+
+
+@pytest.mark.asyncio
+async def test_tasks_approved_after_build_become_neighbours(seeded, index, add_task):
+    service = TaskNeighbourService(seeded)
+    await service.rebuild(index, k=2)
+
+    for task_id, problem in ((6, "вычислите определённый интеграл синус"), (7, "вычислите определённый интеграл")):
+        add_task(task_id, problem=problem)
+        await seeded.commit()
+        task = await seeded.get(Task, task_id)
+        index.add(task.id, task.problem)
+        await service.add_task(task, index, k=2)
+
+    assert 6 in [r[0] for r in await service.get_similar(7)]
+    assert 7 in [r[0] for r in await service.get_similar(6)]
+
+
+@pytest.mark.asyncio
+async def test_remove_task_drops_it_from_all_lists(seeded, index):
+    service = TaskNeighbourService(seeded)
+    await service.rebuild(index, k=3)
+
+    await service.remove_task(2)
+
+    assert await service.get_similar(2) == []
+    assert 2 not in [r[0] for r in await service.get_similar(1)]
+
+
+@pytest.mark.asyncio
+async def test_pending_neighbours_are_hidden(seeded, index):
+    service = TaskNeighbourService(seeded)
+    await service.rebuild(index, k=3)
+    task = await seeded.get(Task, 2)
+    task.status = TaskStatusEnum.PENDING
+    await seeded.commit()
+
+    assert 2 not in [r[0] for r in await service.get_similar(1)]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_skips_tasks_missing_from_db(seeded, index):
+    task = await seeded.get(Task, 3)
+    task.status = TaskStatusEnum.REJECTED
+    await seeded.delete(await seeded.get(Task, 4))
+    await seeded.commit()
+    service = TaskNeighbourService(seeded)
+
+    await service.rebuild(index, k=4)
+
+    assert await service.get_similar(3) == []
+    assert await service.get_similar(4) == []
+    assert not {3, 4} & {r[0] for r in await service.get_similar(1)}
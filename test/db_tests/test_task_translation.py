@@ -0,0 +1,51 @@
+import pytest
+
+from app.db.CRUD.task_translation import TaskTranslationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.models.task_table import Task
+from app.services.task_translation_service import TaskTranslationService
+from app.services.translation.translation_cache import TranslationCache
+from app.services.translation.translation_service import TranslationService
+
+
+def _translator(provider) -> TranslationService:
+    return TranslationService(provider=provider, glossary=None, cache=TranslationCache(redis=None))
+
+
+async def _add_tasks(session):
+    rows = [
+        (1, "Find the derivative of $x^2$.", "Use the power rule.", "2x", TaskStatusEnum.APPROVED),
+        (2, "Найдите производную.", "По правилу.", "2x", TaskStatusEnum.APPROVED),
+        (3, "Pending problem.", "Some solution.", "1", TaskStatusEnum.PENDING),
+        (4, "Compute the trace.", "Sum the diagonal.", "5", TaskStatusEnum.APPROVED),
+    ]
+    for task_id, problem, solution, answer, status in rows:
+        session.add(Task(id=task_id, subject="math", problem=problem, solution=solution, answer=answer,
+                         difficulty=2, status=status, creator_id=1))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_catalog_translation_resumes_from_checkpoint(db_session, tmp_path, tagging_provider):
+    await _add_tasks(db_session)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    first = await TaskTranslationService(db_session, _translator(tagging_provider())).translate_catalog(
+        chunk_size=1, checkpoint_path=checkpoint_path, max_tasks=1,
+    )
+    assert (first.last_id, first.tasks) == (1, 1)
+
+    done = await TaskTranslationService(db_session, _translator(tagging_provider())).translate_catalog(
+        chunk_size=1, checkpoint_path=checkpoint_path,
+    )
+    assert (done.last_id, done.tasks) == (4, 3)
+    assert done.tokens > first.tokens > 0
+
+    crud = TaskTranslationCRUD(db_session)
+    assert await crud.get_translated_ids([1, 2, 3, 4], "ru") == {1, 2, 4}
+    translated = await crud.get_translation(1, "ru")
+    assert translated.problem == "[ru] Find the derivative of $x^2$."
+    assert translated.model_version == "fake-mt"
+    # русский текст и короткие ответы без латиницы остаются как есть
+    untouched = await crud.get_translation(2, "ru")
+    assert (untouched.problem, untouched.answer) == ("Найдите производную.", "2x")
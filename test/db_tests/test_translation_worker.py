@@ -0,0 +1,96 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.db.CRUD.task_translation import TaskTranslationCRUD
+from app.enums.task_moderation_status import TaskStatusEnum
+from app.models.task_table import Task
+from app.services.translation.translation_cache import TranslationCache
+from app.services.translation.translation_service import TranslationService
+from app.services.translation_worker import TranslationWorker
+
+
+def _worker(db_session, provider, **kwargs) -> TranslationWorker:
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    return TranslationWorker(
+        session_factory=session_factory,
+        translator_factory=lambda: TranslationService(provider, glossary=None, cache=TranslationCache(redis=None)),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_translates_approved_tasks_in_background(db_session, tagging_provider):
+    for task_id, status in ((1, TaskStatusEnum.APPROVED), (2, TaskStatusEnum.PENDING)):
+        db_session.add(Task(id=task_id, subject="math", problem="Compute the trace.", solution="Sum it up.",
+                            answer="5", difficulty=2, status=status, creator_id=1))
+    await db_session.commit()
+
+    provider = tagging_provider()
+    worker = _worker(db_session, provider)
+    await worker.start()
+    try:
+        assert await worker.enqueue(1)
+        assert await worker.enqueue(2)
+        await worker.join()
+    finally:
+        await worker.stop()
+
+    crud = TaskTranslationCRUD(db_session)
+    translation = await crud.get_translation(1, "ru")
+    assert (translation.problem, translation.solution, translation.answer) == \
+           ("[ru] Compute the trace.", "[ru] Sum it up.", "5")
+    assert await crud.get_translation(2, "ru") is None
+    assert len(provider.calls) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failures, translated", [(2, True), (5, False)])
+async def test_failed_translation_is_retried_up_to_the_cap(db_session, tagging_provider, failures, translated):
+    db_session.add(Task(id=1, subject="math", problem="Compute the trace.", solution="Sum it up.",
+                        answer="5", difficulty=2, status=TaskStatusEnum.APPROVED, creator_id=1))
+    await db_session.commit()
+
+    provider = tagging_provider(failures=failures)
+    worker = _worker(db_session, provider, max_attempts=3)
+    await worker.start()
+    try:
+        await worker.enqueue(1)
+        await worker.join()
+    finally:
+        await worker.stop()
+
+    assert (await TaskTranslationCRUD(db_session).get_translation(1, "ru") is not None) == translated
+    assert provider.failures == max(failures - 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_redis_job_is_released_only_after_success(db_session, tagging_provider):
+    db_session.add(Task(id=1, subject="math", problem="Compute the trace.", solution="Sum it up.",
+                        answer="5", difficulty=2, status=TaskStatusEnum.APPROVED, creator_id=1))
+    await db_session.commit()
+
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipeline = MagicMock()
+    pipeline.__aenter__ = AsyncMock(return_value=pipe)
+    pipeline.__aexit__ = AsyncMock(return_value=False)
+    redis = MagicMock()
+    redis.pipeline.return_value = pipeline
+    redis.hincrby = AsyncMock(return_value=1)
+
+    worker = _worker(db_session, tagging_provider(failures=1), redis=redis, worker_id="w1")
+    # первая попытка падает: задача возвращается в общую очередь и только потом уходит из processing
+    await worker._run_one(1)
+    pipe.rpush.assert_called_once_with("tr:queue", 1)
+    pipe.lrem.assert_called_once_with("tr:queue:processing:w1", 1, 1)
+
+    pipe.reset_mock()
+    await worker._run_one(1)
+    pipe.rpush.assert_not_called()
+    pipe.lrem.assert_called_once_with("tr:queue:processing:w1", 1, 1)
+    pipe.hdel.assert_called_once_with("tr:queue:attempts", 1)
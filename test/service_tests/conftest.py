@@ -66,7 +66,11 @@ def task():
 @pytest.fixture
 def task_service(db_mock):
     service = TaskService(db=db_mock)
+    service._db = AsyncMock()
     service._task_crud = AsyncMock()
+    service._reco_cache = AsyncMock()
+    service._neighbour_service = AsyncMock()
+    service._stats_crud = AsyncMock()
     return service
 
 
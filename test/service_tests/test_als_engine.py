@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.services.recommendation_engines.als import ALSModel, ALSRanker
+from app.services.recommendation_engines.base import RankingRequest
+from app.services.recommendation_service import RecommendationService
+
+
+@pytest.fixture
+def model() -> ALSModel:
+    # две группы пользователей: 0-3 решают задачи 1-4, 4-7 решают задачи 5-8
+    rows, cols = [], []
+    for u in range(8):
+        group = range(4) if u < 4 else range(4, 8)
+        for t in group:
+            if (u + t) % 4 != 0:
+                rows.append(u)
+                cols.append(t)
+    interactions = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(8, 8))
+    return ALSModel.fit(interactions, list(range(100, 108)), list(range(1, 9)), factors=4, iterations=15)
+
+
+def make_request(user_id, ids, solved):
+    ids = np.asarray(ids, dtype=np.int64)
+    return RankingRequest(
+        user_id=user_id,
+        ids=ids,
+        subjects=["math"] * len(ids),
+        problems=[f"задача {i}" for i in ids],
+        difficulties=np.full(len(ids), 2.0),
+        in_preferred=np.ones(len(ids), dtype=bool),
+        solved_task_ids=solved,
+        optimal_difficulty=2.0,
+    )
+
+
+def test_factors_are_float32(model):
+    assert model.user_factors.dtype == np.float32
+    assert model.item_factors.dtype == np.float32
+
+
+def test_known_user_prefers_own_group(model):
+    # пользователь 100 не решал задачу 1 ((0 + 0) % 4 == 0)
+    ranked = ALSRanker(model).rank(make_request(100, [1, 5, 6], [2, 3]), n=3)
+
+    assert ranked[0].id == 1
+
+
+def test_fold_in_for_unknown_user(model):
+    ranked = ALSRanker(model).rank(make_request(999, [2, 6], [5, 7, 8]), n=2)
+
+    assert [r.id for r in ranked] == [6, 2]
+
+
+def test_unknown_user_without_history_uses_fallback(model):
+    class Fallback(ALSRanker):
+        name = 'fallback'
+
+        def rank(self, request, n=None):
+            return ['fallback']
+
+    assert ALSRanker(model, fallback=Fallback()).rank(make_request(999, [1, 2], [])) == ['fallback']
+
+
+def test_save_and_load(model, tmp_path):
+    model.save(str(tmp_path))
+    loaded = ALSModel.load(str(tmp_path))
+
+    assert loaded.task_ids.tolist() == model.task_ids.tolist()
+    assert np.allclose(loaded.item_factors, model.item_factors)
+    assert loaded.alpha == model.alpha
+
+
+def test_load_missing_returns_none(tmp_path):
+    assert ALSModel.load(str(tmp_path)) is None
+
+
+def test_service_dispatches_to_configured_engine(model):
+    candidates = [(1, "math", 2), (5, "math", 2)]
+
+    service = RecommendationService(als_model=model, engine='als')
+    ranked = service._rank_tasks(candidates, [2, 3], 2.0, ["math"], user_id=100)
+
+    assert service.ranker().name == 'als'
+    assert ranked[0].id == 1
+    assert "похожие на вас" in ranked[0].match_reason
+
+
+def test_service_falls_back_to_content_without_model():
+    service = RecommendationService(engine='als')
+
+    assert service.ranker().name == 'content'
+
+
+def test_rank_batch_matches_per_user_ranking(model):
+    from app.services.recommendation_engines.base import BaseRanker, BatchRankingRequest
+
+    ids = np.array([1, 2, 5, 6, 9], dtype=np.int64)
+    batch = BatchRankingRequest(
+        user_ids=[100, 999, 998],
+        ids=ids,
+        subjects=np.array(["math"] * 5, dtype=object),
+        problems=[None] * 5,
+        difficulties=np.full(5, 2.0),
+        in_preferred=np.ones((3, 5), dtype=bool),
+        attempted=np.array([[0, 1, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]], dtype=bool),
+        solved_task_ids=[[2, 3], [5, 7], []],
+        optimal_difficulty=np.full(3, 2.0),
+    )
+    ranker = ALSRanker(model, fallback=ALSRanker(ALSModel()))
+
+    batched = ranker.rank_batch(batch, 3)
+    single = BaseRanker.rank_batch(ranker, batch, 3)
+
+    assert [[r.id for r in rs] for rs in batched] == [[r.id for r in rs] for rs in single]
+    assert 2 not in [r.id for r in batched[0]]
+    assert batched[2] == []
+    assert all(r.relevance_score >= 0 for rs in batched for r in rs)
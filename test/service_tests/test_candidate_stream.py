@@ -0,0 +1,35 @@
+from app.services.candidate_stream import CandidateHeap, prescore, prescore_bound
+
+
+def test_heap_keeps_top_k_and_prefers_earlier_rows_on_ties():
+    heap = CandidateHeap(limit=2)
+    heap.push(0.5, (1,))
+    heap.push(0.9, (2,))
+    heap.push(0.5, (3,))
+    heap.push(0.7, (4,))
+
+    assert heap.rows() == [(2,), (4,)]
+    assert heap.scanned == 4
+
+
+def test_can_improve_only_while_bound_beats_worst():
+    heap = CandidateHeap(limit=1)
+    assert heap.can_improve(0.0)
+
+    heap.push(prescore(1.0, preferred=False), (1,))
+    assert heap.can_improve(prescore_bound(1.0))
+    assert not heap.can_improve(prescore_bound(10.0))
+
+
+def test_prescore_bound_is_upper_bound():
+    for distance in (0.0, 0.5, 2.0):
+        assert prescore(distance, preferred=False) < prescore(distance, preferred=True) == prescore_bound(distance)
+        assert prescore_bound(distance) >= prescore_bound(distance + 0.1)
+
+
+def test_zero_limit_heap_stays_empty():
+    heap = CandidateHeap(limit=0)
+    heap.push(1.0, (1,))
+
+    assert heap.rows() == []
+    assert not heap.can_improve(10.0)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.services.recommendation_engines.base import RankedTask
+from app.services.recommendation_engines.mmr import mmr_rerank
+from app.services.recommendation_service import RecommendationService
+from app.services.task_text_index import TaskTextIndex
+
+
+def _ranked(ids, subjects, scores):
+    return [RankedTask(id=i, subject=s, problem="", difficulty=2.0, relevance_score=r, match_reason="")
+            for i, s, r in zip(ids, subjects, scores)]
+
+
+def test_zero_diversity_keeps_relevance_order():
+    ranked = _ranked([1, 2, 3], ["a", "a", "a"], [0.9, 0.8, 0.7])
+
+    assert mmr_rerank(ranked, np.eye(3), 2, diversity=0.0) == ranked[:2]
+
+
+def test_near_duplicate_is_pushed_down():
+    ranked = _ranked([1, 2, 3], ["a", "a", "a"], [0.9, 0.89, 0.8])
+    similarity = np.array([[1.0, 0.99, 0.1], [0.99, 1.0, 0.1], [0.1, 0.1, 1.0]])
+
+    assert [r.id for r in mmr_rerank(ranked, similarity, 2, diversity=0.5)] == [1, 3]
+
+
+def test_subject_similarity_spreads_subjects():
+    ranked = _ranked([1, 2, 3, 4], ["a", "a", "a", "b"], [0.9, 0.88, 0.86, 0.8])
+
+    plain = mmr_rerank(ranked, np.eye(4), 2, diversity=0.5)
+    spread = mmr_rerank(ranked, np.eye(4), 2, diversity=0.5, subject_similarity=0.8)
+
+    assert [r.id for r in plain] == [1, 2]
+    assert [r.id for r in spread] == [1, 4]
+
+
+def test_service_diversify_uses_text_index():
+    index = TaskTextIndex.fit([
+        (1, "найдите производную функции синус"),
+        (2, "найдите производную функции синус"),
+        (3, "решите квадратное уравнение"),
+    ], min_df=1, max_df=1.0)
+    service = RecommendationService(index=index, mmr_subject_similarity=0.0)
+    ranked = _ranked([1, 2, 3], ["a", "a", "a"], [0.9, 0.89, 0.8])
+
+    assert [r.id for r in service.diversify(ranked, 2, diversity=0.5)] == [1, 3]
+    assert [r.id for r in service.diversify(ranked, 2, diversity=0.0)] == [1, 2]
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.exceptions.recommendation_exception import RecommendationOverloaded
+from app.services.ranking_executor import RankingExecutor
+from app.services.recommendation_engines.base import BaseRanker, RankingRequest
+from app.services.recommendation_engines.content import ContentRanker
+from app.services.recommendation_service import RecommendationService
+from app.services.task_text_index import TaskTextIndex
+
+
+@pytest.fixture
+def ranker() -> ContentRanker:
+    rows = [
+        (1, "найдите производную функции синус"),
+        (2, "найдите производную функции косинус"),
+        (3, "решите квадратное уравнение через дискриминант"),
+        (4, "решите линейное уравнение"),
+    ]
+    return ContentRanker(TaskTextIndex.fit(rows, min_df=1, max_df=1.0))
+
+
+@pytest.fixture
+def request_() -> RankingRequest:
+    return RankingRequest(
+        user_id=1,
+        ids=np.array([2, 3, 4]),
+        subjects=["math", "math", "physics"],
+        problems=[None, None, None],
+        difficulties=np.array([2.0, 3.0, 2.0]),
+        in_preferred=np.array([True, True, False]),
+        solved_task_ids=[1],
+        optimal_difficulty=2.0,
+    )
+
+
+class BlockingRanker(BaseRanker):
+    name = 'blocking'
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def rank(self, request, n=None):
+        self.release.wait(5)
+        return []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+async def test_executor_matches_direct_ranking(ranker, request_, mode):
+    executor = RankingExecutor(mode=mode, workers=2)
+    executor.set_rankers({ranker.name: ranker})
+    try:
+        ranked = await executor.rank(ranker, request_, 2)
+    finally:
+        executor.shutdown()
+
+    assert ranked == ranker.rank(request_, 2)
+    assert executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_process_pool_ranks_with_worker_copy(ranker, request_):
+    executor = RankingExecutor(mode="process", workers=1)
+    executor.set_rankers({ranker.name: ranker})
+    try:
+        ranked = await executor.rank(ranker, request_, 3)
+    finally:
+        executor.shutdown()
+
+    assert [r.id for r in ranked] == [r.id for r in ranker.rank(request_, 3)]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_new_jobs(request_):
+    blocking = BlockingRanker()
+    executor = RankingExecutor(mode="thread", workers=1, queue_size=1)
+    running = asyncio.create_task(executor.rank(blocking, request_, 1))
+    await asyncio.sleep(0.05)
+    try:
+        with pytest.raises(RecommendationOverloaded):
+            await executor.rank(blocking, request_, 1)
+    finally:
+        blocking.release.set()
+        await running
+        executor.shutdown()
+
+    assert executor.pending == 0
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        RankingExecutor(mode="gpu")
+
+
+def test_reload_passes_new_rankers_to_executor(ranker):
+    executor = RankingExecutor(mode="inline")
+    service = RecommendationService(executor=executor)
+    service.reload(index=ranker.index)
+
+    assert executor._rankers["content"] is service.rankers["content"]
@@ -0,0 +1,96 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.enums.user_role import UserRoleEnum
+from app.exceptions.recommendation_exception import PermissionDeniedSnapshot, SnapshotNotFound
+from app.services.reco_snapshot import SnapshotStore
+from app.services.recommendation_service import RecommendationService
+from app.services.ranking_executor import RankingExecutor
+from app.services.task_text_index import TaskTextIndex
+
+
+def _write_snapshot(root, version, rows):
+    path = os.path.join(root, version)
+    TaskTextIndex.fit(rows, min_df=1, max_df=1.0).save(os.path.join(path, 'task_index'))
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump({'version': version, 'tasks': len(rows)}, f)
+
+
+@pytest.fixture
+def store(tmp_path) -> SnapshotStore:
+    root = str(tmp_path)
+    _write_snapshot(root, 'v1', [(1, "производная синуса"), (2, "интеграл косинуса")])
+    _write_snapshot(root, 'v2', [(1, "производная синуса"), (2, "интеграл косинуса"), (3, "квадратное уравнение")])
+    os.makedirs(os.path.join(root, '.build-v3'))
+    return SnapshotStore(root)
+
+
+@pytest.fixture
+def service(store) -> RecommendationService:
+    return RecommendationService(snapshots=store, executor=RankingExecutor(mode='inline'), snapshot_check_interval=0)
+
+
+def test_versions_skip_unfinished_builds(store):
+    assert store.versions() == ['v1', 'v2']
+    assert store.current_version() is None
+
+    store.publish('v1')
+
+    assert store.current_version() == 'v1'
+    assert store.open('v1').manifest['tasks'] == 2
+    assert store.open('v3') is None
+
+
+def test_snapshot_arrays_are_memory_mapped(store):
+    index = store.open('v2').index
+
+    assert index.task_ids.tolist() == [1, 2, 3]
+    # read-only вид поверх файла, а не копия в памяти процесса
+    assert not index.matrix.data.flags.owndata
+    assert not index.matrix.data.flags.writeable
+
+
+@pytest.mark.asyncio
+async def test_activate_snapshot_swaps_state_and_publishes(service, store):
+    admin = SimpleNamespace(id=1, role=UserRoleEnum.ADMIN)
+
+    await service.activate_snapshot('v2', admin)
+
+    assert service.snapshot_version == 'v2'
+    assert len(service.index) == 3
+    assert store.current_version() == 'v2'
+
+
+@pytest.mark.asyncio
+async def test_activate_snapshot_requires_admin_and_existing_version(service, store):
+    with pytest.raises(PermissionDeniedSnapshot):
+        await service.activate_snapshot('v2', SimpleNamespace(id=2, role=UserRoleEnum.TEACHER))
+    with pytest.raises(SnapshotNotFound):
+        await service.activate_snapshot('v3', SimpleNamespace(id=1, role=UserRoleEnum.ADMIN))
+
+    assert store.current_version() is None
+    assert service.snapshot_version is None
+
+
+@pytest.mark.asyncio
+async def test_sync_snapshot_follows_version_published_elsewhere(service, store):
+    store.publish('v1')
+    await service.sync_snapshot()
+    assert service.snapshot_version == 'v1'
+
+    store.publish('v2')
+    await service.sync_snapshot()
+    assert service.snapshot_version == 'v2'
+    assert len(service.index) == 3
+
+
+def test_snapshot_status_is_admin_only(service, store):
+    store.publish('v1')
+
+    with pytest.raises(PermissionDeniedSnapshot):
+        service.snapshot_status(SimpleNamespace(id=2, role=UserRoleEnum.STUDENT))
+    status = service.snapshot_status(SimpleNamespace(id=1, role=UserRoleEnum.ADMIN))
+    assert status == {'current': 'v1', 'loaded': None, 'versions': ['v1', 'v2']}
@@ -0,0 +1,158 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.recommendation_cache import RecommendationCache
+
+ITEMS = [{"id": 1, "subject": "math", "problem": "p", "difficulty": 2.0,
+          "relevance_score": 0.9, "match_reason": "новый вызов"}]
+
+
+@pytest.fixture
+def local_cache() -> RecommendationCache:
+    return RecommendationCache(redis=None, lru_size=2)
+
+
+@pytest.mark.asyncio
+async def test_local_hit_and_miss(local_cache):
+    assert await local_cache.get(1, 5) is None
+
+    await local_cache.set(1, 5, ITEMS)
+
+    assert await local_cache.get(1, 5) == ITEMS
+    assert await local_cache.get(1, 10) is None
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded(local_cache):
+    for user_id in (1, 2, 3):
+        await local_cache.set(user_id, 5, ITEMS)
+
+    assert await local_cache.get(1, 5) is None
+    assert await local_cache.get(3, 5) == ITEMS
+
+
+@pytest.mark.asyncio
+async def test_local_entries_expire():
+    cache = RecommendationCache(redis=None, local_ttl=0)
+    await cache.set(1, 5, ITEMS)
+
+    assert await cache.get(1, 5) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user_only_drops_that_user(local_cache):
+    await local_cache.set(1, 5, ITEMS)
+    await local_cache.set(2, 5, ITEMS)
+
+    await local_cache.invalidate_user(1)
+
+    assert await local_cache.get(1, 5) is None
+    assert await local_cache.get(2, 5) == ITEMS
+
+
+class FakeRedis:
+    # hash, строки и pipeline — ровно то, что использует кэш
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    async def hget(self, key, field):
+        self.calls.append(("hget", key, field))
+        return self.data.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    async def expire(self, key, ttl):
+        pass
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args: self.queued.append((getattr(self.redis, name), args))
+
+    async def execute(self):
+        return [await method(*args) for method, args in self.queued]
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_fills_local_tier():
+    redis = FakeRedis()
+    await RecommendationCache(redis=redis).set(7, 5, ITEMS)
+    cache = RecommendationCache(redis=redis)
+
+    assert await cache.get(7, 5) == ITEMS
+    assert await cache.get(7, 5) == ITEMS
+    assert redis.calls == [("hget", "reco:7", "5")]
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_treated_as_miss():
+    redis = FakeRedis()
+    redis.pipeline = MagicMock(side_effect=ConnectionError("redis is down"))
+    cache = RecommendationCache(redis=redis)
+
+    assert await cache.get(7, 5) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user_deletes_redis_key():
+    redis = FakeRedis()
+    cache = RecommendationCache(redis=redis)
+    await cache.set(7, 5, ITEMS)
+
+    await cache.invalidate_user(7)
+
+    assert "reco:7" not in redis.data
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("redis", [None, FakeRedis()], ids=["local", "redis"])
+async def test_compute_finished_after_invalidation_is_not_cached(redis):
+    cache = RecommendationCache(redis=redis)
+    generation = await cache.generation(7)
+
+    await cache.invalidate_user(7)
+    await cache.set(7, 5, ITEMS, generation)
+
+    assert await cache.get(7, 5) is None
+    generation = await cache.generation(7)
+    await cache.invalidate_all()
+    await cache.set(7, 5, ITEMS, generation)
+    assert await cache.get(7, 5) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_all_reaches_other_workers():
+    redis = FakeRedis()
+    worker, other = RecommendationCache(redis=redis, local_ttl=0), RecommendationCache(redis=redis, local_ttl=0)
+    await worker.set(7, 5, ITEMS, await worker.generation(7))
+    assert await other.get(7, 5) == ITEMS
+
+    await other.invalidate_all()
+
+    assert await worker.get(7, 5) is None
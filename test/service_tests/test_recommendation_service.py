@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from app.services.recommendation_service import RecommendationService
+from app.services.task_text_index import TaskTextIndex
+
+
+@pytest.fixture
+def index() -> TaskTextIndex:
+    rows = [
+        (1, "найдите производную функции синус"),
+        (2, "найдите производную функции косинус"),
+        (3, "решите квадратное уравнение через дискриминант"),
+        (4, "решите линейное уравнение"),
+        (5, "вычислите интеграл функции синус"),
+    ]
+    return TaskTextIndex.fit(rows, min_df=1, max_df=1.0)
+
+
+@pytest.fixture
+def service(index) -> RecommendationService:
+    return RecommendationService(index=index)
+
+
+def test_index_rows_are_normalized(index):
+    norms = np.sqrt(index.matrix.multiply(index.matrix).sum(axis=1)).A.ravel()
+    assert np.allclose(norms, 1.0)
+
+
+def test_max_similarity_prefers_similar_text(index):
+    sim = index.max_similarity([2, 3], ["", ""], [1], [""])
+
+    assert sim[0] > sim[1]
+
+
+def test_vectors_for_task_missing_from_index(index):
+    vecs = index.vectors([1, 100, 2], [None, "найдите производную функции синус", None])
+
+    assert vecs.shape[0] == 3
+    assert np.allclose(vecs[1].toarray(), index.vectors([1]).toarray())
+
+
+def test_empty_index_gives_zero_similarity():
+    sim = TaskTextIndex().max_similarity([1, 2], ["a", "b"], [3], ["c"])
+
+    assert sim.tolist() == [0.0, 0.0]
+
+
+def test_fit_on_tiny_corpus_returns_empty_index():
+    assert TaskTextIndex.fit([(1, "x")]).is_empty
+
+
+def test_save_and_load(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = TaskTextIndex.load(str(tmp_path))
+
+    assert loaded.task_ids.tolist() == index.task_ids.tolist()
+    assert np.allclose(loaded.matrix.toarray(), index.matrix.toarray())
+
+
+def test_rank_tasks_uses_text_similarity(service):
+    candidates = [
+        (3, "math", 2),
+        (2, "math", 2),
+    ]
+
+    ranked = service._rank_tasks(candidates, [1], optimal_difficulty=2.0, preferred_subjects=["math"])
+
+    assert [r.id for r in ranked] == [2, 3]
+    assert ranked[0].relevance_score > ranked[1].relevance_score
+
+
+def test_rank_tasks_returns_top_n_sorted(service):
+    candidates = [
+        (10 + d, "math" if d % 2 else "physics", d)
+        for d in range(1, 8)
+    ]
+
+    full = service._rank_tasks(candidates, [1], optimal_difficulty=3.0, preferred_subjects=["math"])
+    top = service._rank_tasks(candidates, [1], optimal_difficulty=3.0, preferred_subjects=["math"], n=3)
+
+    assert len(full) == len(candidates)
+    assert [r.relevance_score for r in top] == [r.relevance_score for r in full[:3]]
+    assert [r.relevance_score for r in full] == sorted((r.relevance_score for r in full), reverse=True)
+
+
+def test_rank_tasks_without_candidates(service):
+    assert service._rank_tasks([], [], optimal_difficulty=2.5, preferred_subjects=[], n=5) == []
+
+
+def test_blended_mode_promotes_co_solved_tasks(index):
+    from scipy import sparse
+    from app.services.task_cooccurrence import TaskCooccurrence
+
+    matrix = sparse.csr_matrix(np.array([[0, 0, 0.9], [0, 0, 0], [0.9, 0, 0]], dtype=np.float32))
+    cooccurrence = TaskCooccurrence(matrix, task_ids=[1, 3, 4])
+    candidates = [
+        (3, "math", 2),
+        (4, "math", 2),
+    ]
+
+    content = RecommendationService(index=index, cf_weight=0.0)
+    blended = RecommendationService(index=index, cooccurrence=cooccurrence, cf_weight=0.5)
+
+    assert content._rank_tasks(candidates, [1], 2.0, ["math"])[0].id == 3
+    ranked = blended._rank_tasks(candidates, [1], 2.0, ["math"])
+    assert ranked[0].id == 4
+    assert "решают вместе" in ranked[0].match_reason
+
+
+def _batch(ids, difficulties, subjects, preferred, attempted, solved, optimal):
+    from app.services.recommendation_engines.base import BatchRankingRequest
+
+    subjects = np.array(subjects, dtype=object)
+    return BatchRankingRequest(
+        user_ids=list(range(100, 100 + len(solved))),
+        ids=np.array(ids, dtype=np.int64),
+        subjects=subjects,
+        problems=[None] * len(ids),
+        difficulties=np.array(difficulties, dtype=np.float64),
+        in_preferred=np.stack([np.isin(subjects, p) for p in preferred]),
+        attempted=np.array(attempted, dtype=bool),
+        solved_task_ids=solved,
+        optimal_difficulty=np.array(optimal, dtype=np.float64),
+    )
+
+
+def test_rank_batch_matches_per_user_ranking(index):
+    from scipy import sparse
+    from app.services.recommendation_engines.base import BaseRanker
+    from app.services.recommendation_engines.content import ContentRanker
+    from app.services.task_cooccurrence import TaskCooccurrence
+
+    cooccurrence = TaskCooccurrence(
+        sparse.csr_matrix(np.array([[0, 0.5, 0.9], [0.5, 0, 0.2], [0.9, 0.2, 0]], dtype=np.float32)),
+        task_ids=[1, 2, 4],
+    )
+    ranker = ContentRanker(index, cooccurrence, cf_weight=0.3)
+    batch = _batch(
+        ids=[1, 2, 3, 4, 5], difficulties=[1, 2, 3, 2, 4], subjects=["a", "b", "a", "b", "a"],
+        preferred=[["a"], ["b"], []],
+        attempted=[[1, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 1, 1, 1, 1]],
+        solved=[[1], [], [2]], optimal=[2.0, 3.0, 1.0],
+    )
+
+    batched = ranker.rank_batch(batch, 3)
+    single = BaseRanker.rank_batch(ranker, batch, 3)
+
+    assert [[r.id for r in rs] for rs in batched] == [[r.id for r in rs] for rs in single]
+    for rs_batch, rs_single in zip(batched, single):
+        assert np.allclose([r.relevance_score for r in rs_batch], [r.relevance_score for r in rs_single])
+    assert 1 not in [r.id for r in batched[0]]
+    assert [r.id for r in batched[2]] == [1]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.services.ranking_executor import RankingExecutor
+from app.services.recommendation_cache import RecommendationCache
+from app.services.recommendation_engines.als import ALSModel, ALSRanker
+from app.services.recommendation_engines.base import RankedTask, RankingRequest
+from app.services.recommendation_engines.content import ContentRanker
+from app.services.recommendation_service import RecommendationService
+from app.services.shadow_scoring import ShadowScorer, overlap_at_k
+
+
+@pytest.fixture
+def model() -> ALSModel:
+    rows, cols = [], []
+    for u in range(8):
+        for t in (range(4) if u < 4 else range(4, 8)):
+            if (u + t) % 4 != 0:
+                rows.append(u)
+                cols.append(t)
+    interactions = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(8, 8))
+    return ALSModel.fit(interactions, list(range(100, 108)), list(range(1, 9)), factors=4, iterations=15)
+
+
+def _request(user_id=100):
+    ids = np.arange(1, 9, dtype=np.int64)
+    return RankingRequest(
+        user_id=user_id, ids=ids, subjects=["math"] * len(ids), problems=[f"задача {i}" for i in ids],
+        difficulties=np.full(len(ids), 2.0), in_preferred=np.ones(len(ids), dtype=bool),
+        solved_task_ids=[2, 3], optimal_difficulty=2.0,
+    )
+
+
+def _served(ids):
+    return [RankedTask(id=i, subject="math", problem="", difficulty=2.0, relevance_score=0.5, match_reason="")
+            for i in ids]
+
+
+@asynccontextmanager
+async def _no_session():
+    yield None
+
+
+def test_overlap_at_k():
+    assert overlap_at_k([1, 2, 3], [3, 2, 9], 3) == pytest.approx(2 / 3)
+    assert overlap_at_k([1, 2], [], 2) == 0.0
+    assert overlap_at_k([], [], 0) == 0.0
+
+
+def test_disabled_or_busy_scorer_does_not_sample():
+    assert not ShadowScorer(engine="", sample_rate=1.0).should_sample()
+    assert not ShadowScorer(engine="als", sample_rate=0.0).should_sample()
+
+    scorer = ShadowScorer(engine="als", sample_rate=1.0, max_pending=1)
+    assert scorer.should_sample()
+    scorer.pending = 1
+    assert not scorer.should_sample()
+
+
+@pytest.mark.asyncio
+async def test_shadow_runs_after_response_and_logs_comparison(model, tmp_path):
+    log_path = tmp_path / "shadow.jsonl"
+    service = RecommendationService(
+        als_model=model, cache=RecommendationCache(redis=None), executor=RankingExecutor(mode="inline"),
+        shadow=ShadowScorer(engine="als", sample_rate=1.0, log_path=str(log_path)),
+        session_factory=lambda: _no_session(),
+    )
+    service._get_ranked = AsyncMock(return_value=_served([1, 4, 5]))
+    service.user_ranking_request = AsyncMock(return_value=(object(), _request()))
+
+    served = await service.get_user_recommendations(None, user_id=100, n_recommendations=3)
+
+    assert [r.id for r in served] == [1, 4, 5]
+    assert service.shadow.pending == 1
+    await asyncio.gather(*service._shadow_tasks)
+
+    assert service.shadow.pending == 0
+    record = json.loads(log_path.read_text().splitlines()[0])
+    assert record["primary_engine"] == "content" and record["shadow_engine"] == "als"
+    assert record["served_ids"] == [1, 4, 5]
+    assert len(record["shadow_ids"]) == 3
+    assert record["overlap"] == pytest.approx(overlap_at_k([1, 4, 5], record["shadow_ids"], 3))
+    assert record["shadow_seconds"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_shadow_skipped_when_engine_not_ready(tmp_path):
+    log_path = tmp_path / "shadow.jsonl"
+    service = RecommendationService(
+        cache=RecommendationCache(redis=None), executor=RankingExecutor(mode="inline"),
+        shadow=ShadowScorer(engine="als", sample_rate=1.0, log_path=str(log_path)),
+        session_factory=lambda: _no_session(),
+    )
+    service._get_ranked = AsyncMock(return_value=_served([1]))
+
+    await service.get_user_recommendations(None, user_id=100, n_recommendations=1)
+    await asyncio.gather(*service._shadow_tasks)
+
+    assert service.shadow.pending == 0
+    assert not log_path.exists()
+
+
+def test_score_delta_uses_primary_scores(model):
+    primary, shadow = ContentRanker(), ALSRanker(model)
+    comparison = ShadowScorer(engine="als").compare(primary, shadow, _request(), _served([1, 4, 5]), 3)
+
+    scores = {r.id: r.relevance_score for r in primary.rank(_request())}
+    best = sorted(scores.values(), reverse=True)[:3]
+    assert comparison.score_delta == pytest.approx(
+        sum(scores[t] for t in comparison.shadow_ids) / 3 - sum(best) / 3
+    )
+    assert comparison.score_delta <= 1e-9
@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.models.user_profile_table import UserProfile
+from app.utils.skill_rating import (
+    RATING_MIN_ATTEMPTS, difficulty_from_rating, elo_update, expected, fit_ratings, k_factor, prior_rating,
+    target_rating, user_skill,
+)
+
+
+def test_elo_update_moves_ratings_towards_outcome():
+    skill, rating = elo_update(0.0, 0.0, solved=True)
+    assert skill > 0.0 and rating < 0.0
+
+    skill, rating = elo_update(0.0, 0.0, solved=False)
+    assert skill < 0.0 and rating > 0.0
+
+    # ожидаемый результат почти ничего не меняет
+    skill, rating = elo_update(3.0, -3.0, solved=True)
+    assert abs(skill - 3.0) < 0.01 and abs(rating + 3.0) < 0.01
+
+
+def test_k_factor_shrinks_with_attempts():
+    assert k_factor(0) > k_factor(20) > k_factor(200)
+
+
+def test_difficulty_scale_roundtrip():
+    for difficulty in (1, 2.5, 5):
+        assert np.isclose(difficulty_from_rating(prior_rating(difficulty)), difficulty)
+    assert difficulty_from_rating(100.0) == 5.0
+
+
+def test_target_rating_gives_target_success():
+    skill = 0.4
+    assert np.isclose(expected(skill, target_rating(skill, success=0.7)), 0.7)
+
+
+def test_user_skill_requires_enough_attempts():
+    profile = UserProfile(user_id=1, skill_rating=1.2, rating_attempts=RATING_MIN_ATTEMPTS - 1)
+    assert user_skill(profile) is None
+
+    profile.rating_attempts = RATING_MIN_ATTEMPTS
+    assert user_skill(profile) == 1.2
+    assert user_skill(None) is None
+
+
+def test_fit_ratings_recovers_order():
+    rng = np.random.default_rng(0)
+    true_skill = rng.normal(size=300)
+    true_rating = np.linspace(-2, 2, 40)
+    users = rng.integers(300, size=20000)
+    tasks = rng.integers(40, size=20000)
+    outcomes = rng.random(20000) < expected(true_skill[users], true_rating[tasks])
+
+    skills, ratings = fit_ratings(users, tasks, outcomes, np.zeros(40), n_users=300)
+
+    assert np.corrcoef(skills, true_skill)[0, 1] > 0.8
+    assert np.corrcoef(ratings, true_rating)[0, 1] > 0.95
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from app.services.task_ann_index import TaskAnnIndex
+from app.services.task_text_index import TaskTextIndex
+
+
+@pytest.fixture
+def text_index() -> TaskTextIndex:
+    rows = [
+        (1, "найдите производную функции синус"),
+        (2, "найдите производную функции косинус"),
+        (3, "решите квадратное уравнение через дискриминант"),
+        (4, "решите линейное уравнение"),
+        (5, "вычислите интеграл функции синус"),
+        (6, "вычислите интеграл функции косинус"),
+    ]
+    return TaskTextIndex.fit(rows, min_df=1, max_df=1.0)
+
+
+@pytest.fixture
+def ann_index(text_index) -> TaskAnnIndex:
+    return TaskAnnIndex.fit(text_index, n_components=4, nlist=2)
+
+
+@pytest.fixture
+def clustered() -> TaskAnnIndex:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16))
+    vectors = centers[rng.integers(20, size=2000)] + 0.3 * rng.normal(size=(2000, 16))
+    return TaskAnnIndex.from_vectors(np.arange(1, 2001), vectors, nlist=40)
+
+
+def test_vectors_are_normalized_float32(ann_index):
+    assert ann_index.vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(ann_index.vectors, axis=1), 1.0, atol=1e-5)
+
+
+def test_similar_excludes_task_itself(ann_index):
+    ids, scores = ann_index.similar(1, k=3, nprobe=2)
+
+    assert 1 not in ids.tolist()
+    assert ids[0] == 2
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_search_recall_against_exact(clustered):
+    queries = clustered.vectors[:50]
+    recall = np.mean([
+        len(np.intersect1d(clustered.search(q, 10, nprobe=8)[0], clustered.exact_search(q, 10)[0])) / 10
+        for q in queries
+    ])
+
+    assert recall > 0.9
+
+
+def test_add_and_remove(ann_index):
+    assert ann_index.add(7, "найдите производную функции синус косинус")
+
+    assert 7 in ann_index
+    assert 7 in ann_index.similar(1, k=2, nprobe=2)[0].tolist()
+
+    assert ann_index.remove(7)
+    assert 7 not in ann_index
+    assert 7 not in ann_index.similar(1, k=6, nprobe=2)[0].tolist()
+
+
+def test_save_load_and_insert_into_mmap(ann_index, text_index, tmp_path):
+    ann_index.save(str(tmp_path))
+    loaded = TaskAnnIndex.load(str(tmp_path), text_index=text_index)
+
+    assert loaded.task_ids.tolist() == ann_index.task_ids.tolist()
+    assert np.allclose(loaded.vectors, ann_index.vectors)
+    assert loaded.add(7, "решите квадратное уравнение")
+    assert len(loaded) == len(ann_index) + 1
+
+
+def test_load_refuses_other_vocabulary(ann_index, tmp_path):
+    ann_index.save(str(tmp_path))
+    other = TaskTextIndex.fit([(1, "решите систему уравнений"), (2, "найдите предел функции")], min_df=1, max_df=1.0)
+
+    assert TaskAnnIndex.load(str(tmp_path), text_index=other) is None
+
+
+def test_load_missing_returns_none(tmp_path):
+    assert TaskAnnIndex.load(str(tmp_path)) is None
+
+
+def test_empty_index():
+    index = TaskAnnIndex.fit(TaskTextIndex())
+
+    assert index.is_empty
+    assert not index.add(1, "x")
+    assert len(index.search(np.zeros(4, dtype=np.float32))[0]) == 0
@@ -42,19 +42,32 @@ def crud_mock():
 
 @pytest.fixture
 def service(crud_mock):
-    service = TaskHistoryService(db=MagicMock())
+    service = TaskHistoryService(db=AsyncMock())
     service._crud = crud_mock
+    service._profile_service = AsyncMock()
+    service._rating_service = AsyncMock()
+    service._precomputed_crud = AsyncMock()
+    service._reco_cache = AsyncMock()
     return service
 
 
 @pytest.mark.asyncio
 async def test_log_attempt(service, user, task_history_data):
-    service._crud.create.return_value = TaskHistory(user_id=1, task_id=42)
+    created = TaskHistory(id=5, user_id=1, task_id=42)
+    service._crud.create.return_value = created
+    service._crud.get_with_relations.return_value = created
 
     result = await service.log_attempt(user, task_history_data)
 
     assert result.task_id == 42
     service._crud.create.assert_called_once()
+    service._profile_service.apply_attempt.assert_called_once_with(result, commit=False)
+    service._rating_service.apply_attempt.assert_called_once_with(
+        result, service._profile_service.apply_attempt.return_value, commit=False,
+    )
+    service._precomputed_crud.delete_by_user_id.assert_called_once_with(user.id, commit=False)
+    service._db.commit.assert_awaited_once()
+    service._reco_cache.invalidate_user.assert_called_once_with(user.id)
     assert result.user_id == 1
 
 
@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import AsyncMock, MagicMock
 from app.models.task_history_table import TaskHistory
 from app.enums.task_moderation_status import TaskStatusEnum
 from app.exceptions.task_exception import (
@@ -48,7 +49,9 @@ async def test_delete_task_success(task_service, admin, task):
     task_service._task_crud.get_task_by_id.return_value = task
     await task_service.delete_task(task_id=task.id, requesting_by=admin)
 
-    task_service._task_crud.delete_task_by_id.assert_called_once_with(task.id)
+    task_service._task_crud.delete_task_by_id.assert_called_once_with(task.id, commit=False)
+    task_service._neighbour_service.remove_task.assert_called_once_with(task.id, commit=False)
+    task_service._db.commit.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -79,6 +82,19 @@ async def test_get_task_by_id_pending_denied(task_service, user, task):
         await task_service.get_task_by_id(user, task_id=task.id)
 
 
+@pytest.mark.asyncio
+async def test_get_similar_tasks_checks_task(task_service, user, task):
+    task_service._task_crud.get_task_by_id.return_value = None
+    with pytest.raises(TaskNotFound):
+        await task_service.get_similar_tasks(user, task_id=404)
+
+    task.status = TaskStatusEnum.PENDING
+    task_service._task_crud.get_task_by_id.return_value = task
+    with pytest.raises(PermissionDeniedTask):
+        await task_service.get_similar_tasks(user, task_id=task.id)
+    task_service._neighbour_service.get_similar.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_update_task_as_author(task_service, user, task, task_update):
     task.creator_id = user.id
@@ -113,4 +129,58 @@ async def test_get_task_by_subject(task_service):
     result = await task_service.get_task_by_subject(subject)
 
     assert all(task.subject == subject for task in result)
-    task_service._task_crud.get_task_by_subject.assert_called_once_with(subject)
\ No newline at end of file
+    task_service._task_crud.get_task_by_subject.assert_called_once_with(subject)
+
+@pytest.mark.asyncio
+async def test_approve_and_delete_invalidate_recommendations(task_service, admin, task):
+    task.status = TaskStatusEnum.PENDING
+    task_service._task_crud.get_task_by_id.return_value = task
+    task_service._task_crud.update.return_value = task
+
+    await task_service.approve_task(task.id, moderator=admin)
+    await task_service.delete_task(task_id=task.id, requesting_by=admin)
+
+    assert task_service._reco_cache.invalidate_all.call_count == 2
+
+@pytest.mark.asyncio
+async def test_approve_and_delete_update_ann_index(task_service, admin, task):
+    task_service._reco_service = MagicMock()
+    task.status = TaskStatusEnum.PENDING
+    task_service._task_crud.get_task_by_id.return_value = task
+    task_service._task_crud.update.return_value = task
+
+    await task_service.approve_task(task.id, moderator=admin)
+    await task_service.delete_task(task_id=task.id, requesting_by=admin)
+
+    task_service._reco_service.on_task_approved.assert_called_once_with(task)
+    task_service._reco_service.on_task_deleted.assert_called_once_with(task.id)
+
+@pytest.mark.asyncio
+async def test_approve_and_update_enqueue_translation(task_service, admin, task, task_update):
+    task_service._translation_worker = AsyncMock()
+    task.status = TaskStatusEnum.PENDING
+    task_service._task_crud.get_task_by_id.return_value = task
+    task_service._task_crud.update.return_value = task
+
+    await task_service.approve_task(task.id, moderator=admin)
+    task.status = TaskStatusEnum.APPROVED
+    await task_service.update_task(task.id, task_update, requesting_by=admin)
+
+    assert task_service._translation_worker.enqueue.await_count == 2
+    task_service._translation_worker.enqueue.assert_awaited_with(task.id)
+
+
+@pytest.mark.asyncio
+async def test_approve_survives_index_update_failure(task_service, admin, task):
+    task_service._reco_service = MagicMock()
+    task_service._reco_service.on_task_approved.side_effect = ValueError("dimension mismatch")
+    task_service._neighbour_service.add_task.side_effect = RuntimeError("db is gone")
+    task_service._translation_worker = AsyncMock()
+    task.status = TaskStatusEnum.PENDING
+    task_service._task_crud.get_task_by_id.return_value = task
+    task_service._task_crud.update.return_value = task
+
+    await task_service.approve_task(task.id, moderator=admin)
+
+    task_service._neighbour_service.add_task.assert_awaited_once()
+    task_service._translation_worker.enqueue.assert_awaited_once_with(task.id)
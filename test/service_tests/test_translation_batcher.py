@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.services.translation.batcher import MicroBatchingProvider
+from app.services.translation.providers.base import BaseMTProvider
+
+
+class UpperProvider(BaseMTProvider):
+    def __init__(self, fail: bool = False):
+        self.calls: List[List[str]] = []
+        self.fail = fail
+
+    def token_length(self, s: str) -> int:
+        return len(s.split())
+
+    async def translate(self, batch: List[str]) -> List[str]:
+        self.calls.append(list(batch))
+        if self.fail:
+            raise RuntimeError("decoder failed")
+        return [s.upper() for s in batch]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_grouped_by_length():
+    provider = UpperProvider()
+    batcher = MicroBatchingProvider(provider, max_batch_size=8, max_wait_ms=20)
+    texts = ["a b c d", "a", "a b", "a b c"]
+
+    results = await asyncio.gather(*(batcher.translate([t]) for t in texts))
+
+    assert [r[0] for r in results] == [t.upper() for t in texts]
+    assert sorted(provider.calls) == [["a", "a b"], ["a b c", "a b c d"]]
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_capped_in_size():
+    provider = UpperProvider()
+    batcher = MicroBatchingProvider(provider, max_batch_size=8, max_wait_ms=20, bucket_size=3)
+
+    results = await batcher.translate(["w"] * 7)
+
+    assert results == ["W"] * 7
+    assert sorted(len(call) for call in provider.calls) == [1, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting():
+    provider = UpperProvider()
+    batcher = MicroBatchingProvider(provider, max_batch_size=2, max_wait_ms=10_000)
+
+    results = await asyncio.wait_for(batcher.translate(["x x", "y", "z", "w w"]), timeout=1)
+
+    assert results == ["X X", "Y", "Z", "W W"]
+    assert provider.calls == [["y", "x x"], ["z", "w w"]]
+
+
+@pytest.mark.asyncio
+async def test_provider_error_reaches_every_caller():
+    batcher = MicroBatchingProvider(UpperProvider(fail=True), max_batch_size=8, max_wait_ms=5)
+
+    results = await asyncio.gather(batcher.translate(["a"]), batcher.translate(["b"]), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.translation.glossary import Glossary
+from app.services.translation.latex_masker import LatexMasker
+from app.services.translation.translation_cache import TranslationCache, normalize_source, translation_key
+
+
+def _key(text, model="opus-mt", glossary="g1", lang="ru"):
+    masked, _ = LatexMasker().mask(text)
+    return translation_key(masked, model, glossary, lang)
+
+
+def test_key_ignores_formulas_and_spacing_but_not_versions():
+    base = _key("Solve  $x^2 = 1$ for x.")
+
+    assert _key("Solve $y^3 - 8 = 0$   for x. ") == base
+    assert _key("Solve $x^2 = 1$ for y.") != base
+    assert _key("Solve $x^2 = 1$ for x.", model="opus-mt-v2") != base
+    assert _key("Solve $x^2 = 1$ for x.", glossary="g2") != base
+    assert normalize_source("a  b\n\n c\t d ") == "a b\n\nc d"
+
+
+def test_glossary_version_follows_content():
+    assert Glossary({"rank": "ранг"}).version == Glossary({"Rank": "ранг"}).version
+    assert Glossary({"rank": "ранг"}).version != Glossary({"rank": "ранг", "trace": "след"}).version
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bounded_lru():
+    cache = TranslationCache(redis=None, lru_size=2)
+    await cache.set_many({"a": "A", "b": "B"})
+    assert await cache.get_many(["a"]) == {"a": "A"}
+
+    await cache.set_many({"c": "C"})
+
+    assert await cache.get_many(["a", "b", "c"]) == {"a": "A", "c": "C"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_lookup_reads_only_local_misses_from_redis():
+    redis = AsyncMock()
+    redis.mget.return_value = ["B", None]
+    cache = TranslationCache(redis=redis)
+    cache._put_local("a", "A")
+
+    assert await cache.get_many(["a", "b", "c", "a"]) == {"a": "A", "b": "B"}
+    redis.mget.assert_called_once_with(["tr:b", "tr:c"])
+    assert await cache.get_many(["b"]) == {"b": "B"}
+    assert redis.mget.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_treated_as_miss():
+    redis = AsyncMock()
+    redis.mget.side_effect = ConnectionError("redis is down")
+    cache = TranslationCache(redis=redis)
+
+    assert await cache.get_many(["a"]) == {}
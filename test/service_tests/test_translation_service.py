@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.translation.sentences import split_sentences
+from app.services.translation.translation_cache import TranslationCache
+from app.services.translation.translation_service import TranslationService
+
+
+@pytest.fixture
+def provider(tagging_provider):
+    return tagging_provider(template="<{}>")
+
+
+@pytest.fixture
+def service(provider) -> TranslationService:
+    return TranslationService(provider=provider, glossary=None, cache=TranslationCache(redis=None))
+
+
+def test_split_keeps_formulas_and_paragraphs():
+    parts = split_sentences("Find ⟪MASK_0⟫. Then check it!\n\nAnswer 3.5 is wrong.")
+
+    assert [s for s, _ in parts] == ["Find ⟪MASK_0⟫.", "Then check it!", "Answer 3.5 is wrong."]
+    assert "".join(s + sep for s, sep in parts) == "Find ⟪MASK_0⟫. Then check it!\n\nAnswer 3.5 is wrong."
+
+
+@pytest.mark.asyncio
+async def test_documents_are_translated_by_sentence_with_masks_restored(service, provider):
+    out = await service.translate_documents(["Solve $x^2=1$. Check the answer.", "Solve $y=2$. Done."])
+
+    assert out == ["<Solve $x^2=1$.> <Check the answer.>", "<Solve $y=2$.> <Done.>"]
+    # «Solve ⟪MASK_0⟫.» у обеих задач одинаковое и переводится один раз
+    assert sorted(provider.calls[0]) == ["Check the answer.", "Done.", "Solve ⟪MASK_0⟫."]
+    assert service.stats.sentences == 4
+
+
+@pytest.mark.asyncio
+async def test_repeated_text_is_served_from_cache(service, provider):
+    first = await service.translate_text("Find the rank of $A$.")
+    second = await service.translate_many(["Find the rank  of $B$."])
+
+    assert first == "<Find the rank of $A$.>"
+    assert second == ["<Find the rank of $B$.>"]
+    assert len(provider.calls) == 1
+    assert service.stats.cached == 1
+
+
+@pytest.mark.asyncio
+async def test_batches_are_split_and_sorted_by_length(service, provider):
+    await service.translate_documents(["a b c", "a", "a b", "a b c d"], batch_size=2)
+
+    assert provider.calls == [["a", "a b"], ["a b c", "a b c d"]]
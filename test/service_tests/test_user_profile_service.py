@@ -0,0 +1,45 @@
+import pytest
+
+from app.enums.task_solution_status import TaskSolutionStatusEnum
+from app.models.user_profile_table import UserProfile
+from app.services.user_profile_service import UserProfileService, DEFAULT_DIFFICULTY
+
+RIGHT = TaskSolutionStatusEnum.RIGHT_SOLUTION
+WRONG = TaskSolutionStatusEnum.WRONG_SOLUTION
+
+
+@pytest.fixture
+def profile() -> UserProfile:
+    profile = UserProfile(user_id=1)
+    UserProfileService._reset(profile)
+    return profile
+
+
+def test_empty_profile_defaults(profile):
+    assert UserProfileService.preferred_subjects(profile) == []
+    assert UserProfileService.optimal_difficulty(profile) == DEFAULT_DIFFICULTY
+
+
+def test_apply_attempts_updates_subjects_and_difficulty(profile):
+    UserProfileService._apply(profile, 1, "algebra", 2, RIGHT, 1.0)
+    UserProfileService._apply(profile, 2, "algebra", 4, RIGHT, 1.0)
+    UserProfileService._apply(profile, 3, "geometry", 5, WRONG, 0.1)
+
+    assert UserProfileService.preferred_subjects(profile) == ["algebra", "geometry"]
+    assert 2.0 < UserProfileService.optimal_difficulty(profile) < 4.0
+    assert profile.solved_task_ids == [2, 1]
+    assert profile.attempts_count == 3
+
+
+def test_resolving_task_moves_it_to_front(profile):
+    for task_id in (1, 2, 1):
+        UserProfileService._apply(profile, task_id, "algebra", 2, RIGHT, 1.0)
+
+    assert profile.solved_task_ids == [1, 2]
+
+
+def test_recent_attempts_weigh_more(profile):
+    UserProfileService._apply(profile, 1, "algebra", 1, RIGHT, 1.0)
+    UserProfileService._apply(profile, 2, "algebra", 5, RIGHT, 1.0)
+
+    assert UserProfileService.optimal_difficulty(profile) > 3.0
@@ -0,0 +1,28 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table  # регистрация всех мапперов
+from app.services.recommendation_engines.als import ALSModel, ALS_MODEL_PATH
+
+OUTPUT_PATH = os.getenv("OUTPUT_PATH", ALS_MODEL_PATH)
+FACTORS = int(os.getenv("FACTORS", "32"))
+REGULARIZATION = float(os.getenv("REGULARIZATION", "0.1"))
+ALPHA = float(os.getenv("ALPHA", "40"))
+ITERATIONS = int(os.getenv("ITERATIONS", "10"))
+
+
+async def train():
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        model = await ALSModel.build(
+            session, factors=FACTORS, regularization=REGULARIZATION, alpha=ALPHA, iterations=ITERATIONS,
+        )
+    model.save(OUTPUT_PATH)
+    print(f"ALS model trained. users={len(model.user_ids)}, tasks={len(model)}, factors={model.factors}, "
+          f"path={OUTPUT_PATH}, took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(train())
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import time
+
+from app.database import async_session
+from app.models import user_table, task_table, task_history_table, task_translation_table  # регистрация всех мапперов
+from app.services.task_translation_service import TaskTranslationService, TRANSLATION_TARGET_LANG
+from app.services.translation.translation_service import TranslationService
+
+LANG = os.getenv("LANG_TARGET", TRANSLATION_TARGET_LANG)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "200"))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "data/translate_tasks.checkpoint.json")
+# RESET=1 — начать заново, иначе продолжить с чекпойнта
+RESET = os.getenv("RESET", "0") == "1"
+MAX_TASKS = int(os.getenv("MAX_TASKS", "0")) or None
+
+
+async def translate():
+    t0 = time.perf_counter()
+    translator = TranslationService()
+    try:
+        async with async_session() as session:
+            checkpoint = await TaskTranslationService(session, translator).translate_catalog(
+                lang=LANG, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE,
+                checkpoint_path=CHECKPOINT_PATH, reset=RESET, max_tasks=MAX_TASKS,
+            )
+    finally:
+        translator.close()
+    stats = translator.stats
+    print(f"Task catalog translated. lang={LANG}, tasks={checkpoint.tasks}, last_id={checkpoint.last_id}, "
+          f"sentences={stats.sentences}, cached={stats.cached}, tokens/s={checkpoint.tokens_per_second:.0f}, "
+          f"took={time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(translate())